@@ -0,0 +1,755 @@
+import hashlib
+import json
+import time
+
+import sqlalchemy as SA
+
+from pushmanager.__about__ import __version__
+from pushmanager.core import db
+from pushmanager.core import util
+from pushmanager.core.cache import SingleFlight
+from pushmanager.core.cache import VersionedCache
+from pushmanager.core.settings import Settings
+
+
+class APIResponse(object):
+    """Result of an API call: the JSON-able data of the endpoint, or
+    the HTTP status code of the error in error.
+
+    Responses can be built from data, from its JSON body or both; the
+    other one is computed on first access. etag identifies the data
+    versions the response was built from; not_modified is set instead
+    of any data when it matched the etag passed to API.call. streamed
+    is set when the body was (at least partly) written through the
+    stream_fn passed to API.call instead.
+    """
+
+    def __init__(self, data=None, error=None, body=None, etag=None, not_modified=False, streamed=False):
+        self._data = data
+        self._body = body
+        self.error = error
+        self.etag = etag
+        self.not_modified = not_modified
+        self.streamed = streamed
+
+    @property
+    def data(self):
+        if self._data is None and self._body is not None:
+            self._data = json.loads(self._body)
+        return self._data
+
+    @property
+    def body(self):
+        if self._body is None:
+            self._body = json.dumps(self._data)
+        return self._body
+
+    def copy(self):
+        """Return the same response with data of its own, decoded
+        from the body, which callers may change.
+        """
+        return APIResponse(
+            error=self.error,
+            body=None if self.error or self.not_modified else self.body,
+            etag=self.etag,
+            not_modified=self.not_modified,
+            streamed=self.streamed,
+        )
+
+
+# Serialized PUSHDATA responses by push id, tagged with the
+# push_data_versions of the push and of requests they were built from.
+pushdata_cache = VersionedCache(Settings.get('pushdata_cache_size', 100))
+
+# PUSHES totals by (state, user) filter, tagged with the pushes version.
+pushes_count_cache = VersionedCache(100)
+
+# Endpoint runs in flight, by endpoint, arguments and data versions.
+# Identical calls made meanwhile, like everyone opening a push page at
+# once, share the response of the running one instead of querying;
+# they get copies with data of their own to change.
+coalesced_reads = SingleFlight(timeout=30, copy=APIResponse.copy)
+
+# Rows serialized per chunk of streamed responses.
+STREAM_CHUNK_SIZE = 200
+
+# Most ids batch endpoints (REQUESTS, PUSHITEMS) accept in one call.
+MAX_BATCH_IDS = 1000
+
+# Most users USERSEARCH returns.
+MAX_USERSEARCH_LIMIT = 50
+
+# Seconds PUSHDATA deltas overlap by: a request updated by a
+# transaction still running when a delta is read is in the next one.
+PUSHDATA_SINCE_MARGIN = 5
+
+# States requests leave the requested state or a push for, other than
+# going back to requested, which PUSHDATA deltas report as removed.
+PUSHDATA_REMOVED_STATES = ('added', 'pickme', 'delayed', 'discarded')
+
+
+def api_arguments(arguments):
+    """Convert a dict of plain values to the form of
+    tornado's request.arguments, so in-process API calls read their
+    arguments exactly like HTTP ones.
+    """
+    return dict(
+        (key, [str(v) for v in value] if isinstance(value, (list, tuple)) else [str(value)])
+        for key, value in arguments.iteritems()
+    )
+
+
+class API(object):
+    """Queries and serialization behind the /api endpoints.
+
+    Used by APIServlet for HTTP clients and by
+    RequestHandler.async_api_call for pages of the main app, which
+    skips the HTTP round trip to the api_app. Each endpoint is an
+    _api_<ENDPOINT> method; its result is passed to the callback given
+    to call() as an APIResponse.
+    """
+
+    # Request fields fetched for pushitems.html, which shows comments
+    # but not descriptions or conflicts.
+    PUSHITEMS_KEYS = util.REQUEST_SUMMARY_KEYS + ('comments',)
+
+    # push_data_versions the response of each endpoint depends on.
+    # 'push' stands for the versions of the pushes given in the push_id
+    # arguments for PUSHITEMS and of the push in the id argument
+    # otherwise.
+    DATA_VERSIONS = {
+        'USERLIST': (db.USERS_DATA_VERSION,),
+        'USERSEARCH': (db.USERS_DATA_VERSION,),
+        'REQUEST': (db.REQUESTS_DATA_VERSION,),
+        'REQUESTS': (db.REQUESTS_DATA_VERSION,),
+        'PUSH': ('push',),
+        'PUSHDATA': ('push', db.REQUESTS_DATA_VERSION),
+        'PUSHES': (db.PUSHES_DATA_VERSION,),
+        'PUSHCONTENTS': ('push', db.REQUESTS_DATA_VERSION),
+        'PUSHBYREQUEST': (db.PUSHES_DATA_VERSION, db.REQUESTS_DATA_VERSION),
+        'PUSHITEMS': ('push', db.REQUESTS_DATA_VERSION),
+        'REQUESTSEARCH': (db.REQUESTS_DATA_VERSION,),
+    }
+
+    # Endpoints writing their body through stream_fn when given one.
+    # Streamed responses are not shared between identical calls.
+    STREAMING_ENDPOINTS = ('REQUESTSEARCH',)
+
+    def __init__(self, arguments, io_loop=None, readonly=False):
+        # util.get_*_arg read the arguments attribute, the same way
+        # they read tornado requests.
+        self.arguments = arguments
+        self.io_loop = io_loop
+        self.readonly = readonly
+        self.callback = None
+        self.stream_fn = None
+
+    @classmethod
+    def has_endpoint(cls, endpoint):
+        return hasattr(cls, '_api_%s' % endpoint.upper())
+
+    def call(self, endpoint, callback, if_none_match=None, stream_fn=None):
+        """Run endpoint and pass its APIResponse to callback.
+
+        The push_data_versions the endpoint depends on are read first.
+        If the ETag they make is in if_none_match (an If-None-Match
+        header value) the endpoint is not run and the response is
+        not_modified.
+
+        Endpoints which can stream (REQUESTSEARCH) write their JSON
+        body in pieces as rows are read when stream_fn is given. It is
+        called with (chunk, resume), and must call resume(True) when
+        it is ready for the next chunk or resume(False) to stop; the
+        last chunk comes with resume None. The callback then gets a
+        streamed response without data.
+        """
+        self.callback = callback
+        self.stream_fn = stream_fn
+        if not self.has_endpoint(endpoint):
+            return self._error(404)
+        # Endpoints from URLs are unicode, keep ETags the same as for
+        # in-process calls.
+        self.endpoint = str(endpoint.upper())
+
+        if self.endpoint == 'PUSHITEMS':
+            push_ids = util.get_int_args(self, 'push_id')[:MAX_BATCH_IDS]
+        else:
+            push_ids = [util.get_int_arg(self, 'id')]
+        self.version_names = ()
+        for name in self.DATA_VERSIONS[self.endpoint]:
+            if name == 'push':
+                self.version_names += tuple(db.push_data_version(push_id) for push_id in push_ids)
+            else:
+                self.version_names += (name,)
+        self.if_none_match = if_none_match
+        self._execute(db.data_versions_query(*self.version_names), self._on_versions_db_response)
+
+    def _on_versions_db_response(self, success, db_results):
+        if not success:
+            return self._error(500)
+
+        # Versions are read before the data, so an ETag can only be
+        # older than the data it is sent with, never newer.
+        versions = dict(db_results.fetchall())
+        self.versions = tuple(versions.get(name, 0) for name in self.version_names)
+        self.etag = '"%s"' % hashlib.sha1(
+            repr((__version__, self.endpoint, self.version_names, self.versions))
+        ).hexdigest()
+        if self.if_none_match and self.etag in self.if_none_match:
+            return self.callback(APIResponse(etag=self.etag, not_modified=True))
+
+        if self.stream_fn and self.endpoint in self.STREAMING_ENDPOINTS:
+            return self._run_endpoint(self.callback)
+
+        key = (
+            self.endpoint,
+            self.readonly,
+            self.versions,
+            tuple(sorted((name, tuple(values)) for name, values in self.arguments.iteritems())),
+        )
+        return coalesced_reads.call(key, self._run_endpoint, self.callback)
+
+    def _run_endpoint(self, callback):
+        self.callback = callback
+        return getattr(self, '_api_%s' % self.endpoint)()
+
+    def _result(self, data):
+        return self.callback(APIResponse(data=data, etag=self.etag))
+
+    def _error(self, status_code):
+        return self.callback(APIResponse(error=status_code))
+
+    def _execute(self, query, callback_fn):
+        db.execute_async_cb(
+            query,
+            callback_fn,
+            io_loop=self.io_loop,
+            readonly=self.readonly,
+        )
+
+    def _execute_transaction(self, queries, callback_fn):
+        db.execute_transaction_async_cb(
+            queries,
+            callback_fn,
+            io_loop=self.io_loop,
+            readonly=self.readonly,
+        )
+
+    def _stream(self, query):
+        """Write the rows of query as a JSON list through stream_fn,
+        one chunk of STREAM_CHUNK_SIZE rows at a time.
+        """
+        self.streamed_rows = 0
+        db.stream_async_cb(
+            query,
+            self._on_stream_chunk,
+            self._on_stream_done,
+            chunk_size=STREAM_CHUNK_SIZE,
+            io_loop=self.io_loop,
+            readonly=self.readonly,
+        )
+
+    def _on_stream_chunk(self, rows, resume):
+        # Same separators as json.dumps of the whole list
+        chunk = ', '.join(json.dumps(row) for row in util.rows_to_jsonable(rows))
+        chunk = (', ' if self.streamed_rows else '[') + chunk
+        self.streamed_rows += len(rows)
+        self.stream_fn(chunk, resume)
+
+    def _on_stream_done(self, success):
+        if not success:
+            return self.callback(APIResponse(error=500, streamed=self.streamed_rows > 0))
+
+        self.stream_fn(']' if self.streamed_rows else '[]', None)
+        return self.callback(APIResponse(etag=self.etag, streamed=True))
+
+    def _request_columns(self, keys, table=db.push_requests):
+        """push_requests (or table) columns to select for a list view:
+        the given keys, or every serialized column if detail=1 was passed.
+        """
+        if util.get_int_arg(self, 'detail'):
+            keys = util.REQUEST_JSON_KEYS
+        return [table.c[key] for key in keys]
+
+    def _api_USERLIST(self):
+        """Returns a JSON list of users who used PushManager for a request at least once."""
+        query = SA.select([db.push_users.c.user], order_by=db.push_users.c.user)
+        self._execute(query, self._on_USERLIST_db_response)
+
+    def _on_USERLIST_db_response(self, success, db_results):
+        if not success:
+            return self._error(500)
+        return self._result([r['user'] for r in db_results])
+
+    def _api_USERSEARCH(self):
+        """Returns a JSON list of the users whose name starts with the
+        prefix argument, most recently seen first, for autocompletion.
+        At most limit (default 10) users are returned.
+        """
+        prefix = util.get_str_arg(self, 'prefix', '')
+        limit = min(util.get_int_arg(self, 'limit', 10), MAX_USERSEARCH_LIMIT)
+        if not prefix or limit < 1:
+            return self._result([])
+
+        query = SA.select(
+            [db.push_users.c.user],
+            db.users_with_prefix(prefix),
+            order_by=(db.push_users.c.last_seen.desc(), db.push_users.c.user),
+        ).limit(limit)
+        self._execute(query, self._on_USERLIST_db_response)
+
+    def _api_REQUEST(self):
+        """Returns a JSON representation of a push request."""
+        request_id = util.get_int_arg(self, 'id')
+        if not request_id:
+            return self._error(404)
+
+        query = db.select_with_archive(db.push_requests, lambda t: t.c.id == request_id)
+        self._execute(query, self._on_REQUEST_db_response)
+
+    def _on_REQUEST_db_response(self, success, db_results):
+        if not success:
+            return self._error(500)
+
+        request = db_results.first()
+        if not request:
+            return self._error(404)
+        else:
+            return self._result(util.request_to_jsonable(request))
+
+    def _api_REQUESTS(self):
+        """Returns a JSON list of the push requests given in the id
+        arguments, in that order. Unknown ids are left out.
+        """
+        self.request_ids = util.get_int_args(self, 'id')
+        if not self.request_ids:
+            return self._error(404)
+        if len(self.request_ids) > MAX_BATCH_IDS:
+            return self._error(409)
+
+        query = db.select_with_archive(db.push_requests, lambda t: t.c.id.in_(self.request_ids))
+        self._execute(query, self._on_REQUESTS_db_response)
+
+    def _on_REQUESTS_db_response(self, success, db_results):
+        if not success:
+            return self._error(500)
+
+        requests = dict((request['id'], util.request_to_jsonable(request)) for request in db_results)
+        return self._result([requests[request_id] for request_id in self.request_ids if request_id in requests])
+
+    def _api_PUSH(self):
+        """Returns a JSON representation of a push."""
+        push_id = util.get_int_arg(self, 'id')
+        if not push_id:
+            return self._error(404)
+
+        query = db.select_with_archive(db.push_pushes, lambda t: t.c.id == push_id)
+        self._execute(query, self._on_PUSH_db_response)
+
+    def _on_PUSH_db_response(self, success, db_results):
+        if not success:
+            return self._error(500)
+
+        push = db_results.first()
+        if not push:
+            return self._error(404)
+        else:
+            return self._result(util.push_to_jsonable(push))
+
+    def _api_PUSHDATA(self):
+        """Returns all the information on a push in JSON. This is the same data that is shown on the push page.
+
+        With since=TIMESTAMP only the requests of the push and the
+        available ones modified after it are returned, see
+        _api_PUSHDATA_since.
+        """
+        self.push_id = util.get_int_arg(self, 'id')
+        if not self.push_id:
+            return self._error(404)
+
+        since = util.get_int_arg(self, 'since')
+        if since is not None:
+            return self._api_PUSHDATA_since(since)
+
+        body = pushdata_cache.get(self.push_id, self.versions)
+        if body is not None:
+            return self.callback(APIResponse(body=body, etag=self.etag))
+
+        push_id = self.push_id
+        push_info_query = db.select_with_archive(db.push_pushes, lambda t: t.c.id == push_id)
+        contents_query = db.select_with_archive(
+            db.push_requests,
+            lambda t: SA.and_(
+                t.c.id == db.push_pushcontents.c.request,
+                db.push_pushcontents.c.push == push_id,
+            ),
+        )
+        available_query = db.push_requests.select(
+            db.push_requests.c.state == 'requested',
+        )
+        self._execute_transaction(
+            [push_info_query, contents_query, available_query],
+            self._on_PUSHDATA_db_response,
+        )
+
+    def _on_PUSHDATA_db_response(self, success, db_results):
+        if not success:
+            return self._error(500)
+
+        push_info, push_contents, available_requests = db_results
+        push_info = push_info.first()
+        if not push_info:
+            return self._error(404)
+        push_info = util.push_to_jsonable(push_info)
+
+        available_requests = [util.request_to_jsonable(r) for r in available_requests.fetchall()]
+        push_requests = {}
+        push_contents = sorted(push_contents, key=lambda r: (r['user'], r['title']))
+        for request in push_contents:
+            request = util.request_to_jsonable(request)
+            push_requests.setdefault(request['state'], []).append(request)
+            push_requests.setdefault('all', []).append(request)
+
+        response = APIResponse(data=[push_info, push_requests, available_requests], etag=self.etag)
+        pushdata_cache.set(self.push_id, self.versions, response.body)
+        return self.callback(response)
+
+    def _api_PUSHDATA_since(self, since):
+        """Returns the changes to the data of a push page since a
+        timestamp, as a dict of:
+
+        push: the push, as in the full response
+        requests: requests of the push modified since then, by state
+        available: requested requests modified since then
+        removed: ids of the other requests moved since then to a state
+          of PUSHDATA_REMOVED_STATES, which have left the push or the
+          requested state
+        since: timestamp to ask the next changes from
+
+        Changes near since may be returned twice.
+        """
+        self.next_since = int(time.time()) - PUSHDATA_SINCE_MARGIN
+        push_id = self.push_id
+        push_info_query = db.select_with_archive(db.push_pushes, lambda t: t.c.id == push_id)
+        in_push_query = SA.select(
+            [db.push_pushcontents.c.request],
+            db.push_pushcontents.c.push == push_id,
+        )
+        contents_query = db.push_requests.select(SA.and_(
+            db.push_requests.c.id.in_(in_push_query),
+            db.push_requests.c.modified >= since,
+        ))
+        available_query = db.push_requests.select(SA.and_(
+            db.push_requests.c.state == 'requested',
+            db.push_requests.c.modified >= since,
+        ))
+        # Only the ids of the other requests, most of which are in
+        # other pushes and never were on this page
+        removed_query = SA.select(
+            [db.push_requests.c.id],
+            SA.and_(
+                db.push_requests.c.state.in_(PUSHDATA_REMOVED_STATES),
+                db.push_requests.c.modified >= since,
+                ~db.push_requests.c.id.in_(in_push_query),
+            ),
+        )
+        self._execute_transaction(
+            [push_info_query, contents_query, available_query, removed_query],
+            self._on_PUSHDATA_since_db_response,
+        )
+
+    def _on_PUSHDATA_since_db_response(self, success, db_results):
+        if not success:
+            return self._error(500)
+
+        push_info, push_contents, available_requests, removed = db_results
+        push_info = push_info.first()
+        if not push_info:
+            return self._error(404)
+
+        push_requests = {}
+        push_contents = sorted(push_contents, key=lambda r: (r['user'], r['title']))
+        for request in push_contents:
+            request = util.request_to_jsonable(request)
+            push_requests.setdefault(request['state'], []).append(request)
+            push_requests.setdefault('all', []).append(request)
+        available_requests = [util.request_to_jsonable(r) for r in available_requests.fetchall()]
+        removed = [row['id'] for row in removed]
+
+        return self.callback(APIResponse(data={
+            'push': util.push_to_jsonable(push_info),
+            'requests': push_requests,
+            'available': available_requests,
+            'removed': removed,
+            'since': self.next_since,
+        }, etag=self.etag))
+
+    def _api_PUSHES(self):
+        """Returns a JSON representation of pushes, newest first, and
+        the number of pushes matching the filters.
+
+        Pages are either selected with offset or, without scanning
+        the skipped pushes, with a push_cursor: before=CURSOR returns
+        the pushes following it and after=CURSOR the ones preceding
+        it. The total is cached until pushes change; count=0 skips it
+        and returns null instead. Archived pushes are included.
+        """
+        rpp = util.get_int_arg(self, 'rpp', 50)
+        offset = util.get_int_arg(self, 'offset', 0)
+        state = util.get_str_arg(self, 'state', '')
+        user = util.get_str_arg(self, 'user', '')
+        before = util.parse_push_cursor(util.get_str_arg(self, 'before'))
+        after = util.parse_push_cursor(util.get_str_arg(self, 'after'))
+
+        def filters(table):
+            table_filters = []
+            if state != '':
+                table_filters.append(table.c.state == state)
+            if user != '':
+                table_filters.append(table.c.user == user)
+            return table_filters
+
+        def page_query(table):
+            modified, push_id = table.c.modified, table.c.id
+            page_filters = []
+            order_by = (modified.desc(), push_id.desc())
+            if before:
+                page_filters.append(SA.or_(
+                    modified < before[0],
+                    SA.and_(modified == before[0], push_id < before[1]),
+                ))
+            elif after:
+                page_filters.append(SA.or_(
+                    modified > after[0],
+                    SA.and_(modified == after[0], push_id > after[1]),
+                ))
+                # The closest newer pushes come first, results are put
+                # back in newest first order in _on_PUSHES_db_response.
+                order_by = (modified.asc(), push_id.asc())
+            query = SA.select(
+                [table.c[key] for key in util.PUSH_JSON_KEYS],
+                whereclause=SA.and_(*(filters(table) + page_filters)),
+                order_by=order_by,
+            )
+            if rpp > 0:
+                # Enough rows of each table for the page of both
+                query = query.limit(rpp + (offset if paged_by_offset else 0))
+            return query.alias().select()
+
+        paged_by_offset = offset > 0 and not (before or after)
+        self.reverse_pushes = bool(after and not before)
+        pushes = SA.union_all(*[page_query(table) for table in (db.push_pushes, db.push_pushes_archive)]).alias()
+        if self.reverse_pushes:
+            order_by = (pushes.c.modified.asc(), pushes.c.id.asc())
+        else:
+            order_by = (pushes.c.modified.desc(), pushes.c.id.desc())
+        push_query = SA.select([pushes.c[key] for key in util.PUSH_JSON_KEYS], order_by=order_by)
+
+        if paged_by_offset:
+            push_query = push_query.offset(offset)
+        if rpp > 0:
+            push_query = push_query.limit(rpp)
+        queries = [push_query]
+
+        self.count_key = (state, user)
+        self.pushes_count = None
+        if util.get_int_arg(self, 'count', 1):
+            self.pushes_count = pushes_count_cache.get(self.count_key, self.versions)
+            if self.pushes_count is None:
+                counts = [
+                    SA.select([SA.func.count()], SA.and_(*filters(table)), from_obj=[table]).as_scalar()
+                    for table in (db.push_pushes, db.push_pushes_archive)
+                ]
+                queries.append(SA.select([counts[0] + counts[1]]))
+
+        self._execute_transaction(queries, self._on_PUSHES_db_response)
+
+    def _on_PUSHES_db_response(self, success, db_results):
+        if not success:
+            return self._error(500)
+
+        push_results = util.rows_to_jsonable(db_results[0])
+        if self.reverse_pushes:
+            push_results.reverse()
+        if len(db_results) > 1:
+            self.pushes_count = db_results[1].first()[0]
+            pushes_count_cache.set(self.count_key, self.versions, self.pushes_count)
+
+        def accepting_first(current, previous):
+            # swap only if current push is accepting and previous push not accepting
+            if current['state'] == 'accepting' and previous['state'] != 'accepting':
+                return -1
+            return 0
+
+        push_results = sorted(push_results, cmp=accepting_first)
+        return self._result([push_results, self.pushes_count])
+
+    def _api_PUSHCONTENTS(self):
+        """Returns a set of JSON representations of requests in a given push."""
+        push_id = util.get_int_arg(self, 'id')
+        if not push_id:
+            return self._error(404)
+
+        query = db.select_with_archive(
+            db.push_requests,
+            lambda t: SA.and_(
+                t.c.id == db.push_pushcontents.c.request,
+                db.push_pushcontents.c.push == push_id,
+            ),
+        )
+        self._execute(query, self._on_PUSHCONTENTS_db_response)
+
+    def _on_PUSHCONTENTS_db_response(self, success, db_results):
+        if not success:
+            return self._error(500)
+
+        requests = [util.request_to_jsonable(request) for request in db_results]
+        return self._result(requests)
+
+    def _api_PUSHBYREQUEST(self):
+        """Returns a JSON representation of a PUSH given a request id."""
+        request_id = util.get_int_arg(self, 'id')
+        if not request_id:
+            return self._error(404)
+
+        query = db.select_with_archive(
+            db.push_pushes,
+            lambda t: SA.and_(
+                t.c.state != "discarded",
+                db.push_pushcontents.c.push == t.c.id,
+                db.push_pushcontents.c.request == request_id,
+            ),
+        )
+        self._execute(query, self._on_PUSHBYREQUEST_db_response)
+
+    def _on_PUSHBYREQUEST_db_response(self, success, db_results):
+        if not success:
+            return self._error(500)
+
+        push = db_results.first()
+        return self._result(util.push_to_jsonable(push))
+
+    def _api_PUSHITEMS(self):
+        """Returns a JSON representation of a list of requests given a
+        push id, or several push_id arguments for the requests of many
+        pushes at once. The push of each request is in its push field.
+        """
+        push_ids = util.get_int_args(self, 'push_id')
+        if not push_ids:
+            return self._error(404)
+        if len(push_ids) > MAX_BATCH_IDS:
+            return self._error(409)
+
+        # Requests of archived pushes are in the archive table
+        query = SA.union_all(
+            *[
+                SA.select(
+                    self._request_columns(self.PUSHITEMS_KEYS, table) + [db.push_pushcontents.c.push],
+                    SA.and_(
+                        table.c.id == db.push_pushcontents.c.request,
+                        table.c.state != 'pickme',
+                        db.push_pushcontents.c.push.in_(push_ids),
+                    ),
+                )
+                for table in (db.push_requests, db.push_requests_archive)
+            ]
+        ).order_by('user', 'title')
+        self._execute(query, self._on_PUSHITEMS_db_response)
+
+    def _on_PUSHITEMS_db_response(self, success, db_results):
+        if not success:
+            return self._error(500)
+        return self._result(util.rows_to_jsonable(db_results))
+
+    def _api_REQUESTSEARCH(self):
+        """Returns a list of requests matching a the specified filter(s).
+        Large text fields are only included with detail=1. Requests are
+        returned newest first, or most relevant first for a full-text
+        search of titles and descriptions with q.
+        """
+        filters = []
+        order_by = []
+
+        # Full-text constraint
+        text = util.get_str_arg(self, 'q', '')
+        if text:
+            fulltext_filter, relevance = db.requests_matching(text)
+            filters.append(fulltext_filter)
+            if relevance is not None:
+                order_by.append(relevance)
+
+        # Tag constraint
+        for tag in self.arguments.get('tag', []):
+            filters.append(db.requests_with_tag(tag))
+
+        # Timestamp constraint
+        mbefore = util.get_int_arg(self, 'mbefore')
+        mafter = util.get_int_arg(self, 'mafter')
+        if mbefore:
+            filters.append(db.push_requests.c.modified < mbefore)
+        if mafter:
+            filters.append(db.push_requests.c.modified > mafter)
+
+        cbefore = util.get_int_arg(self, 'cbefore')
+        cafter = util.get_int_arg(self, 'cafter')
+        if cbefore:
+            filters.append(db.push_requests.c.created < cbefore)
+        if cafter:
+            filters.append(db.push_requests.c.created > cafter)
+
+        # State constraint
+        states = self.arguments.get('state', [])
+        if states:
+            filters.append(db.push_requests.c.state.in_(states))
+
+        # User constraint
+        users = self.arguments.get('user', [])
+        if users:
+            filters.append(db.push_requests.c.user.in_(users))
+
+        # Repository constraint
+        repos = self.arguments.get('repo', [])
+        if repos:
+            filters.append(db.push_requests.c.repo.in_(repos))
+
+        # Branch constraint
+        branches = self.arguments.get('branch', [])
+        if branches:
+            filters.append(db.push_requests.c.branch.in_(branches))
+
+        # Revision constraint
+        revisions = self.arguments.get('rev', [])
+        if revisions:
+            filters.append(db.push_requests.c.revision.in_(revisions))
+
+        # Review constraint
+        reviews = self.arguments.get('review', [])
+        if reviews:
+            filters.append(db.push_requests.c.reviewid.in_(reviews))
+
+        # Title constraint
+        for title in self.arguments.get('title', []):
+            filters.append(db.push_requests.c.title.like('%' + title + '%'))
+
+        # Only allow searches with at least one constraint (to avoid
+        # accidental dumps of the entire table)
+        if not filters:
+            return self._error(409)
+
+        query = SA.select(self._request_columns(util.REQUEST_SUMMARY_KEYS), SA.and_(*filters))
+        query = query.order_by(*(order_by + [db.push_requests.c.id.desc()]))
+
+        limit = util.get_int_arg(self, 'limit')
+        if limit > 0:
+            limit = max(min(1000, limit), 1)
+            query = query.limit(limit)
+
+        if self.stream_fn:
+            return self._stream(query)
+        self._execute(query, self._on_REQUESTSEARCH_db_response)
+
+    def _on_REQUESTSEARCH_db_response(self, success, db_results):
+        if not success:
+            return self._error(500)
+
+        return self._result(util.rows_to_jsonable(db_results))
@@ -0,0 +1,120 @@
+import functools
+import logging
+import time
+from collections import OrderedDict
+
+import tornado.stack_context
+
+
+class VersionedCache(object):
+    """Bounded in-memory cache of values tagged with a version.
+
+    get() only returns a value stored under the same version, so
+    bumping the version of a key invalidates it everywhere without
+    telling the caches. Least recently used entries are evicted past
+    max_size entries. Not thread safe, use it from the IOLoop.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, version):
+        entry = self.entries.pop(key, None)
+        if entry is None or entry[0] != version:
+            self.misses += 1
+            return None
+        self.entries[key] = entry
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key, version, value):
+        if self.max_size < 1:
+            return
+        self.entries.pop(key, None)
+        self.entries[key] = (version, value)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def as_dict(self):
+        return {
+            'size': len(self.entries),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': float(self.hits) / (self.hits + self.misses) if self.hits else 0.0,
+        }
+
+
+class SingleFlight(object):
+    """Collapses concurrent identical calls onto the first one.
+
+    call(key, fn, callback) runs fn(done) unless a call with the same
+    key is still in flight; the result fn passes to done goes to the
+    callbacks of every call made for the key in the meantime, through
+    copy() for all but the first one if copy is given. Nothing is kept
+    once the result is delivered. A call still in flight after timeout
+    seconds is given up on: later calls with its key run fn again. Not
+    thread safe, use it from the IOLoop.
+    """
+
+    def __init__(self, timeout=30, copy=None):
+        self.timeout = timeout
+        self.copy = copy
+        # Running calls by key, as (start time, callbacks) tuples
+        self.in_flight = {}
+        self.calls = 0
+        self.coalesced = 0
+        self.expired = 0
+
+    def call(self, key, fn, callback):
+        self.calls += 1
+        callback = tornado.stack_context.wrap(callback)
+        flight = self.in_flight.get(key)
+        if flight is not None and time.time() - flight[0] < self.timeout:
+            self.coalesced += 1
+            flight[1].append(callback)
+            return
+        if flight is not None:
+            self.expired += 1
+            logging.error("Giving up on coalesced call %r after %ds", key, self.timeout)
+        flight = (time.time(), [callback])
+        self.in_flight[key] = flight
+        try:
+            fn(functools.partial(self._done, key, flight))
+        except Exception:
+            self._forget(key, flight)
+            raise
+
+    def _forget(self, key, flight):
+        if self.in_flight.get(key) is flight:
+            del self.in_flight[key]
+
+    def _done(self, key, flight, result):
+        self._forget(key, flight)
+        for i, callback in enumerate(flight[1]):
+            try:
+                callback(self.copy(result) if i and self.copy else result)
+            except Exception:
+                logging.exception("Error in callback of coalesced call %r", key)
+
+    def clear(self):
+        self.in_flight.clear()
+        self.calls = 0
+        self.coalesced = 0
+        self.expired = 0
+
+    def as_dict(self):
+        return {
+            'in_flight': len(self.in_flight),
+            'calls': self.calls,
+            'coalesced': self.coalesced,
+            'expired': self.expired,
+        }
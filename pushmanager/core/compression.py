@@ -0,0 +1,52 @@
+"""gzip compression of responses.
+
+Dynamic responses are compressed on the fly by GZipContentEncoding.
+Static files are compressed once by tools/compress_static.py and the
+.gz copies served as-is by PrecompressedStaticFileHandler.
+"""
+import os
+
+import tornado.web
+from pushmanager.core.settings import Settings
+
+
+class GZipContentEncoding(tornado.web.GZipContentEncoding):
+    """tornado's gzip transform with a configurable size threshold:
+    complete responses shorter than gzip_min_length bytes are not worth
+    the CPU. Streamed responses are always compressed.
+    """
+    MIN_LENGTH = Settings.get('gzip_min_length', 1024)
+
+    def transform_first_chunk(self, status_code, headers, chunk, finishing):
+        ctype = headers.get("Content-Type", "").split(";")[0]
+        if ctype in self.CONTENT_TYPES and "Vary" not in headers:
+            headers["Vary"] = "Accept-Encoding"
+        return super(GZipContentEncoding, self).transform_first_chunk(status_code, headers, chunk, finishing)
+
+
+# Output transforms of the pushmanager applications.
+TRANSFORMS = [GZipContentEncoding, tornado.web.ChunkedTransferEncoding]
+
+
+class PrecompressedStaticFileHandler(tornado.web.StaticFileHandler):
+    """Serve the gzipped copy of a static file, path.gz, to clients
+    which accept gzip, if there is one at least as recent as the file.
+    """
+
+    def parse_url_path(self, url_path):
+        path = super(PrecompressedStaticFileHandler, self).parse_url_path(url_path)
+        self.precompressed = False
+        if "gzip" in self.request.headers.get("Accept-Encoding", ""):
+            abspath = os.path.join(self.root, path)
+            gzip_abspath = abspath + ".gz"
+            if os.path.isfile(abspath) and os.path.isfile(gzip_abspath) and \
+                    os.path.getmtime(gzip_abspath) >= os.path.getmtime(abspath):
+                self.precompressed = True
+                return path + ".gz"
+        return path
+
+    def set_extra_headers(self, path):
+        # The Content-Type is guessed from the name of the uncompressed file
+        self.set_header("Vary", "Accept-Encoding")
+        if self.precompressed:
+            self.set_header("Content-Encoding", "gzip")
@@ -1,21 +1,52 @@
+import functools
 import logging
+import os
+import re
+import threading
+import time
+from multiprocessing.pool import ThreadPool
 
 import sqlalchemy as SA
+import tornado.ioloop
+import tornado.stack_context
 from sqlalchemy import Column
+from sqlalchemy import DDL
+from sqlalchemy import Index
 from sqlalchemy import Integer
 from sqlalchemy import SmallInteger
 from sqlalchemy import String
+from sqlalchemy import event
+from sqlalchemy import exc
 from sqlalchemy.dialects import mysql
 from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.sql.expression import ColumnElement
 from sqlalchemy.sql.expression import Insert
 
 from pushmanager.core.settings import Settings
+from pushmanager.core.util import tags_str_as_set
 
 
 engine = None
+engine_pid = None
+engine_config = None
+readonly_engine = None
+readonly_engine_config = None
+# Engines inherited from the parent process, see get_engine
+inherited_engines = []
+thread_pool = None
+stream_thread_pool = None
+thread_pool_pid = None
 Base = declarative_base()
 
+# Seconds a streaming db thread waits for its consumer, see stream_async_cb.
+STREAM_RESUME_TIMEOUT = 60
+
+
+class StreamTimeout(Exception):
+    """The consumer of a streamed query didn't resume it in time."""
+
 
 def UnsignedInteger():
     if Settings["db_uri"].startswith("mysql"):
@@ -30,6 +61,9 @@ class DatabaseError(Exception):
 
 class PushCheckList(Base):
     __tablename__ = "push_checklist"
+    __table_args__ = (
+        Index('ix_push_checklist_request', 'request'),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     request = Column(UnsignedInteger(), nullable=False)
@@ -38,6 +72,13 @@ class PushCheckList(Base):
     target = Column(String(50), nullable=True)
 
 
+class PushDataVersions(Base):
+    __tablename__ = "push_data_versions"
+
+    name = Column(String(64), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+
 class PushPlans(Base):
     __tablename__ = "push_plans"
 
@@ -49,6 +90,10 @@ class PushPlans(Base):
 
 class PushPushContents(Base):
     __tablename__ = "push_pushcontents"
+    # Lookups by request are served by the (request, push) primary key.
+    __table_args__ = (
+        Index('ix_push_pushcontents_push', 'push', 'request'),
+    )
 
     request = Column(Integer, primary_key=True, default=0)
     push = Column(Integer, primary_key=True, default=0)
@@ -56,6 +101,10 @@ class PushPushContents(Base):
 
 class PushPushes(Base):
     __tablename__ = "push_pushes"
+    __table_args__ = (
+        Index('ix_push_pushes_modified', 'modified'),
+        Index('ix_push_pushes_state_modified', 'state', 'modified', mysql_length={'state': 16}),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     title = Column(String)
@@ -81,8 +130,31 @@ class PushRemovals(Base):
     timestamp = Column(UnsignedInteger(), nullable=False)
 
 
+class PushRequestTags(Base):
+    """One row per tag of a request, kept in sync with the comma
+    separated push_requests.tags column so that tag searches can use an
+    index.
+    """
+    __tablename__ = "push_request_tags"
+    __table_args__ = (
+        Index('ix_push_request_tags_tag', 'tag', 'request'),
+    )
+
+    request = Column(Integer, primary_key=True, autoincrement=False)
+    tag = Column(String(64), primary_key=True)
+
+
 class PushRequests(Base):
     __tablename__ = "push_requests"
+    # mysql_length only matters for the MySQL migration in
+    # pushplans/add_hot_indexes.sql, text columns need an index prefix.
+    __table_args__ = (
+        Index('ix_push_requests_state', 'state', mysql_length=16),
+        Index('ix_push_requests_revision', 'revision'),
+        Index('ix_push_requests_user', 'user', mysql_length=64),
+        Index('ix_push_requests_repo_branch', 'repo', 'branch', mysql_length={'repo': 64, 'branch': 128}),
+        Index('ix_push_requests_modified', 'modified'),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     user = Column(String)
@@ -93,7 +165,11 @@ class PushRequests(Base):
     tags = Column(String)
     conflicts = Column(String)
     created = Column(Integer, nullable=True)
-    modified = Column(Integer, nullable=True)
+    # Set by every UPDATE which does not set it itself, for the
+    # changes since a timestamp of /api/pushdata. This includes the
+    # conflict checks of the GitQueue and pickme bookkeeping, which
+    # change what push pages show as well.
+    modified = Column(Integer, nullable=True, onupdate=lambda: int(time.time()))
     title = Column(String)
     comments = Column(String)
     reviewid = Column(Integer, nullable=True)
@@ -101,18 +177,404 @@ class PushRequests(Base):
     watchers = Column(String, nullable=True)
 
 
+class PushUsers(Base):
+    """One row per user who ever created or took over a request, with
+    the times of the first and the latest time they did.
+    """
+    __tablename__ = "push_users"
+
+    user = Column(String(64), primary_key=True)
+    first_seen = Column(Integer, nullable=False)
+    last_seen = Column(Integer, nullable=False)
+
+
 push_checklist = PushCheckList.__table__
+push_data_versions = PushDataVersions.__table__
 push_requests = PushRequests.__table__
 push_plans = PushPlans.__table__
 push_pushes = PushPushes.__table__
 push_pushcontents = PushPushContents.__table__
 push_removals = PushRemovals.__table__
+push_request_tags = PushRequestTags.__table__
+push_users = PushUsers.__table__
+
+# Full-text index of request titles and descriptions. MySQL has the
+# ix_push_requests_fulltext FULLTEXT index on push_requests, sqlite an
+# FTS5 table kept in sync by triggers; both are created by
+# pushplans/add_request_fulltext.sql. The sqlite statements also run
+# when create_all creates push_requests.
+REQUESTS_FTS_SQLITE_DDL = (
+    "CREATE VIRTUAL TABLE push_requests_fts USING fts5("
+    "title, description, content='push_requests', content_rowid='id')",
+    "CREATE TRIGGER push_requests_fts_insert AFTER INSERT ON push_requests BEGIN "
+    "INSERT INTO push_requests_fts(rowid, title, description) "
+    "VALUES (new.id, new.title, new.description); END",
+    "CREATE TRIGGER push_requests_fts_delete AFTER DELETE ON push_requests BEGIN "
+    "INSERT INTO push_requests_fts(push_requests_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); END",
+    "CREATE TRIGGER push_requests_fts_update AFTER UPDATE OF title, description ON push_requests BEGIN "
+    "INSERT INTO push_requests_fts(push_requests_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); "
+    "INSERT INTO push_requests_fts(rowid, title, description) "
+    "VALUES (new.id, new.title, new.description); END",
+)
+for statement in REQUESTS_FTS_SQLITE_DDL:
+    event.listen(push_requests, 'after_create', DDL(statement).execute_if(dialect='sqlite'))
+
+
+def archive_table(table):
+    """Return the archive table of a hot table: same columns, keyed
+    by the original ids, without secondary indexes. Old live and
+    discarded rows are moved there by tools/archive_finished.py.
+    """
+    return SA.Table(
+        '%s_archive' % table.name,
+        Base.metadata,
+        *[
+            Column(c.name, c.type, primary_key=c.primary_key, nullable=c.nullable, autoincrement=False)
+            for c in table.columns
+        ]
+    )
+
+
+push_requests_archive = archive_table(push_requests)
+push_pushes_archive = archive_table(push_pushes)
+archive_tables = {
+    push_requests.name: push_requests_archive,
+    push_pushes.name: push_pushes_archive,
+}
+
+
+def select_with_archive(table, where_fn):
+    """SELECT the rows matching where_fn from table and from its
+    archive table. where_fn is called with each of the two tables and
+    returns the where clause for it. Meant for lookups by id, the
+    combined rows are not ordered.
+    """
+    return SA.union_all(*[
+        t.select(where_fn(t))
+        for t in (table, archive_tables[table.name])
+    ])
+
+
+def request_tags_queries(request_id, tags):
+    """Return the queries replacing the push_request_tags rows of a
+    request with the given comma separated tags string. Run them in the
+    same transaction as the push_requests.tags update.
+    """
+    queries = [push_request_tags.delete().where(push_request_tags.c.request == request_id)]
+    for tag in sorted(tags_str_as_set(tags or '')):
+        queries.append(push_request_tags.insert({'request': request_id, 'tag': tag}))
+    return queries
+
+
+def user_seen_queries(user, now=None):
+    """Return the queries recording that user created or took over a
+    request now: adding them to push_users or moving their last_seen.
+    """
+    now = int(now or time.time())
+    return [
+        InsertIgnore(push_users, {'user': user, 'first_seen': now, 'last_seen': now}),
+        push_users.update().where(push_users.c.user == user).values({'last_seen': now}),
+    ]
+
+
+def users_with_prefix(prefix):
+    """Return a push_users filter matching users whose name starts
+    with prefix, which is matched literally.
+    """
+    escaped = re.sub(r'([\\%_])', r'\\\1', prefix)
+    return push_users.c.user.like(escaped + '%', escape='\\')
+
+
+def requests_with_tag(tag):
+    """Return a push_requests filter matching requests tagged with tag."""
+    return push_requests.c.id.in_(
+        SA.select([push_request_tags.c.request]).where(push_request_tags.c.tag == tag)
+    )
+
+
+class FullTextScore(ColumnElement):
+    """MySQL relevance of rows for a natural language full-text query
+    on columns, which must make up a FULLTEXT index.
+    """
+    type = SA.Float()
+
+    def __init__(self, columns, text):
+        self.columns = columns
+        self.text = SA.literal(text)
+
+
+@compiles(FullTextScore, 'mysql')
+def compile_fulltext_score(score, compiler, **kw):
+    return 'MATCH (%s) AGAINST (%s IN NATURAL LANGUAGE MODE)' % (
+        ', '.join(compiler.process(column, **kw) for column in score.columns),
+        compiler.process(score.text, **kw),
+    )
+
+
+def requests_matching(text):
+    """Return a (filter, order_by) pair for a full-text search of text
+    in push_requests titles and descriptions, most relevant first.
+    """
+    if get_engine().dialect.name == 'mysql':
+        score = FullTextScore([push_requests.c.title, push_requests.c.description], text)
+        return score > 0, score.desc()
+
+    # Quote every word: the FTS5 query syntax is not for end users.
+    words = re.findall(r'\w+', text, re.UNICODE)
+    if not words:
+        return SA.false(), None
+    fts = SA.literal_column('push_requests_fts')
+    matches = SA.select(
+        [SA.literal_column('rowid').label('request'), SA.func.bm25(fts).label('score')],
+        fts.op('MATCH')(' '.join('"%s"' % word for word in words)),
+        from_obj=[SA.sql.expression.table('push_requests_fts')],
+    ).alias('fulltext')
+    # bm25 scores are negative, the best match has the lowest one.
+    return push_requests.c.id == matches.c.request, matches.c.score.asc()
+
+
+# push_data_versions names. Cached API responses and ETags are derived
+# from the versions the data was read at: the version of a push (its
+# row and push_pushcontents), of all pushes, of all requests and of
+# push_users.
+REQUESTS_DATA_VERSION = 'requests'
+PUSHES_DATA_VERSION = 'pushes'
+USERS_DATA_VERSION = 'users'
+
+
+def push_data_version(push_id):
+    return 'push:%s' % push_id
+
+
+def bump_data_versions_queries(*names):
+    """Return the queries incrementing the given push_data_versions.
+    Run them in the same transaction as the change they account for.
+    Bumping the version of a push also bumps PUSHES_DATA_VERSION.
+    """
+    names = set(names)
+    if any(name.startswith('push:') for name in names):
+        names.add(PUSHES_DATA_VERSION)
+
+    queries = []
+    for name in sorted(names):
+        queries.append(InsertIgnore(push_data_versions, {'name': name, 'version': 0}))
+        queries.append(push_data_versions.update().where(
+            push_data_versions.c.name == name
+        ).values({'version': push_data_versions.c.version + 1}))
+    return queries
+
+
+def data_versions_query(*names):
+    """SELECT the (name, version) rows of the given push_data_versions.
+    Names never bumped have no row, their version is 0.
+    """
+    return SA.select(
+        [push_data_versions.c.name, push_data_versions.c.version],
+        push_data_versions.c.name.in_(names),
+    )
+
+
+class PoolStats(object):
+    """Per-process connection pool counters.
+
+    checkout_wait is the time spent waiting for engine.connect() to
+    hand out a connection, exhausted counts checkouts that found every
+    pooled connection (including overflow) in use and timeouts counts
+    checkouts that gave up after pool timeout.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.checkouts = 0
+            self.checkout_wait_total = 0.0
+            self.checkout_wait_max = 0.0
+            self.exhausted = 0
+            self.timeouts = 0
+
+    def record_checkout(self, wait, exhausted):
+        with self.lock:
+            self.checkouts += 1
+            self.checkout_wait_total += wait
+            self.checkout_wait_max = max(self.checkout_wait_max, wait)
+            if exhausted:
+                self.exhausted += 1
+
+    def record_timeout(self):
+        with self.lock:
+            self.timeouts += 1
+            self.exhausted += 1
+
+    def as_dict(self):
+        with self.lock:
+            return {
+                'pid': os.getpid(),
+                'checkouts': self.checkouts,
+                'checkout_wait_total': self.checkout_wait_total,
+                'checkout_wait_max': self.checkout_wait_max,
+                'exhausted': self.exhausted,
+                'timeouts': self.timeouts,
+            }
+
+
+pool_stats = PoolStats()
+
+
+class QueryStats(object):
+    """Per-process query latency histograms and row counts, keyed by
+    query_label().
+
+    Every bucket counts the queries which took at most that many
+    seconds, queries slower than the last bucket are only counted in
+    the total. Row counts are the DB-API cursor rowcount: affected
+    rows for writes, fetched rows for MySQL selects. sqlite does not
+    report a rowcount for selects.
+    """
+
+    LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.queries = {}
+
+    def record(self, label, duration, rowcount):
+        with self.lock:
+            stats = self.queries.get(label)
+            if stats is None:
+                stats = self.queries[label] = {
+                    'count': 0,
+                    'time_total': 0.0,
+                    'time_max': 0.0,
+                    'rows': 0,
+                    'buckets': [0] * len(self.LATENCY_BUCKETS),
+                }
+            stats['count'] += 1
+            stats['time_total'] += duration
+            stats['time_max'] = max(stats['time_max'], duration)
+            if rowcount > 0:
+                stats['rows'] += rowcount
+            for i, bucket in enumerate(self.LATENCY_BUCKETS):
+                if duration <= bucket:
+                    stats['buckets'][i] += 1
+                    break
+
+    def as_dict(self):
+        with self.lock:
+            return {
+                'pid': os.getpid(),
+                'buckets': list(self.LATENCY_BUCKETS),
+                'queries': dict(
+                    (label, dict(stats, buckets=list(stats['buckets'])))
+                    for label, stats in self.queries.iteritems()
+                ),
+            }
+
+
+query_stats = QueryStats()
+slow_query_log = logging.getLogger('pushmanager.slow_query')
+
+QUERY_TABLE_RE = re.compile(r'\b(?:FROM|INTO|UPDATE)\s+[`"]?(\w+)', re.IGNORECASE)
+
+
+def query_label(statement):
+    """Short name of an SQL statement used to group query stats,
+    e.g. "SELECT push_requests".
+    """
+    words = statement.split(None, 1)
+    if not words:
+        return 'EMPTY'
+    table = QUERY_TABLE_RE.search(statement)
+    if table:
+        return '%s %s' % (words[0].upper(), table.group(1))
+    return words[0].upper()
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info['query_start_time'] = time.time()
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    duration = time.time() - conn.info.pop('query_start_time')
+    query_stats.record(query_label(statement), duration, cursor.rowcount)
+
+    threshold = Settings.get('db_slow_query_threshold')
+    if threshold is not None and duration >= threshold:
+        slow_query_log.warning("Slow query (%.3fs): %s %r", duration, statement, parameters)
+
+
+def configure_slow_query_log():
+    """Send slow queries to db_slow_query_log if it is set. Otherwise
+    they end up in the application log.
+    """
+    log_file = Settings.get('db_slow_query_log')
+    if log_file and not slow_query_log.handlers:
+        handler = logging.FileHandler(log_file)
+        handler.setFormatter(logging.Formatter("%(asctime)-15s [%(process)d] %(message)s"))
+        slow_query_log.addHandler(handler)
+        slow_query_log.propagate = False
+
+
+def get_pool_options(db_uri):
+    """Build create_engine keyword arguments from the db_pool section
+    of the configuration. Pool sizing only applies to QueuePool, which
+    sqlite does not use.
+    """
+    pool_settings = Settings.get('db_pool') or {}
+    options = {'pool_recycle': pool_settings.get('recycle', 3600)}
+    if not db_uri.startswith('sqlite'):
+        options.update({
+            'pool_size': pool_settings.get('size', 5),
+            'max_overflow': pool_settings.get('max_overflow', 10),
+            'pool_timeout': pool_settings.get('timeout', 30),
+        })
+    return options
+
+
+def ping_connection(dbapi_connection, connection_record, connection_proxy):
+    """Pessimistic disconnect handling: make sure a pooled connection
+    is still alive before handing it out. A DisconnectionError makes
+    the pool discard the connection and retry with a fresh one.
+    """
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute("SELECT 1")
+    except Exception:
+        raise exc.DisconnectionError()
+    finally:
+        cursor.close()
+
+
+def create_engine(db_uri, pool_options):
+    new_engine = SA.create_engine(db_uri, **pool_options)
+    event.listen(new_engine, 'before_cursor_execute', before_cursor_execute)
+    event.listen(new_engine, 'after_cursor_execute', after_cursor_execute)
+    if (Settings.get('db_pool') or {}).get('pre_ping', False):
+        event.listen(new_engine, 'checkout', ping_connection)
+    return new_engine
 
 
 def init_db():
-    global engine
+    global engine, engine_pid, engine_config, readonly_engine, readonly_engine_config
     if engine is None:
-        engine = SA.create_engine(Settings['db_uri'], pool_recycle=3600)
+        engine_config = (Settings['db_uri'], get_pool_options(Settings['db_uri']))
+        engine = create_engine(*engine_config)
+        engine_pid = os.getpid()
+        if Settings.get('db_uri_readonly'):
+            readonly_engine_config = (
+                Settings['db_uri_readonly'],
+                get_pool_options(Settings['db_uri_readonly']),
+            )
+            readonly_engine = create_engine(*readonly_engine_config)
+        configure_slow_query_log()
 
         if Settings["db_uri"].startswith("sqlite"):
             # Prepare tables when using sqlite database
@@ -120,15 +582,109 @@ def init_db():
             Base.metadata.create_all(engine)
 
 
-def finalize_db():
-    global engine
-    engine = None
+def get_engine(readonly=False):
+    """Return the engine for the current process.
+
+    PushManagerApp forks web workers and queue workers after init_db.
+    Pooled connections must never be shared between processes, so the
+    first call in a forked child replaces the inherited engines with
+    new ones. The inherited pools are deliberately not disposed:
+    closing their connections would also close them for the parent.
+    They are kept in inherited_engines for the life of the child, as
+    garbage collecting them would close their connections just the same.
+
+    With readonly set the db_uri_readonly replica engine is returned,
+    or the primary one if no replica is configured.
+    """
+    global engine, engine_pid, readonly_engine
+    if engine is not None and engine_pid != os.getpid():
+        inherited_engines.append(engine)
+        engine = create_engine(*engine_config)
+        if readonly_engine_config is not None:
+            inherited_engines.append(readonly_engine)
+            readonly_engine = create_engine(*readonly_engine_config)
+        engine_pid = os.getpid()
+        pool_stats.reset()
+        query_stats.reset()
+    if readonly and readonly_engine is not None:
+        return readonly_engine
+    return engine
+
+
+def connect(readonly=False):
+    """Check out a connection from the current process's pool (the
+    replica's if readonly is set), recording the checkout wait in
+    pool_stats.
+    """
+    current_engine = get_engine(readonly)
+    pool_options = engine_config[1]
+    if current_engine is readonly_engine:
+        pool_options = readonly_engine_config[1]
+    pool = current_engine.pool
+    exhausted = False
+    if isinstance(pool, QueuePool):
+        exhausted = pool.checkedout() >= pool.size() + pool_options['max_overflow']
+
+    start = time.time()
+    try:
+        conn = current_engine.connect()
+    except exc.TimeoutError:
+        pool_stats.record_timeout()
+        logging.error("Database connection pool exhausted in process %d", os.getpid())
+        raise
+    pool_stats.record_checkout(time.time() - start, exhausted)
+    return conn
 
 
-def execute_cb(query, callback_fn):
+def finalize_db():
+    global engine, engine_pid, engine_config, readonly_engine, readonly_engine_config
+    global thread_pool, stream_thread_pool, thread_pool_pid
+    engine = None
+    engine_pid = None
+    engine_config = None
+    readonly_engine = None
+    readonly_engine_config = None
+    pool_stats.reset()
+    query_stats.reset()
+    if thread_pool_pid == os.getpid():
+        for pool in (thread_pool, stream_thread_pool):
+            if pool is not None:
+                pool.terminate()
+    thread_pool = None
+    stream_thread_pool = None
+    thread_pool_pid = None
+
+
+def get_thread_pool(streams=False):
+    """Return the pool of threads used to run queries off the IOLoop,
+    or None if db_threads is not set. With streams set, return the
+    separate pool of db_stream_threads threads reading streamed
+    queries, which wait on slow clients and must not hold up the
+    others.
+
+    Threads do not survive a fork, so the pools are created lazily in
+    the process which is going to use them.
+    """
+    global thread_pool, stream_thread_pool, thread_pool_pid
+    if thread_pool_pid != os.getpid():
+        thread_pool = None
+        stream_thread_pool = None
+        thread_pool_pid = os.getpid()
+        if Settings.get('db_threads', 0) > 0:
+            thread_pool = ThreadPool(Settings['db_threads'])
+            stream_thread_pool = ThreadPool(Settings.get('db_stream_threads', 2))
+    return stream_thread_pool if streams else thread_pool
+
+
+def execute_cb(query, callback_fn, readonly=False):
+    """Execute a single query and call callback_fn with (success,
+    results). Set readonly for SELECTs which may be served by the
+    db_uri_readonly replica.
+    """
     success = True
+    conn = None
     try:
-        conn = engine.connect()
+        conn = connect(readonly)
         results = conn.execute(query)
     except Exception:
         results = None
@@ -136,15 +692,19 @@ def execute_cb(query, callback_fn):
         logging.error("Error executing query: %s" % str(query.compile()))
     finally:
         callback_fn(success, results)
-        conn.close()
+        if conn is not None:
+            conn.close()
 
 
-def execute_transaction_cb(queries, callback_fn, condition=None):
+def execute_transaction_cb(queries, callback_fn, condition=None, readonly=False):
     """Execute a list of queries in transaction.
 
     Aguments:
 
-    queries: a list of sqlalchemy queries.
+    queries: a list of sqlalchemy queries. Queries depending on the
+    results of the earlier ones, e.g. on the id of an inserted row, are
+    given as callables taking the list of results so far and returning
+    a list of queries, whose results are appended in turn.
 
     callback_fn: a callable to call after execution. callback_fn
     should accept two arguments, a boolean (success) and a list
@@ -154,11 +714,16 @@ def execute_transaction_cb(queries, callback_fn, condition=None):
     defined we'll execute the query and apply check function to the
     result. Only if check function returns true we'll move on with
     executing the querires list.
+
+    readonly: run the queries on the db_uri_readonly replica, if one is
+    configured. Only for transactions made of SELECTs, e.g. to read
+    several tables from the same snapshot.
     """
+    conn = None
     try:
         success = True
         results = []
-        conn = engine.connect()
+        conn = connect(readonly)
         transaction = conn.begin()
         try:
             if condition:
@@ -167,7 +732,10 @@ def execute_transaction_cb(queries, callback_fn, condition=None):
                     raise Exception("Condition failed: %s" % str(select.compile()))
 
             for query in queries:
-                results.append(conn.execute(query))
+                if callable(query):
+                    results.extend(conn.execute(q) for q in query(list(results)))
+                else:
+                    results.append(conn.execute(query))
             transaction.commit()
         except Exception, e:
             logging.error(e)
@@ -177,11 +745,191 @@ def execute_transaction_cb(queries, callback_fn, condition=None):
         results = None
         success = False
         logging.error(
-            "Error executing transaction: %s" % "\n".join([str(q.compile()) for q in queries])
+            "Error executing transaction: %s" % "\n".join(
+                [repr(q) if callable(q) else str(q.compile()) for q in queries]
+            )
         )
     finally:
         callback_fn(success, results)
-        conn.close()
+        if conn is not None:
+            conn.close()
+
+
+class BufferedResults(object):
+    """Fully fetched copy of a ResultProxy.
+
+    Results of queries executed in the thread pool are read before the
+    connection is released, so callbacks running on the IOLoop thread
+    never touch a connection owned by another thread.
+    """
+
+    def __init__(self, results):
+        self.rowcount = results.rowcount
+        self.lastrowid = results.lastrowid
+        self.returns_rows = results.returns_rows
+        self.rows = results.fetchall() if results.returns_rows else []
+        self.position = 0
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    def fetchone(self):
+        if self.position >= len(self.rows):
+            return None
+        self.position += 1
+        return self.rows[self.position - 1]
+
+    def fetchall(self):
+        rows = self.rows[self.position:]
+        self.position = len(self.rows)
+        return rows
+
+    def first(self):
+        row = self.fetchone()
+        self.close()
+        return row
+
+    def close(self):
+        self.position = len(self.rows)
+
+
+def _buffered_execute(execute_fn, *args, **kwargs):
+    """Run one of the execute_*cb functions and return its outcome as
+    a (success, buffered results) tuple. It never raises: the thread
+    pool would swallow the exception and the callback waiting on the
+    IOLoop would never run.
+    """
+    outcome = [(False, None)]
+
+    def on_db_return(success, db_results):
+        if not success:
+            return
+        if isinstance(db_results, list):
+            db_results = [BufferedResults(r) for r in db_results]
+        else:
+            db_results = BufferedResults(db_results)
+        outcome[0] = (success, db_results)
+
+    try:
+        execute_fn(*args, callback_fn=on_db_return, **kwargs)
+    except Exception:
+        logging.exception("Error running %r in the db thread pool", execute_fn)
+        return (False, None)
+    return outcome[0]
+
+
+def _execute_in_thread_pool(execute_fn, args, kwargs, callback_fn, io_loop):
+    pool = get_thread_pool()
+    if pool is None:
+        return execute_fn(*args, callback_fn=callback_fn, **kwargs)
+
+    io_loop = io_loop or tornado.ioloop.IOLoop.instance()
+    # Capture the caller's stack context (e.g. a RequestHandler's
+    # exception handler) while we are still on the IOLoop thread.
+    callback_fn = tornado.stack_context.wrap(callback_fn)
+
+    def on_thread_return(outcome):
+        io_loop.add_callback(functools.partial(callback_fn, *outcome))
+
+    pool.apply_async(
+        _buffered_execute,
+        (execute_fn,) + tuple(args),
+        kwargs,
+        callback=on_thread_return,
+    )
+
+
+def execute_async_cb(query, callback_fn, io_loop=None, readonly=False):
+    """Non-blocking version of execute_cb.
+
+    The query is executed in the db_threads pool and callback_fn is
+    called with (success, results) on the given IOLoop (defaults to
+    the global instance). Results are fully fetched BufferedResults.
+    If db_threads is not set the query is executed inline.
+    """
+    _execute_in_thread_pool(execute_cb, (query,), {'readonly': readonly}, callback_fn, io_loop)
+
+
+def execute_transaction_async_cb(queries, callback_fn, condition=None, io_loop=None, readonly=False):
+    """Non-blocking version of execute_transaction_cb. See
+    execute_async_cb.
+    """
+    _execute_in_thread_pool(
+        execute_transaction_cb,
+        (queries,),
+        {'condition': condition, 'readonly': readonly},
+        callback_fn,
+        io_loop,
+    )
+
+
+def stream_cb(query, chunk_fn, callback_fn, chunk_size=500, readonly=False):
+    """Execute a SELECT and pass its rows to chunk_fn in lists of at
+    most chunk_size rows, read from a server-side cursor where the
+    driver supports one. Reading stops when chunk_fn returns False.
+    callback_fn is called with success once done.
+    """
+    success = True
+    conn = None
+    try:
+        conn = connect(readonly)
+        results = conn.execution_options(stream_results=True).execute(query)
+        while True:
+            rows = results.fetchmany(chunk_size)
+            if not rows or not chunk_fn(rows):
+                break
+        results.close()
+    except Exception:
+        success = False
+        logging.error("Error streaming query: %s" % str(query.compile()))
+    finally:
+        if conn is not None:
+            conn.close()
+    callback_fn(success)
+
+
+def stream_async_cb(query, chunk_fn, callback_fn, chunk_size=500, io_loop=None, readonly=False):
+    """Non-blocking version of stream_cb.
+
+    chunk_fn is called with (rows, resume) on the IOLoop and must call
+    resume(True) once it is ready for the next chunk, e.g. from a flush
+    callback, or resume(False) to stop. The db thread waits for it, so
+    at most one chunk is in memory but the thread is held for as long
+    as the consumer takes; it gives up after STREAM_RESUME_TIMEOUT
+    seconds and the stream fails. Streams are read by the
+    db_stream_threads pool, so at most that many run at once and the
+    others wait for a thread. If db_threads is not set the query is
+    read inline and only a resume(False) made within chunk_fn stops it.
+    """
+    pool = get_thread_pool(streams=True)
+    io_loop = io_loop or tornado.ioloop.IOLoop.instance()
+    chunk_fn = tornado.stack_context.wrap(chunk_fn)
+    callback_fn = tornado.stack_context.wrap(callback_fn)
+
+    if pool is None:
+        def read_chunk(rows):
+            more = [True]
+            chunk_fn(rows, lambda resume_reading: more.__setitem__(0, resume_reading))
+            return more[0]
+        return stream_cb(query, read_chunk, callback_fn, chunk_size, readonly)
+
+    def wait_for_chunk(rows):
+        more = [False]
+        resumed = threading.Event()
+
+        def resume(resume_reading):
+            more[0] = resume_reading
+            resumed.set()
+
+        io_loop.add_callback(functools.partial(chunk_fn, rows, resume))
+        if not resumed.wait(STREAM_RESUME_TIMEOUT):
+            raise StreamTimeout()
+        return more[0]
+
+    def on_stream_done(success):
+        io_loop.add_callback(functools.partial(callback_fn, success))
+
+    pool.apply_async(stream_cb, (query, wait_for_chunk, on_stream_done, chunk_size, readonly))
 
 
 class InsertIgnore(Insert):
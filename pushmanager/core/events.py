@@ -0,0 +1,266 @@
+"""Change events for open push pages.
+
+Servlets publish an event once a change they made is committed, and
+PushEventsServlet hands them to push pages waiting in a long poll.
+Events are published on channels named after the push_data_versions
+the change bumped: the version of a push for changes to the push and
+REQUESTS_DATA_VERSION for changes to requests, which may show in the
+available requests of any push page.
+
+With an EventBus, events published in any process of the host reach
+the hubs of all web workers.
+"""
+import errno
+import json
+import logging
+import os
+import socket
+import time
+
+import tornado.stack_context
+
+
+class EventHub(object):
+    """Recent events of this process and the callbacks waiting for
+    new ones.
+
+    Events are dicts with the channel, kind and fields given to
+    publish(), plus the time, origin (pid) and seq (per process
+    number) the publishing process gave them and an id made of the
+    last two. Events relayed from other processes keep their time, so
+    a time cursor means the same in every process. Only the latest
+    max_events are kept; waiting for events from before the oldest one
+    kept gets a single 'resync' event instead, after which everything
+    should be reloaded. A 'resync' event is also added, on every
+    channel, when events relayed from a process are found missing.
+    Not thread safe, use it from the IOLoop.
+    """
+
+    # Seconds by which a relayed event may arrive after events with a
+    # later time. Waiters get the events this much older than their
+    # cursor again, unless they say they have seen them.
+    RELAY_MARGIN = 2
+
+    def __init__(self, max_events=1000):
+        self.max_events = max_events
+        # Ordered by time
+        self.events = []
+        # Time of the latest event dropped from events
+        self.horizon = 0
+        self.waiters = []
+        self.published = 0
+        self.seq = 0
+        # Latest seq added, by origin
+        self.origin_seqs = {}
+        # EventBus relaying events between processes, if any
+        self.bus = None
+
+    def publish(self, channel, kind, **fields):
+        """Add an event and send it to the other processes on the bus."""
+        self.seq += 1
+        event = dict(fields, channel=channel, kind=kind, time=time.time(), origin=os.getpid(), seq=self.seq)
+        event['id'] = '%d-%d' % (event['origin'], event['seq'])
+        self.add(event)
+        if self.bus is not None:
+            self.bus.send(event)
+        return event
+
+    def add(self, event):
+        """Add an event published by this process or relayed from
+        another one and hand it to the callbacks waiting for it.
+        """
+        last_seq = self.origin_seqs.get(event['origin'])
+        self.origin_seqs[event['origin']] = max(event['seq'], last_seq or 0)
+        if last_seq is not None and event['seq'] > last_seq + 1:
+            logging.warning("Missed %d events from process %d", event['seq'] - last_seq - 1, event['origin'])
+            self._add(self._resync_event(event['time']))
+        self._add(event)
+        self.published += 1
+        return event
+
+    def _resync_event(self, event_time):
+        return {'channel': None, 'kind': 'resync', 'time': event_time, 'id': 'resync-%f' % event_time}
+
+    def _add(self, event):
+        position = len(self.events)
+        while position and self.events[position - 1]['time'] > event['time']:
+            position -= 1
+        self.events.insert(position, event)
+        if len(self.events) > self.max_events:
+            dropped = len(self.events) - self.max_events
+            self.horizon = self.events[dropped - 1]['time']
+            del self.events[:dropped]
+
+        waiters, self.waiters = self.waiters, []
+        for waiter in waiters:
+            channels, since, seen, callback = waiter
+            if self._wanted(event, channels, since, seen):
+                callback([event])
+            else:
+                self.waiters.append(waiter)
+
+    def _wanted(self, event, channels, since, seen):
+        return (
+            (event['channel'] in channels or event['kind'] == 'resync') and
+            event['time'] > since - self.RELAY_MARGIN and
+            event['id'] not in seen
+        )
+
+    def events_since(self, channels, since, seen=()):
+        """Return the events on channels published after since, or up
+        to RELAY_MARGIN seconds before it and whose id is not in seen.
+        """
+        if since < self.horizon:
+            return [self._resync_event(self.events[-1]['time'])]
+        return [e for e in self.events if self._wanted(e, channels, since, seen)]
+
+    def wait(self, channels, since, callback, seen=()):
+        """Call callback with the list of events_since(channels, since,
+        seen): right away if there are some, otherwise on the next one.
+        Returns a handle for cancel() when callback is left waiting,
+        None otherwise.
+        """
+        events = self.events_since(channels, since, seen)
+        if events:
+            callback(events)
+            return None
+        waiter = (frozenset(channels), since, frozenset(seen), tornado.stack_context.wrap(callback))
+        self.waiters.append(waiter)
+        return waiter
+
+    def cancel(self, waiter):
+        if waiter in self.waiters:
+            self.waiters.remove(waiter)
+
+    def clear(self):
+        del self.events[:]
+        self.horizon = 0
+        self.waiters = []
+        self.published = 0
+        self.origin_seqs.clear()
+
+    def as_dict(self):
+        return {
+            'events': len(self.events),
+            'max_events': self.max_events,
+            'waiters': len(self.waiters),
+            'published': self.published,
+        }
+
+
+hub = EventHub()
+
+
+def publish_changes(version_names, kind, **fields):
+    """Publish a kind event on the channel of each of the
+    push_data_versions names a committed change bumped.
+    """
+    for name in version_names:
+        hub.publish(name, kind, **fields)
+
+
+class EventBus(object):
+    """Relays the events published in any pushmanager process, web
+    workers and queue workers alike, to the EventHub of every process
+    listening on the host.
+
+    Each listening process binds a Unix datagram socket named after its
+    pid in the bus directory, and events are sent as JSON to every
+    socket there but its own. Sockets left behind by processes which
+    are gone are removed by the first send that finds nobody reading
+    them. Events which don't fit in the buffer of a busy listener are
+    dropped; its hub notices the gap in their seqs with the next event
+    from the same process and adds a 'resync' event.
+    """
+
+    # Largest event sent, in bytes
+    MAX_EVENT_SIZE = 8192
+
+    def __init__(self, path, hub):
+        self.path = path
+        self.hub = hub
+        self.socket = None
+        self.socket_path = None
+        self.sender = None
+        self.sender_pid = None
+        if not os.path.isdir(path):
+            os.makedirs(path)
+
+    def listen(self, io_loop, name=None):
+        """Receive the events sent by other processes into hub, from
+        the IOLoop. Call it in each process once it is forked.
+        """
+        self.socket_path = os.path.join(self.path, '%s.sock' % (name or os.getpid()))
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.socket.setblocking(0)
+        self.socket.bind(self.socket_path)
+        # Web workers drop privileges after binding
+        os.chmod(self.socket_path, 0o666)
+        io_loop.add_handler(self.socket.fileno(), self._on_readable, io_loop.READ)
+
+    def _on_readable(self, fd, events):
+        while True:
+            try:
+                data = self.socket.recv(self.MAX_EVENT_SIZE)
+            except socket.error as e:
+                if e.args[0] in (errno.EAGAIN, errno.EWOULDBLOCK):
+                    return
+                raise
+            try:
+                event = json.loads(data)
+            except ValueError:
+                logging.warning("Dropping malformed event bus message %r", data[:100])
+                continue
+            self.hub.add(event)
+
+    def _get_sender(self):
+        if self.socket is not None:
+            return self.socket
+        # Sockets aren't shared with the processes forked from this one
+        if self.sender is None or self.sender_pid != os.getpid():
+            self.sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            self.sender.setblocking(0)
+            self.sender_pid = os.getpid()
+        return self.sender
+
+    def send(self, event):
+        data = json.dumps(event)
+        if len(data) > self.MAX_EVENT_SIZE:
+            logging.error("Event too large for the event bus: %r", data[:100])
+            return
+        sender = self._get_sender()
+        for name in os.listdir(self.path):
+            path = os.path.join(self.path, name)
+            if path == self.socket_path or not name.endswith('.sock'):
+                continue
+            try:
+                sender.sendto(data, path)
+            except socket.error as e:
+                if e.args[0] == errno.ECONNREFUSED:
+                    self._remove(path)
+                elif e.args[0] not in (errno.ENOENT, errno.EAGAIN, errno.EWOULDBLOCK):
+                    logging.warning("Could not send event to %s: %s", path, e)
+
+    def _remove(self, path):
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+    def close(self, io_loop=None):
+        if self.socket is not None:
+            if io_loop is not None:
+                io_loop.remove_handler(self.socket.fileno())
+            self.socket.close()
+            self._remove(self.socket_path)
+            self.socket = None
+
+
+def start_bus(path):
+    """Relay the events of this process and of the processes forked
+    from it through an EventBus in directory path.
+    """
+    hub.bus = EventBus(path, hub)
+    return hub.bus
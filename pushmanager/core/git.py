@@ -24,6 +24,7 @@ from multiprocessing import Process
 from urllib import urlencode
 
 from . import db
+from . import events
 from .mail import MailQueue
 from contextlib import contextmanager
 from pushmanager.core.settings import Settings
@@ -32,7 +33,9 @@ from pushmanager.core.util import del_from_tags_str
 from pushmanager.core.util import EscapedDict
 from pushmanager.core.util import tags_contain
 from pushmanager.core.xmppclient import XMPPQueue
+from sqlalchemy import and_
 from sqlalchemy import or_
+from sqlalchemy import select
 from tornado.escape import xhtml_escape
 
 
@@ -659,6 +662,67 @@ class GitQueue(object):
             req = dict(req.items())
         return req
 
+    @classmethod
+    def _get_requests(cls, request_ids):
+        """Fetch several push requests with a single query.
+
+        :param request_ids: Iterable of request IDs (integers or strings)
+        :return requests: Dict mapping integer request IDs to request
+                          dicts. Unknown IDs are missing from the dict.
+        """
+        request_ids = set(int(request_id) for request_id in request_ids)
+        requests = {}
+        if not request_ids:
+            return requests
+
+        def on_db_return(success, db_results):
+            assert success, "Database error."
+            for req in db_results:
+                requests[req['id']] = dict(req.items())
+
+        request_info_query = db.push_requests.select().where(
+            db.push_requests.c.id.in_(request_ids)
+        )
+        db.execute_cb(request_info_query, on_db_return)
+        return requests
+
+    @classmethod
+    def _get_push_with_pickmes(cls, request_id):
+        """Given the ID of a pickmed request, load the push it belongs
+        to along with every request pickmed for that push, in a single
+        query.
+
+        :param request_id: Integer id of a request in the push
+        :return (push_id, requests): push_id is None if the request is
+                not in a push. requests is a list of request dicts
+                (including the given request) ordered by id.
+        """
+        result = [None, []]
+        this_request = db.push_pushcontents.alias('this_request')
+
+        def on_db_return(success, db_results):
+            assert success, "Database error."
+            for row in db_results:
+                # A request should only be in one push, stick to the
+                # first one if it somehow isn't.
+                if result[0] is None:
+                    result[0] = row['push_id']
+                if row['push_id'] == result[0]:
+                    req = dict(row.items())
+                    del req['push_id']
+                    result[1].append(req)
+
+        query = select([
+            db.push_pushcontents.c.push.label('push_id'),
+            db.push_requests,
+        ]).where(and_(
+            this_request.c.request == request_id,
+            db.push_pushcontents.c.push == this_request.c.push,
+            db.push_requests.c.id == db.push_pushcontents.c.request,
+        )).order_by(db.push_pushcontents.c.push, db.push_requests.c.id)
+        db.execute_cb(query, on_db_return)
+        return result[0], result[1]
+
     @classmethod
     def _get_request_ids_in_push(cls, push_id):
         """Return a list of IDs corresponding with the push requests
@@ -731,11 +795,16 @@ class GitQueue(object):
         select_query = db.push_requests.select().where(
             db.push_requests.c.id == req['id']
         )
-        db.execute_transaction_cb([update_query, select_query], on_db_return)
+        queries = [update_query, select_query]
+        if 'tags' in updated_values:
+            queries.extend(db.request_tags_queries(req['id'], updated_values['tags']))
+        queries.extend(db.bump_data_versions_queries(db.REQUESTS_DATA_VERSION))
+        db.execute_transaction_cb(queries, on_db_return)
 
         updated_request = result[0]
         if updated_request:
             updated_request = dict(updated_request.items())
+            events.publish_changes([db.REQUESTS_DATA_VERSION], 'git', request=req['id'])
         if not updated_request:
             logging.error(
                 "Git-queue worker failed to update the request (id %s).",
@@ -797,31 +866,24 @@ class GitQueue(object):
         :param requeue: Boolean whether or not to requeue pickmes that are conflicted with
         """
 
-        push = cls._get_push_for_request(req['id'])
-        if push is None:
+        push_id, push_requests = cls._get_push_with_pickmes(req['id'])
+        if push_id is None:
             logging.warn(
                 "Couldn't test pickme %d - couldn't find corresponding push",
                 req['id']
             )
             return False, None
 
-        pickme_ids = cls._get_request_ids_in_push(push['push'])
-
-        pickme_ids = [p for p in pickme_ids if int(p) != int(req['id'])]
+        pickmes = dict(
+            (pickme['id'], pickme) for pickme in push_requests
+            if pickme['id'] != int(req['id'])
+        )
 
         conflict_pickmes = []
 
         # For each pickme, check if merging it on top throws an exception.
         # If it does, keep track of the pickme in conflict_pickmes
-        for pickme in pickme_ids:
-            pickme_details = cls._get_request(pickme)
-            if not pickme_details:
-                logging.error(
-                    "Tried to test for conflicts against invalid request id %s",
-                    pickme
-                )
-                continue
-
+        for pickme, pickme_details in sorted(pickmes.items()):
             if 'state' not in pickme_details or pickme_details['state'] not in ('pickme', 'added'):
                 continue
 
@@ -881,7 +943,7 @@ class GitQueue(object):
         updated_tags = del_from_tags_str(updated_tags, 'no-conflicts')
         formatted_conflicts = ""
         for broken_pickme, git_out, git_err in conflict_pickmes:
-            pickme_details = cls._get_request(broken_pickme)
+            pickme_details = pickmes[broken_pickme]
             formatted_pickme_err = (
                 """<strong>Conflict with <a href=\"/request?id={pickme_id}\">
                 {pickme_name}</a>: </strong><br/>{pickme_out}<br/>{pickme_err}
@@ -1297,9 +1359,8 @@ class GitQueue(object):
 
     @classmethod
     def requeue_pickmes_for_push(cls, push_id, pushmanager_url, conflicting_only=False):
-        request_details = []
-        for pickme_id in cls._get_request_ids_in_push(push_id):
-            request_details.append(cls._get_request(pickme_id))
+        pickmes = cls._get_requests(cls._get_request_ids_in_push(push_id))
+        request_details = [req for _, req in sorted(pickmes.items())]
 
         if conflicting_only:
             request_details = [
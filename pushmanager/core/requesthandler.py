@@ -1,28 +1,50 @@
-import contextlib
+import hashlib
 import json
-import urllib
-import urlparse
+import os
+import time
 
-import tornado.httpclient
-import tornado.stack_context
 import tornado.web
 
+from pushmanager.__about__ import __version__
+from pushmanager.core.api import API
+from pushmanager.core.api import api_arguments
 from pushmanager.core.settings import JSSettings
 from pushmanager.core.settings import Settings
-
-
-@contextlib.contextmanager
-def async_api_call_error():
-    try:
-        yield
-    except Exception as e:
-        if e[0] == "Stream is closed":
-            # Client drops request before waiting for a response. You
-            # can have this using Chrome pressing CTRL+r/Cmd+r
-            # continuously. No need to log this as an error.
-            pass
-        else:
-            raise
+from pushmanager.core.util import get_int_arg
+
+
+# Settings of every page, see base.html
+JSSETTINGS_JSON = json.dumps(JSSettings, sort_keys=True)
+
+
+def files_digest(*paths):
+    """Return a hex digest of the names and contents of the files
+    under paths, the same on every host with the same files. The .gz
+    copies written by tools/compress_static.py are left out.
+    """
+    digest = hashlib.sha1()
+    for path in paths:
+        for root, dirs, names in os.walk(path):
+            dirs.sort()
+            for name in sorted(names):
+                if name.endswith('.gz'):
+                    continue
+                file_path = os.path.join(root, name)
+                digest.update(os.path.relpath(file_path, path))
+                with open(file_path, 'rb') as f:
+                    digest.update(f.read())
+    return digest.hexdigest()
+
+
+# Part of every page ETag, so browsers don't keep pages rendered by
+# other templates, static files or settings. It is the same in every
+# web worker and across restarts of the same deployment.
+PACKAGE_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGE_ETAG_SALT = hashlib.sha1(repr((
+    __version__,
+    JSSETTINGS_JSON,
+    files_digest(os.path.join(PACKAGE_PATH, 'templates'), os.path.join(PACKAGE_PATH, 'static')),
+))).hexdigest()
 
 
 def get_base_url(request):
@@ -46,42 +68,75 @@ class RequestHandler(tornado.web.RequestHandler):
     def get_current_user(self):
         return self.get_secure_cookie("user")
 
-    @staticmethod
-    def get_api_page(method):
-        host = "%s:%d" % (
-                    Settings['api_app']['servername'],
-                    Settings['api_app']['port'],
-                )
-        path = "api/%s" % method
-        return urlparse.urlunsplit((
-                    "http",
-                    host,
-                    path,
-                    '',
-                    ''
-                ))
+    @property
+    def io_loop(self):
+        """IOLoop serving this request. Database callbacks coming back
+        from the db thread pool are scheduled on it.
+        """
+        return self.request.connection.stream.io_loop
+
+    @property
+    def use_readonly_db(self):
+        """Whether reads for this request may go to the db_uri_readonly
+        replica. Users who wrote to the database less than
+        db_read_your_writes seconds ago, as told by the db_write cookie
+        mark_db_write sets, read from the primary instead, so the page
+        they land on shows their change even if the replica lags
+        behind. A primary=1 argument also forces the primary, for API
+        clients without the cookie.
+        """
+        if get_int_arg(self.request, 'primary'):
+            return False
+        try:
+            last_write = int(self.get_cookie('db_write'))
+        except (ValueError, TypeError):
+            return True
+        return time.time() - last_write >= Settings.get('db_read_your_writes', 0)
+
+    def mark_db_write(self):
+        """Record that this user just changed the database, see
+        use_readonly_db.
+        """
+        self.set_cookie('db_write', str(int(time.time())))
 
     def async_api_call(self, method, arguments, callback):
-        self.http = tornado.httpclient.AsyncHTTPClient()
-        with tornado.stack_context.StackContext(async_api_call_error):
-            self.http.fetch(
-                self.get_api_page(method),
-                callback,
-                method="POST",
-                body=urllib.urlencode(arguments)
-            )
+        """Call the API endpoint method with arguments, a dict of
+        plain values, and pass the resulting APIResponse to callback.
+        The API runs in this process with this request's database
+        routing, pages don't go through the HTTP API.
+        """
+        api = API(api_arguments(arguments), io_loop=self.io_loop, readonly=self.use_readonly_db)
+        api.call(method, callback)
 
     def get_base_url(self):
         return get_base_url(self.request)
 
+    def check_page_etag(self, response):
+        """Set the ETag of a page rendered from the APIResponse
+        response. If the browser's copy is current, answer 304 and
+        return True; the caller must not render the page then.
+
+        The ETag covers the API data versions, the URI and the user,
+        nothing else the page may read.
+        """
+        if response.etag is None:
+            return False
+
+        etag = '"%s"' % hashlib.sha1(
+            repr((PAGE_ETAG_SALT, response.etag, self.request.uri, self.current_user))
+        ).hexdigest()
+        self.set_header("Etag", etag)
+        inm = self.request.headers.get("If-None-Match")
+        if inm and etag in inm:
+            self.set_status(304)
+            self.finish()
+            return True
+        return False
+
     def get_api_results(self, response):
         if response.error:
             return self.send_error()
-
-        try:
-            return json.loads(response.body)
-        except ValueError:
-            return self.send_error(500)
+        return response.data
 
     def check_db_results(self, success, db_results):
         assert success, "Database error."
@@ -93,8 +148,15 @@ class RequestHandler(tornado.web.RequestHandler):
         # it. JSSetting is just a subset of the Settings dictionary
         # and is safe to pass around.
         kwargs.setdefault('Settings', JSSettings)
-        kwargs.setdefault('JSSettings_json', json.dumps(JSSettings, sort_keys=True))
+        kwargs.setdefault('JSSettings_json', JSSETTINGS_JSON)
         super(RequestHandler, self).render(templ, **kwargs)
 
+    def render_fragment(self, templ, **kwargs):
+        """Finish with templ rendered as a piece of a page: the page it
+        goes in already has the JavaScript and CSS of its UI modules.
+        """
+        kwargs.setdefault('Settings', JSSettings)
+        self.finish(self.render_string(templ, **kwargs))
+
 
 __all__ = ['RequestHandler']
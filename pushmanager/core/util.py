@@ -47,6 +47,21 @@ def get_str_arg(request, field, default=None):
     return request.arguments.get(field, [default])[0]
 
 
+def get_int_args(request, field):
+    """Get the integer values of a repeated query arg, in order and
+    without duplicates. Values which are not integers are skipped.
+    """
+    values = []
+    for value in request.arguments.get(field, []):
+        try:
+            value = int(value)
+        except ValueError:
+            continue
+        if value not in values:
+            values.append(value)
+    return values
+
+
 def sqlalchemy_to_dict(result, table):
     row_item = {}
     for col in table.columns.keys():
@@ -167,49 +182,87 @@ def del_from_tags_str(current_tags, tags):
     )
 
 
-def request_to_jsonable(request):
+# Keys of the JSON representation of a request and a push.
+REQUEST_JSON_KEYS = (
+    'id',
+    'user',
+    'watchers',
+    'state',
+    'repo',
+    'branch',
+    'revision',
+    'tags',
+    'conflicts',
+    'created',
+    'modified',
+    'title',
+    'comments',
+    'reviewid',
+    'description',
+)
+
+# Requests in list views leave out the large text columns.
+REQUEST_SUMMARY_KEYS = tuple(
+    key for key in REQUEST_JSON_KEYS
+    if key not in ('conflicts', 'comments', 'description')
+)
+
+PUSH_JSON_KEYS = (
+    'id',
+    'title',
+    'user',
+    'branch',
+    'stageenv',
+    'state',
+    'created',
+    'modified',
+    'pushtype',
+    'extra_pings',
+)
+
+
+def request_to_jsonable(request, keys=REQUEST_JSON_KEYS):
     """Get a request object and return a dict with desired key, value
     pairs that are to be encoded to json format
     """
-    return dict(
-        (k, request[k]) for k in (
-            'id',
-            'user',
-            'watchers',
-            'state',
-            'repo',
-            'branch',
-            'revision',
-            'tags',
-            'conflicts',
-            'created',
-            'modified',
-            'title',
-            'comments',
-            'reviewid',
-            'description'
-        )
-    )
+    return dict((k, request[k]) for k in keys)
 
 
 def push_to_jsonable(push):
     """Get a push object and return a dict with desired key, value
     pairs that are to be encoded to json format
     """
-    return dict(
-        (k, push[k]) for k in (
-            'id',
-            'title',
-            'user',
-            'branch',
-            'stageenv',
-            'state',
-            'created',
-            'modified',
-            'pushtype',
-            'extra_pings'
-        )
-    )
+    return dict((k, push[k]) for k in PUSH_JSON_KEYS)
+
+
+def rows_to_jsonable(rows):
+    """Turn the rows of a column-projected query into dicts holding
+    every selected column. Column names are looked up once for all
+    rows instead of once per key and row.
+    """
+    rows = list(rows)
+    if not rows:
+        return []
+    keys = rows[0].keys()
+    return [dict(zip(keys, row)) for row in rows]
+
+
+def push_cursor(push):
+    """Return the pagination cursor of a push, its (modified, id)
+    position in the pushes listing, as a string.
+    """
+    return '%r:%d' % (float(push['modified'] or 0), push['id'])
+
+
+def parse_push_cursor(cursor):
+    """Return the (modified, id) tuple of a push_cursor string, or
+    None if it is not a valid cursor.
+    """
+    try:
+        modified, push_id = cursor.split(':')
+        return float(modified), int(push_id)
+    except (AttributeError, ValueError):
+        return None
 
 
 def dict_copy_keys(to_dict, from_dict):
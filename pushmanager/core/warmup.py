@@ -0,0 +1,67 @@
+"""Work done once when the main app starts rather than by the first
+requests of each web worker.
+
+warm_up() runs before the web workers are forked, so they all start
+with every template compiled and every static file hashed for
+static_url().
+"""
+import logging
+import os
+import time
+
+import tornado.web
+
+
+# What the last warm_up() of this process did and how long it took
+stats = {}
+
+
+def _files(path, skip_suffix=None):
+    """Paths of the files under path, relative to it."""
+    for root, _, names in os.walk(path):
+        for name in sorted(names):
+            if skip_suffix and name.endswith(skip_suffix):
+                continue
+            yield os.path.relpath(os.path.join(root, name), path)
+
+
+def load_templates(loader, template_path):
+    """Compile every template under template_path into loader."""
+    names = list(_files(template_path))
+    for name in names:
+        loader.load(name)
+    return len(names)
+
+
+def hash_static_files(settings):
+    """Compute the static_url() version of every static file of the
+    application with settings.
+    """
+    handler_class = settings.get('static_handler_class', tornado.web.StaticFileHandler)
+    # .gz copies are served in place of their file, never linked to
+    paths = list(_files(settings['static_path'], skip_suffix='.gz'))
+    for path in paths:
+        handler_class.get_version(settings, path)
+    return len(paths)
+
+
+def warm_up(application):
+    """Compile the templates of the tornado application, which must
+    have a template_loader setting, and hash its static files. The
+    counts and time taken are kept in stats.
+    """
+    start = time.time()
+    settings = application.settings
+    templates = load_templates(settings['template_loader'], settings['template_path'])
+    static_files = hash_static_files(settings) if 'static_path' in settings else 0
+
+    stats.update(
+        templates=templates,
+        static_files=static_files,
+        seconds=time.time() - start,
+    )
+    logging.info(
+        "Warmed up %(templates)d templates and %(static_files)d static files in %(seconds).3fs",
+        stats,
+    )
+    return stats
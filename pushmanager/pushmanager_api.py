@@ -8,18 +8,24 @@ import tornado.httpserver
 import tornado.process
 import pushmanager.ui_modules as ui_modules
 from pushmanager.core.application import Application
+from pushmanager.core.compression import PrecompressedStaticFileHandler
+from pushmanager.core.compression import TRANSFORMS
 from pushmanager.core.settings import Settings
 from pushmanager.core.util import get_servlet_urlspec
 from pushmanager.servlets.api import APIServlet
+from pushmanager.servlets.dbstats import DBStatsServlet
 
 
 api_application = tornado.web.Application(
     # Servlet dispatch rules
     [
         get_servlet_urlspec(APIServlet),
+        get_servlet_urlspec(DBStatsServlet),
     ],
+    transforms=TRANSFORMS,
     # Server settings
     static_path=os.path.join(os.path.dirname(__file__), "static"),
+    static_handler_class=PrecompressedStaticFileHandler,
     template_path=os.path.join(os.path.dirname(__file__), "templates"),
     login_url="/login",
     cookie_secret=Settings['cookie_secret'],
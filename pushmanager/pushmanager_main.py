@@ -3,11 +3,17 @@ import os
 
 import pushmanager.core.db as db
 import tornado.httpserver
+import tornado.ioloop
+import tornado.template
 import tornado.web
 import pushmanager.ui_methods as ui_methods
 import pushmanager.ui_modules as ui_modules
+from pushmanager.core import events
 from pushmanager.core import pid
+from pushmanager.core import warmup
 from pushmanager.core.application import Application
+from pushmanager.core.compression import PrecompressedStaticFileHandler
+from pushmanager.core.compression import TRANSFORMS
 from pushmanager.core.git import GitQueue
 from pushmanager.core.mail import MailQueue
 from pushmanager.core.rb import RBQueue
@@ -28,6 +34,7 @@ from pushmanager.servlets.checklist import ChecklistServlet
 from pushmanager.servlets.checklist import ChecklistToggleServlet
 from pushmanager.servlets.commentrequest import CommentRequestServlet
 from pushmanager.servlets.conflictcheck import ConflictCheckServlet
+from pushmanager.servlets.dbstats import DBStatsServlet
 from pushmanager.servlets.delayrequest import DelayRequestServlet
 from pushmanager.servlets.deploypush import DeployPushServlet
 from pushmanager.servlets.discardpush import DiscardPushServlet
@@ -40,9 +47,12 @@ from pushmanager.servlets.newrequest import NewRequestServlet
 from pushmanager.servlets.pickmerequest import PickMeRequestServlet
 from pushmanager.servlets.pickmerequest import UnpickMeRequestServlet
 from pushmanager.servlets.pingme import PingMeServlet
+from pushmanager.servlets.push import PushRequestRowServlet
+from pushmanager.servlets.push import PushSectionServlet
 from pushmanager.servlets.push import PushServlet
 from pushmanager.servlets.pushbyrequest import PushByRequestServlet
 from pushmanager.servlets.pushes import PushesServlet
+from pushmanager.servlets.pushevents import PushEventsServlet
 from pushmanager.servlets.pushitems import PushItemsServlet
 from pushmanager.servlets.removerequest import RemoveRequestServlet
 from pushmanager.servlets.request import RequestServlet
@@ -82,9 +92,13 @@ def get_url_specs():
                     DelayRequestServlet,
                     UndelayRequestServlet,
                     CommentRequestServlet,
+                    DBStatsServlet,
                     PingMeServlet,
                     PushServlet,
+                    PushSectionServlet,
+                    PushRequestRowServlet,
                     PushesServlet,
+                    PushEventsServlet,
                     EditPushServlet,
                     DiscardPushServlet,
                     DeployPushServlet,
@@ -112,11 +126,16 @@ class PushManagerApp(Application):
                 (r'/(.*)', RedirHandler),
             ],
         )
+        template_path = os.path.join(os.path.dirname(__file__), "templates")
         self.main_app = tornado.web.Application(
             get_url_specs(),
+            transforms=TRANSFORMS,
             # Server settings
             static_path=os.path.join(os.path.dirname(__file__), "static"),
-            template_path=os.path.join(os.path.dirname(__file__), "templates"),
+            static_handler_class=PrecompressedStaticFileHandler,
+            template_path=template_path,
+            # Shared with the web workers, which get it warmed up
+            template_loader=tornado.template.Loader(template_path, autoescape=None),
             login_url="/login",
             cookie_secret=Settings['cookie_secret'],
             ui_modules=ui_modules,
@@ -129,6 +148,11 @@ class PushManagerApp(Application):
         sockets = tornado.netutil.bind_sockets(self.port, address=Settings['main_app']['servername'])
         redir_sockets = tornado.netutil.bind_sockets(self.redir_port, address=Settings['main_app']['servername'])
 
+        # Events published by any of the processes forked from here reach
+        # the push pages of every web worker
+        if Settings.get('event_bus_dir'):
+            events.start_bus(Settings['event_bus_dir'])
+
         # Start the mail, git, reviewboard and XMPP queue handlers
         worker_pids = []
         worker_pids.extend(MailQueue.start_worker())
@@ -139,7 +163,12 @@ class PushManagerApp(Application):
             pid.write(self.pid_file, append=True, pid=worker_pid)
         self.queue_worker_pids.extend(worker_pids)
 
+        # Compile templates once for all the web workers
+        warmup.warm_up(self.main_app)
+
         tornado.process.fork_processes(Settings['tornado']['num_workers'])
+        if events.hub.bus is not None:
+            events.hub.bus.listen(tornado.ioloop.IOLoop.instance())
 
         server = tornado.httpserver.HTTPServer(self.main_app, ssl_options={
                 'certfile': Settings['main_app']['ssl_certfile'],
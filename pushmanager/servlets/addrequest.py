@@ -1,5 +1,6 @@
 import pushmanager.core.db as db
 import pushmanager.core.util
+from pushmanager.core import events
 from pushmanager.core.db import InsertIgnore
 from pushmanager.core.mail import MailQueue
 from pushmanager.core.requesthandler import RequestHandler
@@ -23,13 +24,19 @@ class AddRequestServlet(RequestHandler):
         request_query = db.push_requests.select().where(
             db.push_requests.c.id.in_(self.request_ids))
 
-        db.execute_transaction_cb(insert_queries + [update_query, request_query], self.on_db_complete)
+        version_queries = db.bump_data_versions_queries(db.push_data_version(self.pushid), db.REQUESTS_DATA_VERSION)
+        db.execute_transaction_cb(
+            insert_queries + [update_query] + version_queries + [request_query],
+            self.on_db_complete,
+        )
 
     # allow both GET and POST
     get = post
 
     def on_db_complete(self, success, db_results):
         self.check_db_results(success, db_results)
+        events.publish_changes([db.push_data_version(self.pushid), db.REQUESTS_DATA_VERSION], 'add')
+        self.mark_db_write()
 
         for req in db_results[-1]:
             if req['watchers']:
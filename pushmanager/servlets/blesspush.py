@@ -2,6 +2,7 @@ import sqlalchemy as SA
 
 import pushmanager.core.db as db
 import pushmanager.core.util
+from pushmanager.core import events
 from pushmanager.core.mail import MailQueue
 from pushmanager.core.requesthandler import RequestHandler
 from pushmanager.core.xmppclient import XMPPQueue
@@ -35,12 +36,15 @@ class BlessPushServlet(RequestHandler):
         push_query = db.push_pushes.select().where(
                 db.push_pushes.c.id == self.pushid,
         )
-        db.execute_transaction_cb([request_query, blessed_query, push_query], self.on_db_complete)
+        version_queries = db.bump_data_versions_queries(db.push_data_version(self.pushid), db.REQUESTS_DATA_VERSION)
+        db.execute_transaction_cb([request_query, blessed_query, push_query] + version_queries, self.on_db_complete)
 
     def on_db_complete(self, success, db_results):
         self.check_db_results(success, db_results)
+        events.publish_changes([db.push_data_version(self.pushid), db.REQUESTS_DATA_VERSION], 'bless')
+        self.mark_db_write()
 
-        _, blessed_requests, push_results = db_results
+        _, blessed_requests, push_results = db_results[:3]
         for req in blessed_requests:
             if req['watchers']:
                 user_string = '%s (%s)' % (req['user'], req['watchers'])
@@ -4,6 +4,7 @@ import sqlalchemy as SA
 
 import pushmanager.core.db as db
 import pushmanager.core.util
+from pushmanager.core import events
 from pushmanager.core.requesthandler import RequestHandler
 
 
@@ -113,8 +114,14 @@ class ChecklistToggleServlet(RequestHandler):
             return self.send_error(403)
 
         self.checklist = pushmanager.core.util.get_int_arg(self.request, 'id')
+        self.pushid = pushmanager.core.util.get_int_arg(self.request, 'push')
         new_value = pushmanager.core.util.get_int_arg(self.request, 'complete')
 
         query = db.push_checklist.update().where(
             db.push_checklist.c.id == self.checklist).values({'complete': new_value})
-        db.execute_cb(query, lambda _, __: None)
+        db.execute_cb(query, self.on_db_complete)
+
+    def on_db_complete(self, success, db_results):
+        if success and self.pushid:
+            events.publish_changes([db.push_data_version(self.pushid)], 'checklist')
+            self.mark_db_write()
@@ -2,6 +2,7 @@ import sqlalchemy as SA
 
 import pushmanager.core.db as db
 import pushmanager.core.util
+from pushmanager.core import events
 from pushmanager.core.mail import MailQueue
 from pushmanager.core.requesthandler import RequestHandler
 from pushmanager.core.xmppclient import XMPPQueue
@@ -14,7 +15,7 @@ class CommentRequestServlet(RequestHandler):
         if not self.current_user:
             return self.send_error(403)
 
-        requestid = pushmanager.core.util.get_int_arg(self.request, 'id')
+        self.requestid = requestid = pushmanager.core.util.get_int_arg(self.request, 'id')
         comment = pushmanager.core.util.get_str_arg(self.request, 'comment')
         self.comment = comment
         if not comment:
@@ -32,12 +33,15 @@ class CommentRequestServlet(RequestHandler):
         select_query = db.push_requests.select().where(
             db.push_requests.c.id == requestid,
         )
-        db.execute_transaction_cb([update_query, select_query], self.on_db_complete)
+        version_queries = db.bump_data_versions_queries(db.REQUESTS_DATA_VERSION)
+        db.execute_transaction_cb([update_query, select_query] + version_queries, self.on_db_complete)
 
     get = post
 
     def on_db_complete(self, success, db_results):
         self.check_db_results(success, db_results)
+        events.publish_changes([db.REQUESTS_DATA_VERSION], 'comment', request=self.requestid)
+        self.mark_db_write()
 
         if db_results:
             req = db_results[1].first()
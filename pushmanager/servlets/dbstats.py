@@ -0,0 +1,32 @@
+import json
+
+import pushmanager.core.db as db
+import pushmanager.ui_modules as ui_modules
+from pushmanager.core import api
+from pushmanager.core import warmup
+from pushmanager.core.requesthandler import RequestHandler
+
+
+class DBStatsServlet(RequestHandler):
+    """Database metrics of the process serving the request: connection
+    pool counters, per-query latency histograms, how many API calls
+    shared the response of an identical call in flight and the hit
+    rates of the caches which save queries and rendering. Every web
+    worker keeps its own numbers, warm_up is from before they forked.
+    """
+
+    def get(self):
+        if not self.current_user:
+            return self.send_error(403)
+        self.set_header("Content-Type", "application/json")
+        self.write(json.dumps({
+            'pool': db.pool_stats.as_dict(),
+            'queries': db.query_stats.as_dict(),
+            'coalesced_reads': api.coalesced_reads.as_dict(),
+            'caches': {
+                'pushdata': api.pushdata_cache.as_dict(),
+                'pushes_count': api.pushes_count_cache.as_dict(),
+                'request_render': ui_modules.request_render_cache.as_dict(),
+            },
+            'warm_up': warmup.stats,
+        }))
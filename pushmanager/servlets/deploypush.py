@@ -2,6 +2,7 @@ import sqlalchemy as SA
 
 import pushmanager.core.db as db
 import pushmanager.core.util
+from pushmanager.core import events
 from pushmanager.core.mail import MailQueue
 from pushmanager.core.requesthandler import RequestHandler
 from pushmanager.core.xmppclient import XMPPQueue
@@ -37,12 +38,15 @@ class DeployPushServlet(RequestHandler):
         push_query = db.push_pushes.select().where(
                 db.push_pushes.c.id == self.pushid,
             )
-        db.execute_transaction_cb([request_query, staged_query, push_query], self.on_db_complete)
+        version_queries = db.bump_data_versions_queries(db.push_data_version(self.pushid), db.REQUESTS_DATA_VERSION)
+        db.execute_transaction_cb([request_query, staged_query, push_query] + version_queries, self.on_db_complete)
 
     def on_db_complete(self, success, db_results):
         self.check_db_results(success, db_results)
+        events.publish_changes([db.push_data_version(self.pushid), db.REQUESTS_DATA_VERSION], 'deploy')
+        self.mark_db_write()
 
-        _, staged_requests, push_result = db_results
+        _, staged_requests, push_result = db_results[:3]
         push = push_result.fetchone()
 
         for req in staged_requests:
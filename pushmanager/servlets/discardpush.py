@@ -4,6 +4,7 @@ import sqlalchemy as SA
 
 import pushmanager.core.db as db
 import pushmanager.core.util
+from pushmanager.core import events
 from pushmanager.core.requesthandler import RequestHandler
 
 
@@ -50,10 +51,13 @@ class DiscardPushServlet(RequestHandler):
             )).values({
                 'state': 'requested',
             })
+        version_queries = db.bump_data_versions_queries(db.push_data_version(self.pushid), db.REQUESTS_DATA_VERSION)
         db.execute_transaction_cb(
-            [push_query, request_query_pickme, delete_query, request_query_all],
+            [push_query, request_query_pickme, delete_query, request_query_all] + version_queries,
             self.on_db_complete
         )
 
     def on_db_complete(self, success, db_results):
         self.check_db_results(success, db_results)
+        events.publish_changes([db.push_data_version(self.pushid), db.REQUESTS_DATA_VERSION], 'discard')
+        self.mark_db_write()
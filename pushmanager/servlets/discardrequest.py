@@ -2,6 +2,7 @@ import sqlalchemy as SA
 
 import pushmanager.core.db as db
 import pushmanager.core.util
+from pushmanager.core import events
 from pushmanager.core.mail import MailQueue
 from pushmanager.core.requesthandler import RequestHandler
 
@@ -22,14 +23,17 @@ class DiscardRequestServlet(RequestHandler):
         select_query = db.push_requests.select().where(
             db.push_requests.c.id == self.requestid,
         )
-        db.execute_transaction_cb([update_query, select_query], self.on_db_complete)
+        version_queries = db.bump_data_versions_queries(db.REQUESTS_DATA_VERSION)
+        db.execute_transaction_cb([update_query, select_query] + version_queries, self.on_db_complete)
     # allow both GET and POST
     get = post
 
     def on_db_complete(self, success, db_results):
         self.check_db_results(success, db_results)
+        events.publish_changes([db.REQUESTS_DATA_VERSION], 'discard', request=self.requestid)
+        self.mark_db_write()
 
-        _, req = db_results
+        req = db_results[1]
         req = req.first()
         if req['state'] != 'discarded':
             # We didn't actually discard the record, for whatever reason
@@ -2,6 +2,7 @@ import time
 
 import pushmanager.core.db as db
 import pushmanager.core.util
+from pushmanager.core import events
 from pushmanager.core.requesthandler import RequestHandler
 
 
@@ -22,7 +23,13 @@ class EditPushServlet(RequestHandler):
             'revision': "0"*40,
             'modified': time.time(),
             })
-        db.execute_cb(
-            query,
-            lambda _, __: self.redirect("/push?id=%d" % self.pushid)
+        db.execute_transaction_cb(
+            [query] + db.bump_data_versions_queries(db.push_data_version(self.pushid)),
+            self.on_db_complete,
         )
+
+    def on_db_complete(self, success, db_results):
+        if success:
+            self.mark_db_write()
+            events.publish_changes([db.push_data_version(self.pushid)], 'edit')
+        self.redirect("/push?id=%d" % self.pushid)
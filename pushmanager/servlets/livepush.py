@@ -4,6 +4,8 @@ import sqlalchemy as SA
 
 import pushmanager.core.db as db
 import pushmanager.core.util
+import tornado.web
+from pushmanager.core import events
 from pushmanager.core.mail import MailQueue
 from pushmanager.core.rb import RBQueue
 from pushmanager.core.requesthandler import RequestHandler
@@ -14,6 +16,7 @@ class LivePushServlet(RequestHandler):
     def _arg(self, key):
         return pushmanager.core.util.get_str_arg(self.request, key, '')
 
+    @tornado.web.asynchronous
     def post(self):
         if not self.current_user:
             return self.send_error(403)
@@ -56,15 +59,19 @@ class LivePushServlet(RequestHandler):
                     db.push_pushcontents.c.push == self.pushid,
                     db.push_pushcontents.c.request == db.push_requests.c.id)
             )
-        db.execute_transaction_cb(
-            [push_query, request_query, reset_query, delete_query, live_query],
+        version_queries = db.bump_data_versions_queries(db.push_data_version(self.pushid), db.REQUESTS_DATA_VERSION)
+        db.execute_transaction_async_cb(
+            [push_query, request_query, reset_query, delete_query, live_query] + version_queries,
             self.on_db_complete,
+            io_loop=self.io_loop,
         )
 
     def on_db_complete(self, success, db_results):
         self.check_db_results(success, db_results)
+        events.publish_changes([db.push_data_version(self.pushid), db.REQUESTS_DATA_VERSION], 'live')
+        self.mark_db_write()
 
-        _, _, _, _, live_requests = db_results
+        live_requests = db_results[4]
         for req in live_requests:
             if req['reviewid']:
                 review_id = int(req['reviewid'])
@@ -99,3 +106,5 @@ class LivePushServlet(RequestHandler):
                 })
             subject = "[push] %s - %s" % (user_string, req['title'])
             MailQueue.enqueue_user_email(users, msg, subject)
+
+        self.finish()
@@ -62,14 +62,19 @@ class NewPushServlet(RequestHandler):
         select_query = db.push_requests.select().where(
             db.push_requests.c.state == 'requested',
         )
-        db.execute_transaction_cb([insert_query, select_query], self.on_db_complete)
+        if self.pushtype == 'urgent':
+            # Only the people involved in urgent requests are notified
+            select_query = select_query.where(db.requests_with_tag('urgent'))
+        version_queries = db.bump_data_versions_queries(db.PUSHES_DATA_VERSION)
+        db.execute_transaction_cb([insert_query, select_query] + version_queries, self.on_db_complete)
 
     get = post
 
     def on_db_complete(self, success, db_results):
         self.check_db_results(success, db_results)
+        self.mark_db_write()
 
-        insert_results, select_results = db_results
+        insert_results, select_results = db_results[:2]
         pushurl = '/push?id=%s' % insert_results.lastrowid
         pushmanager_url = self.get_base_url() + pushurl
 
@@ -80,8 +85,6 @@ class NewPushServlet(RequestHandler):
 
         if self.pushtype in ('private', 'morning'):
             people = None
-        elif self.pushtype == 'urgent':
-            people = set(user for x in select_results for user in users_involved(x) if 'urgent' in x['tags'].split(','))
         else:
             people = set(user for x in select_results for user in users_involved(x))
 
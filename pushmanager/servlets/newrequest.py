@@ -5,6 +5,7 @@ import sqlalchemy as SA
 
 import pushmanager.core.db as db
 import pushmanager.core.util
+from pushmanager.core import events
 from pushmanager.core.git import GitQueue
 from pushmanager.servlets.checklist import checklist_reminders
 from pushmanager.core.git import GitTaskAction
@@ -58,8 +59,10 @@ class NewRequestServlet(RequestHandler):
             if len(self._arg('request-takeover')):
                 updated_values.update({'user': self.current_user})
                 self.request_user = self.current_user
+                self.user_seen = True
             else:
                 self.request_user = self._arg('request-user')
+                self.user_seen = False
 
             query = db.push_requests.update().where(
                     db.push_requests.c.id == self.requestid
@@ -81,14 +84,29 @@ class NewRequestServlet(RequestHandler):
                 'revision': '0'*40,
                 })
             self.request_user = self.current_user
+            self.user_seen = True
 
-        db.execute_cb(query, self.on_request_upsert_complete)
+        # The tags, users and versions change with the request row
+        tags = ','.join(self.tag_list)
+        queries = [query]
+        if self.requestid:
+            queries.extend(db.request_tags_queries(self.requestid, tags))
+        else:
+            queries.append(lambda results: db.request_tags_queries(results[0].lastrowid, tags))
+        if self.user_seen:
+            queries.extend(db.user_seen_queries(self.current_user))
+            queries.extend(db.bump_data_versions_queries(db.REQUESTS_DATA_VERSION, db.USERS_DATA_VERSION))
+        else:
+            queries.extend(db.bump_data_versions_queries(db.REQUESTS_DATA_VERSION))
+        db.execute_transaction_cb(queries, self.on_request_upsert_complete)
 
     def on_request_upsert_complete(self, success, db_results):
         self.check_db_results(success, db_results)
 
         if not self.requestid:
-            self.requestid = db_results.lastrowid
+            self.requestid = db_results[0].lastrowid
+        self.mark_db_write()
+        events.publish_changes([db.REQUESTS_DATA_VERSION], 'request', request=self.requestid)
 
         query = db.push_checklist.select().where(db.push_checklist.c.request == self.requestid)
         db.execute_cb(query, self.on_existing_checklist_retrieved)
@@ -125,7 +143,10 @@ class NewRequestServlet(RequestHandler):
                 db.push_checklist.c.type.in_(types_to_remove),
             )))
 
-        db.execute_transaction_cb(queries, self.on_checklist_upsert_complete)
+        if queries:
+            db.execute_transaction_cb(queries, self.on_checklist_upsert_complete)
+        else:
+            self.on_checklist_upsert_complete(True, [])
 
     def on_checklist_upsert_complete(self, success, db_results):
         if not success:
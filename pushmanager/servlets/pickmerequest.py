@@ -2,6 +2,8 @@ import sqlalchemy as SA
 
 import pushmanager.core.db as db
 import pushmanager.core.util
+import tornado.web
+from pushmanager.core import events
 from pushmanager.core.git import GitQueue
 from pushmanager.core.git import GitTaskAction
 from pushmanager.core.requesthandler import RequestHandler
@@ -9,6 +11,7 @@ from pushmanager.core.requesthandler import RequestHandler
 
 class PickMeRequestServlet(RequestHandler):
 
+    @tornado.web.asynchronous
     def post(self):
         if not self.current_user:
             return self.send_error(403)
@@ -16,7 +19,11 @@ class PickMeRequestServlet(RequestHandler):
         self.pushid = pushmanager.core.util.get_int_arg(self.request, 'push')
         self.request_ids = self.request.arguments.get('request', [])
 
-        db.execute_cb(db.push_pushes.select().where(db.push_pushes.c.id == self.pushid), self.on_push_select)
+        db.execute_async_cb(
+            db.push_pushes.select().where(db.push_pushes.c.id == self.pushid),
+            self.on_push_select,
+            io_loop=self.io_loop,
+        )
 
     def on_push_select(self, success, db_results):
         if not success or not db_results:
@@ -54,10 +61,12 @@ class PickMeRequestServlet(RequestHandler):
         def condition_fn(db_results):
             return db_results.fetchall() == []
 
-        db.execute_transaction_cb(
-            insert_queries + [update_query, request_query],
+        version_queries = db.bump_data_versions_queries(db.push_data_version(self.pushid), db.REQUESTS_DATA_VERSION)
+        db.execute_transaction_async_cb(
+            insert_queries + [update_query, request_query] + version_queries,
             self.on_db_complete,
-            condition=(condition_query, condition_fn)
+            condition=(condition_query, condition_fn),
+            io_loop=self.io_loop,
         )
 
     # allow both GET and POST
@@ -65,16 +74,20 @@ class PickMeRequestServlet(RequestHandler):
 
     def on_db_complete(self, success, db_results):
         self.check_db_results(success, db_results)
+        events.publish_changes([db.push_data_version(self.pushid), db.REQUESTS_DATA_VERSION], 'pickme')
+        self.mark_db_write()
         for request_id in self.request_ids:
             GitQueue.enqueue_request(
                 GitTaskAction.TEST_PICKME_CONFLICT,
                 request_id,
                 pushmanager_url=self.get_base_url()
             )
+        self.finish()
 
 
 class UnpickMeRequestServlet(RequestHandler):
 
+    @tornado.web.asynchronous
     def post(self):
         if not self.current_user:
             return self.send_error(403)
@@ -93,13 +106,20 @@ class UnpickMeRequestServlet(RequestHandler):
                 db.push_requests.c.state == 'pickme',
             )).values({'state': 'requested'})
 
-        db.execute_transaction_cb([delete_query, update_query], self.on_db_complete)
+        version_queries = db.bump_data_versions_queries(db.push_data_version(self.pushid), db.REQUESTS_DATA_VERSION)
+        db.execute_transaction_async_cb(
+            [delete_query, update_query] + version_queries,
+            self.on_db_complete,
+            io_loop=self.io_loop,
+        )
 
     # allow both GET and POST
     get = post
 
     def on_db_complete(self, success, db_results):
         self.check_db_results(success, db_results)
+        events.publish_changes([db.push_data_version(self.pushid), db.REQUESTS_DATA_VERSION], 'unpickme')
+        self.mark_db_write()
         # Re-check pickmes that are marked as conflicting, in case this was the pickme
         # that they conflicted against.
         GitQueue.enqueue_request(
@@ -107,3 +127,4 @@ class UnpickMeRequestServlet(RequestHandler):
             self.pushid,
             pushmanager_url=self.get_base_url()
         )
+        self.finish()
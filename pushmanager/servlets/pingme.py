@@ -38,8 +38,12 @@ class PingMeServlet(RequestHandler):
         ).values({
             'extra_pings': ','.join(pings),
         })
-        db.execute_cb(query, self.on_update_complete)
+        db.execute_transaction_cb(
+            [query] + db.bump_data_versions_queries(db.push_data_version(pushid)),
+            self.on_update_complete,
+        )
 
     def on_update_complete(self, success, db_results):
         self.check_db_results(success, db_results)
+        self.mark_db_write()
         self.finish()
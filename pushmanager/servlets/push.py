@@ -1,5 +1,7 @@
 import os
+import time
 
+import pushmanager.core.api
 import pushmanager.core.util
 import tornado.gen
 import tornado.web
@@ -13,6 +15,14 @@ def _repo(base):
     return os.path.join(dev_repos_dir, base) if base != main_repository else base
 
 
+def _pickme_orders():
+    return ['urgent', 'no-verify', Settings['tests_tag']['tag']]
+
+
+# Sections of the page of an accepting push, see push-status.html
+PUSH_SECTIONS = ('blessed', 'verified', 'staged', 'added', 'pickme', 'requested')
+
+
 class PushServlet(RequestHandler):
 
     @tornado.web.asynchronous
@@ -21,11 +31,15 @@ class PushServlet(RequestHandler):
     def get(self):
         pushid = pushmanager.core.util.get_int_arg(self.request, 'id')
         override = pushmanager.core.util.get_int_arg(self.request, 'override')
+        # push.js asks for the changes since the data was read
+        since = int(time.time()) - pushmanager.core.api.PUSHDATA_SINCE_MARGIN
         response = yield tornado.gen.Task(
                         self.async_api_call,
                         "pushdata",
                         {"id": pushid}
                     )
+        if self.check_page_etag(response):
+            return
 
         push_info, push_requests, available_requests = self.get_api_results(response)
 
@@ -38,11 +52,92 @@ class PushServlet(RequestHandler):
             "push.html",
             page_title=push_info['title'],
             pushid=pushid,
+            since=since,
             push_info=push_info,
             push_contents=push_requests,
             push_survey_url=push_survey_url,
             available_requests=available_requests,
             fullrepo=_repo,
             override=override,
-            pickme_orders=['urgent', 'no-verify', Settings['tests_tag']['tag']]
+            pickme_orders=_pickme_orders()
         )
+
+
+class PushFragmentServlet(RequestHandler):
+    """Base of the servlets rendering the request items of part of
+    the page of an accepting push, for push.js to swap in rather than
+    reload the page. Subclasses pick the section and its requests to
+    render out of the push data in get_section_requests; this base
+    class has none and answers 404.
+    """
+
+    @tornado.web.asynchronous
+    @tornado.web.authenticated
+    @tornado.gen.engine
+    def get(self):
+        pushid = pushmanager.core.util.get_int_arg(self.request, 'id')
+        override = pushmanager.core.util.get_int_arg(self.request, 'override')
+        response = yield tornado.gen.Task(
+                        self.async_api_call,
+                        "pushdata",
+                        {"id": pushid}
+                    )
+        if self.check_page_etag(response):
+            return
+
+        results = self.get_api_results(response)
+        if results is None:
+            return
+        push_info, push_requests, available_requests = results
+        if push_info['state'] != 'accepting':
+            self.send_error(404)
+            return
+
+        section_requests = self.get_section_requests(push_requests, available_requests)
+        if section_requests is None:
+            self.send_error(404)
+            return
+        section, requests = section_requests
+
+        self.render_fragment(
+            "push-section-items.html",
+            section=section,
+            section_requests=requests,
+            push_info=push_info,
+            override=override,
+            pickme_orders=_pickme_orders()
+        )
+
+    def get_section_requests(self, push_requests, available_requests):
+        """Return the (section, requests) to render, or None for a 404."""
+        return None
+
+
+class PushSectionServlet(PushFragmentServlet):
+    """Items of one section of a push page, given by the section
+    argument.
+    """
+
+    def get_section_requests(self, push_requests, available_requests):
+        section = pushmanager.core.util.get_str_arg(self.request, 'section')
+        if section not in PUSH_SECTIONS:
+            return None
+        if section == 'requested':
+            return section, available_requests
+        return section, push_requests.get(section, [])
+
+
+class PushRequestRowServlet(PushFragmentServlet):
+    """Item of the request given by the request argument, as shown
+    in its section of a push page.
+    """
+
+    def get_section_requests(self, push_requests, available_requests):
+        requestid = pushmanager.core.util.get_int_arg(self.request, 'request')
+        for request in push_requests.get('all', []):
+            if request['id'] == requestid and request['state'] in PUSH_SECTIONS:
+                return request['state'], [request]
+        for request in available_requests:
+            if request['id'] == requestid:
+                return 'requested', [request]
+        return None
@@ -4,6 +4,10 @@ import tornado.web
 from pushmanager.core.requesthandler import RequestHandler
 
 
+def newest_first_key(push):
+    return (push['modified'], push['id'])
+
+
 class PushesServlet(RequestHandler):
 
     @tornado.web.authenticated
@@ -14,29 +18,56 @@ class PushesServlet(RequestHandler):
         offset = pushmanager.core.util.get_int_arg(self.request, 'offset', 0)
         state = pushmanager.core.util.get_str_arg(self.request, 'state', '')
         push_user = pushmanager.core.util.get_str_arg(self.request, 'user', '')
+        before = pushmanager.core.util.get_str_arg(self.request, 'before', '')
+        after = pushmanager.core.util.get_str_arg(self.request, 'after', '')
+        if not pushmanager.core.util.parse_push_cursor(before):
+            before = ''
+        if before or not pushmanager.core.util.parse_push_cursor(after):
+            after = ''
+        # Pages are linked through push cursors, one more push than
+        # displayed tells whether there is a page past this one.
         response = yield tornado.gen.Task(
             self.async_api_call,
             'pushes',
             {
-                'rpp': pushes_per_page,
+                'rpp': pushes_per_page + 1,
                 'offset': offset,
                 'state': state,
                 'user': push_user,
+                'before': before,
+                'after': after,
+                'count': 0,
             }
         )
+        if self.check_page_etag(response):
+            return
 
         results = self.get_api_results(response)
         if not results:
             self.finish()
 
-        pushes, pushes_count = results
+        pushes = sorted(results[0], key=newest_first_key, reverse=True)
+        more = len(pushes) > pushes_per_page
+        if more:
+            # The extra push is the farthest from the cursor
+            pushes = pushes[1:] if after else pushes[:-1]
+
+        newer_cursor = older_cursor = None
+        if pushes:
+            if (after and more) or before or (offset > 0 and not after):
+                newer_cursor = pushmanager.core.util.push_cursor(pushes[0])
+            if after or more:
+                older_cursor = pushmanager.core.util.push_cursor(pushes[-1])
+
+        accepting = [push for push in pushes if push['state'] == 'accepting']
+        pushes = accepting + [push for push in pushes if push['state'] != 'accepting']
         self.render(
             "pushes.html",
             page_title="Pushes",
             pushes=pushes,
-            offset=offset,
             rpp=pushes_per_page,
             state=state,
             push_user=push_user,
-            pushes_count=pushes_count,
+            newer_cursor=newer_cursor,
+            older_cursor=older_cursor,
         )
@@ -0,0 +1,55 @@
+import json
+import time
+
+import pushmanager.core.db as db
+import pushmanager.core.util
+import tornado.web
+from pushmanager.core import events
+from pushmanager.core.requesthandler import RequestHandler
+
+
+class PushEventsServlet(RequestHandler):
+    """Long poll for the changes to a push page: answers with the
+    events on the push and on requests published after the since
+    timestamp, as soon as there is one or after TIMEOUT seconds
+    without any. The since returned is the one to poll from next.
+
+    Events from up to EventHub.RELAY_MARGIN seconds before since are
+    sent again unless their ids are in the comma separated seen
+    argument, as one relayed late may have missed the previous poll.
+    """
+
+    TIMEOUT = 60
+
+    @tornado.web.asynchronous
+    def get(self):
+        if not self.current_user:
+            return self.send_error(403)
+        pushid = pushmanager.core.util.get_int_arg(self.request, 'id')
+        try:
+            self.since = float(pushmanager.core.util.get_str_arg(self.request, 'since', ''))
+        except ValueError:
+            self.since = time.time()
+        seen = [i for i in pushmanager.core.util.get_str_arg(self.request, 'seen', '').split(',') if i]
+
+        self.waiter = None
+        self.timeout = self.io_loop.add_timeout(time.time() + self.TIMEOUT, self.on_timeout)
+        channels = (db.push_data_version(pushid), db.REQUESTS_DATA_VERSION)
+        self.waiter = events.hub.wait(channels, self.since, self.on_events, seen)
+
+    def on_events(self, push_events):
+        self.io_loop.remove_timeout(self.timeout)
+        self.respond(push_events, max([self.since] + [e['time'] for e in push_events]))
+
+    def on_timeout(self):
+        events.hub.cancel(self.waiter)
+        self.respond([], self.since)
+
+    def on_connection_close(self):
+        events.hub.cancel(self.waiter)
+        self.io_loop.remove_timeout(self.timeout)
+
+    def respond(self, push_events, since):
+        self.set_header("Content-Type", "application/json")
+        self.write(json.dumps({'events': push_events, 'since': since}))
+        self.finish()
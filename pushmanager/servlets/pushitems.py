@@ -9,13 +9,23 @@ class PushItemsServlet(RequestHandler):
     @tornado.web.asynchronous
     @tornado.gen.engine
     def get(self):
-        pushid = pushmanager.core.util.get_int_arg(self.request, 'push', None)
+        # Several push arguments load the items of many pushes in one
+        # call, e.g. for the Expand All button of the pushes page.
+        pushids = pushmanager.core.util.get_int_args(self.request, 'push')
 
         response = yield tornado.gen.Task(
                         self.async_api_call,
                         "pushitems",
-                        {"push_id": pushid}
+                        {"push_id": pushids}
                     )
 
         results = self.get_api_results(response)
-        self.render("pushitems.html", requests=results)
+        if results is None:
+            return
+        if len(pushids) > 1:
+            requests_by_push = dict((pushid, []) for pushid in pushids)
+            for request in results:
+                requests_by_push[request['push']].append(request)
+            self.render("pushitems_batch.html", pushids=pushids, requests_by_push=requests_by_push)
+        else:
+            self.render("pushitems.html", requests=results)
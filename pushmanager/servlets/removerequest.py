@@ -5,6 +5,7 @@ import sqlalchemy as SA
 import pushmanager.core.db as db
 import pushmanager.core.util
 import tornado.web
+from pushmanager.core import events
 from pushmanager.core.mail import MailQueue
 from pushmanager.core.requesthandler import RequestHandler
 from pushmanager.core.xmppclient import XMPPQueue
@@ -32,15 +33,18 @@ class RemoveRequestServlet(RequestHandler):
             db.push_pushcontents.c.push == self.pushid,
             db.push_pushcontents.c.request.in_(self.requestid),
         ))
-        db.execute_transaction_cb([select_query, update_query, delete_query], self.on_db_complete)
+        version_queries = db.bump_data_versions_queries(db.push_data_version(self.pushid), db.REQUESTS_DATA_VERSION)
+        db.execute_transaction_cb([select_query, update_query, delete_query] + version_queries, self.on_db_complete)
 
     # allow both GET and POST
     get = post
 
     def on_db_complete(self, success, db_results):
         self.check_db_results(success, db_results)
+        events.publish_changes([db.push_data_version(self.pushid), db.REQUESTS_DATA_VERSION], 'remove')
+        self.mark_db_write()
 
-        reqs, _, _ = db_results
+        reqs = db_results[0]
         removal_dicts = []
         for req in reqs:
             if req['watchers']:
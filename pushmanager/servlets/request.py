@@ -19,6 +19,8 @@ class RequestServlet(RequestHandler):
                         "request",
                         {'id': request_id}
                     )
+        if self.check_page_etag(response):
+            return
 
         req = self.get_api_results(response)
         if not req:
@@ -12,7 +12,8 @@ class RequestsServlet(RequestHandler):
     def get(self):
         username = pushmanager.core.util.get_str_arg(self.request, 'user')
         limit_count = pushmanager.core.util.get_int_arg(self.request, 'max')
-        arguments = {'limit': limit_count}
+        # The request modules show descriptions, comments and conflicts
+        arguments = {'limit': limit_count, 'detail': 1}
 
         if username:
             arguments['user'] = username
@@ -29,6 +30,8 @@ class RequestsServlet(RequestHandler):
                         "requestsearch",
                         arguments
                     )
+        if self.check_page_etag(response):
+            return
 
         requests = self.get_api_results(response)
         self.render("requests.html", requests=requests, page_title=page_title, show_count=show_count)
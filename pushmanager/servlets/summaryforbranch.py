@@ -17,7 +17,7 @@ class SummaryForBranchServlet(RequestHandler):
         response = yield tornado.gen.Task(
                         self.async_api_call,
                         "requestsearch",
-                        {'repo': user, 'branch': branch}
+                        {'repo': user, 'branch': branch, 'detail': 1}
                     )
 
         requests = self.get_api_results(response)
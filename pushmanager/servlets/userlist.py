@@ -16,6 +16,8 @@ class UserListServlet(RequestHandler):
                         "userlist",
                         {}
                     )
+        if self.check_page_etag(response):
+            return
 
         users_by_alpha = defaultdict(list)
         map(
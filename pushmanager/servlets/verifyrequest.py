@@ -2,6 +2,7 @@ import sqlalchemy as SA
 
 import pushmanager.core.db as db
 import pushmanager.core.util
+from pushmanager.core import events
 from pushmanager.core.requesthandler import RequestHandler
 from pushmanager.core.xmppclient import XMPPQueue
 
@@ -40,10 +41,17 @@ class VerifyRequestServlet(RequestHandler):
                     db.push_pushcontents.c.request == db.push_requests.c.id,
                 )
             )))
-        db.execute_transaction_cb([select_query, update_query, finished_query], self.on_db_complete)
+        version_queries = db.bump_data_versions_queries(db.push_data_version(self.pushid), db.REQUESTS_DATA_VERSION)
+        db.execute_transaction_cb([select_query, update_query, finished_query] + version_queries, self.on_db_complete)
 
     def on_db_complete(self, success, db_results):
         self.check_db_results(success, db_results)
+        events.publish_changes(
+            [db.push_data_version(self.pushid), db.REQUESTS_DATA_VERSION],
+            'verify',
+            request=self.requestid,
+        )
+        self.mark_db_write()
 
         push = db_results[0].first()
         unfinished_requests = db_results[2].first()
@@ -84,6 +84,46 @@ $(function() {
         }
     });
 
+    // Complete user names from /api/usersearch: the repo, which is
+    // named after its owner, and the last of the comma separated
+    // watchers.
+    PushManager.NewRequestDialog.last_user = function(value) {
+        return value.split(/,\s*/).pop();
+    };
+    PushManager.NewRequestDialog.search_users = function(prefix, response) {
+        if(!prefix) {
+            response([]);
+            return;
+        }
+        $.ajax({
+            'url': '/api/usersearch',
+            'data': {'prefix': prefix},
+            'dataType': 'json',
+            'success': response,
+            'error': function() { response([]); }
+        });
+    };
+    $('#request-form-repo').autocomplete({
+        'minLength': 1,
+        'source': function(request, response) {
+            PushManager.NewRequestDialog.search_users(request.term, response);
+        }
+    });
+    $('#request-form-watchers').autocomplete({
+        'minLength': 1,
+        'source': function(request, response) {
+            PushManager.NewRequestDialog.search_users(PushManager.NewRequestDialog.last_user(request.term), response);
+        },
+        'focus': function() { return false; },
+        'select': function(event, ui) {
+            var users = this.value.split(/,\s*/);
+            users.pop();
+            users.push(ui.item.value);
+            this.value = users.join(', ');
+            return false;
+        }
+    });
+
     // Handle bookmarklet requests
     if(PushManager.urlParams['bookmarklet'] == '1') {
         PushManager.NewRequestDialog.open_new_request(
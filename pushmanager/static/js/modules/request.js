@@ -53,6 +53,16 @@ $(function() {
         button.attr('src', "/static/img/button_expand.gif");
     };
 
+    // Show the change of a request: push pages apply the changes to
+    // the push, other pages are reloaded.
+    PushManager.Request.on_request_changed = function() {
+        if(PushManager.refresh_push) {
+            PushManager.refresh_push();
+        } else {
+            window.location.reload();
+        }
+    };
+
     // Bind expander to both title and expand icon
     $('.request-item-expander, .request-item-title').live('click', PushManager.Request.expand_push_item);
     $('.request-item-expander[expand=yes]').each(PushManager.Request.expand_push_item);
@@ -65,7 +75,7 @@ $(function() {
             'type': 'POST',
             'url': '/delayrequest',
             'data': {'id': requestid},
-            'success': function() { window.location.reload(); },
+            'success': function() { PushManager.Request.on_request_changed(); },
             'error': function() { alert('Something went wrong while trying to delay the request.'); }
         });
     };
@@ -89,7 +99,7 @@ $(function() {
             'type': 'POST',
             'url': '/undelayrequest',
             'data': {'id': requestid},
-            'success': function() { window.location.reload(); },
+            'success': function() { PushManager.Request.on_request_changed(); },
             'error': function() { alert('Something went wrong while trying to un-delay the request.'); }
         });
     };
@@ -102,7 +112,7 @@ $(function() {
                 'type': 'POST',
                 'url': '/discardrequest',
                 'data': {'id': requestid},
-                'success': function() { window.location.reload(); },
+                'success': function() { PushManager.Request.on_request_changed(); },
                 'error': function() { alert('Something went wrong while trying to discard the request.'); }
             });
         }
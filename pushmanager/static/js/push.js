@@ -22,7 +22,6 @@ $(function() {
             });
     };
     PushManager.reload_checklist();
-    setInterval("PushManager.reload_checklist()", 30000);
     $('.checklist-item').live('click', function() {
         var that = $(this);
         var ids = that.attr('checklistid').split(',');
@@ -33,6 +32,7 @@ $(function() {
                 'url': '/checklisttoggle',
                 'data': {
                     'id': ids[i],
+                    'push': $('#push-info').attr('push'),
                     'complete': is_complete
                 }
             });
@@ -218,7 +218,7 @@ $(function() {
                                 ($.proxy(PushManager.Request.collapse_push_item, this))();
                             });
                     });
-                    setTimeout('PushManager.update_status_counts()', 50);
+                    setTimeout('PushManager.refresh_push()', 50);
                     $('.request-multi-select').attr('checked', '');
                 },
                 'error': function() { alert("Adding a request to the push failed."); }
@@ -240,7 +240,7 @@ $(function() {
                                 ($.proxy(PushManager.Request.collapse_push_item, this))();
                             });
                     });
-                    setTimeout('PushManager.update_status_counts()', 50);
+                    setTimeout('PushManager.refresh_push()', 50);
                     $('.request-multi-select').attr('checked', '');
                 },
                 'error': function() { alert("Removing a request from the push failed."); }
@@ -269,7 +269,7 @@ $(function() {
         return PushManager.requests_to_names(requests);
     };
 
-    PushManager.update_status_counts = function() {
+    PushManager.update_item_counts = function() {
         $('.status-header').each(function() {
             var that = $(this);
             var status_items_count = that.next('ul.push-items').children('li').length;
@@ -280,11 +280,164 @@ $(function() {
                 that.find('.item-count').text('(' + status_items_count + ')');
             }
         });
+    };
+    PushManager.update_status_counts = function() {
+        PushManager.update_item_counts();
         PushManager.reload_checklist();
     };
     PushManager.update_status_counts()
 
-    $('.comment-request').click(function() {
+    // Set up request items rendered after the page was loaded
+    PushManager.init_push_items = function(items) {
+        items.each(function() {
+            ($.proxy(PushManager.Request.collapse_push_item, this))();
+        });
+        items.find('.request-comments, .request-description').each(function() {
+            PushManager.Request.format_comments_dom(this);
+        });
+        items.find('.tag-buildbot').each(function() { PushManager.Request.load_bb_failures(this); });
+    };
+
+    // Render the items of a section again from /pushsection
+    PushManager.load_push_section = function(section) {
+        $.ajax({
+            'url': '/pushsection',
+            'data': {
+                'id': $('#push-info').attr('push'),
+                'override': $('#push-info').attr('override'),
+                'section': section
+            },
+            'dataType': 'html',
+            'cache': false,
+            'success': function(data) {
+                var items = $('#' + section + '-items');
+                items.children('li').remove();
+                items.append(data);
+                PushManager.init_push_items(items.children('li'));
+                PushManager.update_item_counts();
+            },
+            'error': function() { window.location.reload(); }
+        });
+    };
+
+    // Render the item of a request again from /pushrequestrow, at the
+    // end of its section
+    PushManager.load_push_request = function(request, section) {
+        $.ajax({
+            'url': '/pushrequestrow',
+            'data': {
+                'id': $('#push-info').attr('push'),
+                'override': $('#push-info').attr('override'),
+                'request': request
+            },
+            'dataType': 'html',
+            'cache': false,
+            'success': function(data) {
+                var item = $($.trim(data)).filter('li');
+                $('.request-module[request=' + request + ']').parent().remove();
+                item.appendTo('#' + section + '-items');
+                PushManager.init_push_items(item);
+                PushManager.update_item_counts();
+            },
+            'error': function() { window.location.reload(); }
+        });
+    };
+
+    // Render the items of the requests changed since the last update
+    // again in their section and drop the ones which left the page, from
+    // the changes returned by /api/pushdata?since=. Sections with more
+    // than MAX_CHANGED_ITEMS changed requests are rendered whole. A
+    // change of the push state needs the whole page rendered again.
+    PushManager.MAX_CHANGED_ITEMS = 5;
+    PushManager.apply_push_changes = function(changes) {
+        if(changes.push.state != $('#push-info').attr('state')) {
+            window.location.reload();
+            return;
+        }
+        var changed = {};
+        var add_change = function(request, section) {
+            changed[section] = changed[section] || [];
+            changed[section].push(request.id);
+        };
+        $.each(changes.requests.all || [], function() { add_change(this, this.state); });
+        $.each(changes.available, function() { add_change(this, 'requested'); });
+        $.each(changes.removed, function() {
+            $('.request-module[request=' + this + ']').parent().remove();
+        });
+        $.each(changed, function(section, requests) {
+            if(requests.length > PushManager.MAX_CHANGED_ITEMS) {
+                $.each(requests, function() {
+                    $('.request-module[request=' + this + ']').parent().remove();
+                });
+                PushManager.load_push_section(section);
+            } else {
+                $.each(requests, function() { PushManager.load_push_request(this, section); });
+            }
+        });
+        $('#push-info').attr('since', changes.since);
+        PushManager.update_status_counts();
+    };
+    PushManager.refresh_push = function() {
+        $.ajax({
+            'url': '/api/pushdata',
+            'data': {'id': $('#push-info').attr('push'), 'since': $('#push-info').attr('since')},
+            'dataType': 'json',
+            'cache': false,
+            'success': PushManager.apply_push_changes,
+            'error': PushManager.reload_checklist
+        });
+    };
+
+    // Wait for changes to the push and to requests from /pushevents and
+    // update the page as they come; refresh_push reloads the checklist
+    // as well. Polls again right away, or after 30s when it failed.
+    // The ids of the events received within EVENTS_RELAY_MARGIN
+    // seconds (EventHub.RELAY_MARGIN) of the cursor are sent back, so
+    // that they are not sent again.
+    PushManager.EVENTS_RELAY_MARGIN = 2;
+    PushManager.events_since = $('#push-info').attr('since');
+    PushManager.events_seen = {};
+    PushManager.wait_for_events = function() {
+        var seen = [];
+        for(var id in PushManager.events_seen) {
+            seen.push(id);
+        }
+        $.ajax({
+            'url': '/pushevents',
+            'data': {
+                'id': $('#push-info').attr('push'),
+                'since': PushManager.events_since,
+                'seen': seen.join(',')
+            },
+            'dataType': 'json',
+            'cache': false,
+            'success': function(data) {
+                PushManager.events_since = data.since;
+                var checklist_only = true;
+                $.each(data.events, function() {
+                    checklist_only = checklist_only && this.kind == 'checklist';
+                    PushManager.events_seen[this.id] = this.time;
+                });
+                for(var id in PushManager.events_seen) {
+                    if(PushManager.events_seen[id] <= data.since - PushManager.EVENTS_RELAY_MARGIN) {
+                        delete PushManager.events_seen[id];
+                    }
+                }
+                if(!checklist_only) {
+                    PushManager.refresh_push();
+                } else if(data.events.length > 0) {
+                    PushManager.reload_checklist();
+                }
+                PushManager.wait_for_events();
+            },
+            'error': function() {
+                setTimeout('PushManager.wait_for_events()', 30000);
+            }
+        });
+    };
+    PushManager.wait_for_events();
+
+    $('.comment-request').live('click', function() {
         PushManager.comment_dialog($(this).closest('.request-module').attr('request'));
     });
 
@@ -370,7 +523,7 @@ $(function() {
                         'data': {'id': $('#push-info').attr('push')},
                         'success': function() {
                             $("#added-items").children().detach().appendTo('#staged-items');
-                            setTimeout('PushManager.update_status_counts()', 50);
+                            setTimeout('PushManager.refresh_push()', 50);
                         },
                         'error': function() { alert("Something went wrong when marking the newly added items as staged."); }
                     });
@@ -379,7 +532,7 @@ $(function() {
         });
     });
 
-    $('.verify-request').click(function() {
+    $('.verify-request').live('click', function() {
         var that = $(this).closest('.request-module');
         $.ajax({
             'type': 'POST',
@@ -387,13 +540,13 @@ $(function() {
             'data': {'id': that.attr('request'), 'push': $('#push-info').attr('push')},
             'success': function() {
                 that.parent().detach().appendTo('#verified-items');
-                setTimeout('PushManager.update_status_counts()', 50);
+                setTimeout('PushManager.refresh_push()', 50);
             },
             'error': function() { alert("Something went wrong when marking the request as verified."); }
         });
     });
 
-    $('.pickme-request').click(function() {
+    $('.pickme-request').live('click', function() {
         var that = $(this).closest('.request-module');
         $.ajax({
             'type': 'POST',
@@ -401,13 +554,13 @@ $(function() {
             'data': {'request': that.attr('request'), 'push': $('#push-info').attr('push')},
             'success': function() {
                 that.parent().detach().appendTo('#pickme-items');
-                setTimeout('PushManager.update_status_counts()', 50);
+                setTimeout('PushManager.refresh_push()', 50);
             },
             'error': function() { alert("Something went wrong when marking the request as pickme."); }
         });
     });
 
-    $('.unpickme-request').click(function() {
+    $('.unpickme-request').live('click', function() {
         var that = $(this).closest('.request-module');
         $.ajax({
             'type': 'POST',
@@ -415,7 +568,7 @@ $(function() {
             'data': {'request': that.attr('request'), 'push': $('#push-info').attr('push')},
             'success': function() {
                 that.parent().detach().appendTo('#requested-items');
-                setTimeout('PushManager.update_status_counts()', 50);
+                setTimeout('PushManager.refresh_push()', 50);
             },
             'error': function() { alert("Something went wrong when unmarking the request as pickme."); }
         });
@@ -438,7 +591,7 @@ $(function() {
                 'data': {'id': $('#push-info').attr('push')},
                 'success': function() {
                     $("#verified-items").children().detach().appendTo('#blessed-items');
-                    setTimeout('PushManager.update_status_counts()', 50);
+                    setTimeout('PushManager.refresh_push()', 50);
                 },
                 'error': function() { alert("Something went wrong when marking the newly added items as blessed."); }
             });
@@ -466,7 +619,7 @@ $(function() {
         });
     });
 
-    $('.add-request').click(function() {
+    $('.add-request').live('click', function() {
         $('.request-multi-select').attr('checked', '');
         var that = $(this).closest('.request-module');
         that.find('.request-multi-select').attr('checked', 'true');
@@ -474,14 +627,14 @@ $(function() {
         PushManager.merge_dialog();
     });
 
-    $('.remove-request').click(function() {
+    $('.remove-request').live('click', function() {
         var that = $(this).closest('.request-module');
         $.ajax({
             'url': '/removerequest',
             'data': {'request': that.attr('request'), 'push': $('#push-info').attr('push')},
             'success': function() {
                 that.parent().detach().appendTo('#requested-items');
-                setTimeout('PushManager.update_status_counts()', 50);
+                setTimeout('PushManager.refresh_push()', 50);
                 $('.request-multi-select').attr('checked', '');
                 PushManager.on_done_merging = function() {return;};
                 PushManager.merge_dialog();
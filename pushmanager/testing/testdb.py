@@ -90,7 +90,9 @@ class FakeDataMixin(object):
     def insert_requests(self):
         request_queries = []
         for rd in self.request_data:
-            request_queries.append(db.push_requests.insert(self.make_request_dict(rd)))
+            request = self.make_request_dict(rd)
+            request_queries.append(db.push_requests.insert(request))
+            request_queries.extend(db.request_tags_queries(request['id'], request['tags']))
         db.execute_transaction_cb(request_queries, self.on_db_return)
 
     def insert_pushcontent(self, requestid, pushid):
@@ -133,5 +135,28 @@ class FakeDataMixin(object):
         db.execute_cb(db.push_requests.select(), on_select_return)
         return requests[0]
 
+    def get_request_tags(self, requestid):
+        tags = [None]
+
+        def on_select_return(success, db_results):
+            assert success
+            tags[0] = sorted(row['tag'] for row in db_results.fetchall())
+
+        db.execute_cb(
+            db.push_request_tags.select(db.push_request_tags.c.request == requestid),
+            on_select_return
+        )
+        return tags[0]
+
+    def get_users(self):
+        users = [None]
+
+        def on_select_return(success, db_results):
+            assert success
+            users[0] = dict((row['user'], row) for row in db_results.fetchall())
+
+        db.execute_cb(db.push_users.select(), on_select_return)
+        return users[0]
+
     def get_requests_by_user(self, user):
         return [req for req in self.get_requests() if req['user'] == user]
@@ -49,6 +49,11 @@ CREATE TABLE push_pushcontents (
 	PRIMARY KEY (request, push)
 );
 INSERT INTO "push_pushcontents" VALUES(1,1);
+CREATE TABLE push_data_versions (
+	name VARCHAR(64) NOT NULL,
+	version INTEGER NOT NULL,
+	PRIMARY KEY (name)
+);
 CREATE TABLE push_plans (
 	id INTEGER NOT NULL,
 	content VARCHAR,
@@ -142,4 +147,78 @@ CREATE TABLE push_removals (
 	timestamp INTEGER NOT NULL,
 	PRIMARY KEY (id)
 );
+CREATE TABLE push_request_tags (
+	request INTEGER NOT NULL,
+	tag VARCHAR(64) NOT NULL,
+	PRIMARY KEY (request, tag)
+);
+INSERT INTO "push_request_tags" VALUES(1,'buildbot');
+INSERT INTO "push_request_tags" VALUES(1,'images');
+INSERT INTO "push_request_tags" VALUES(2,'buildbot');
+INSERT INTO "push_request_tags" VALUES(2,'plans');
+INSERT INTO "push_request_tags" VALUES(2,'special');
+INSERT INTO "push_request_tags" VALUES(2,'urgent');
+INSERT INTO "push_request_tags" VALUES(3,'buildbot');
+CREATE TABLE push_users (
+	user VARCHAR(64) NOT NULL,
+	first_seen INTEGER NOT NULL,
+	last_seen INTEGER NOT NULL,
+	PRIMARY KEY (user)
+);
+INSERT INTO "push_users" VALUES('bmetin',1346458591,1346458626);
+INSERT INTO "push_users" VALUES('otheruser',1346458626,1346458626);
+CREATE TABLE push_pushes_archive (
+	id INTEGER NOT NULL,
+	title VARCHAR,
+	user VARCHAR,
+	branch VARCHAR,
+	revision VARCHAR(40),
+	state VARCHAR,
+	created INTEGER,
+	modified INTEGER,
+	pushtype VARCHAR,
+	extra_pings VARCHAR,
+	stageenv VARCHAR,
+	PRIMARY KEY (id)
+);
+CREATE TABLE push_requests_archive (
+	id INTEGER NOT NULL,
+	user VARCHAR,
+	state VARCHAR,
+	repo VARCHAR,
+	branch VARCHAR,
+	revision VARCHAR(40),
+	tags VARCHAR,
+	conflicts VARCHAR,
+	created INTEGER,
+	modified INTEGER,
+	title VARCHAR,
+	comments VARCHAR,
+	reviewid INTEGER,
+	description VARCHAR,
+	watchers VARCHAR,
+	PRIMARY KEY (id)
+);
+CREATE INDEX ix_push_requests_state ON push_requests (state);
+CREATE INDEX ix_push_requests_revision ON push_requests (revision);
+CREATE INDEX ix_push_requests_user ON push_requests (user);
+CREATE INDEX ix_push_requests_repo_branch ON push_requests (repo, branch);
+CREATE INDEX ix_push_requests_modified ON push_requests (modified);
+CREATE INDEX ix_push_pushcontents_push ON push_pushcontents (push, request);
+CREATE INDEX ix_push_pushes_modified ON push_pushes (modified);
+CREATE INDEX ix_push_pushes_state_modified ON push_pushes (state, modified);
+CREATE INDEX ix_push_checklist_request ON push_checklist (request);
+CREATE INDEX ix_push_request_tags_tag ON push_request_tags (tag, request);
+CREATE VIRTUAL TABLE push_requests_fts USING fts5(title, description, content='push_requests', content_rowid='id');
+CREATE TRIGGER push_requests_fts_insert AFTER INSERT ON push_requests BEGIN
+	INSERT INTO push_requests_fts(rowid, title, description) VALUES (new.id, new.title, new.description);
+END;
+CREATE TRIGGER push_requests_fts_delete AFTER DELETE ON push_requests BEGIN
+	INSERT INTO push_requests_fts(push_requests_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description);
+END;
+CREATE TRIGGER push_requests_fts_update AFTER UPDATE OF title, description ON push_requests BEGIN
+	INSERT INTO push_requests_fts(push_requests_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description);
+	INSERT INTO push_requests_fts(rowid, title, description) VALUES (new.id, new.title, new.description);
+END;
+INSERT INTO push_requests_fts(push_requests_fts) VALUES ('rebuild');
 COMMIT;
@@ -1,3 +1,4 @@
+import json
 import logging
 import os
 import types
@@ -10,7 +11,10 @@ import testify as T
 import tornado.web
 import pushmanager.ui_methods as ui_methods
 import pushmanager.ui_modules as ui_modules
+from pushmanager.core import api
 from pushmanager.core import db
+from pushmanager.core import events
+from pushmanager.core.api import APIResponse
 from pushmanager.core.requesthandler import RequestHandler
 from pushmanager.testing import testdb
 from pushmanager.testing.mocksettings import MockedSettings
@@ -75,6 +79,7 @@ class TemplateTestCase(T.TestCase):
             application.settings['cookie_secret'] = 'cookie_secret'
         request = turtle.Turtle()
         self.servlet = RequestHandler(application, request)
+        ui_modules.request_render_cache.clear()
 
     def render_etree(self, page, *args, **kwargs):
         self.servlet.render(page, *args, **kwargs)
@@ -112,6 +117,11 @@ class ServletTestMixin(AsyncTestCase):
 
         with mock.patch.dict(db.Settings, MockedSettings):
             db.init_db()
+        api.pushdata_cache.clear()
+        api.pushes_count_cache.clear()
+        ui_modules.request_render_cache.clear()
+        api.coalesced_reads.clear()
+        events.hub.clear()
 
     @T.teardown
     def cleanup_db(self):
@@ -125,8 +135,5 @@ class ServletTestMixin(AsyncTestCase):
         """This is the mocked response from API. Responses in tests
         are actually comming from pushmanager.servlets.
         """
-        response = mock.MagicMock()
-        response.error = None
-        response.body = self.api_response()
-        callback(response)
+        callback(APIResponse(data=json.loads(self.api_response())))
         self.stop()
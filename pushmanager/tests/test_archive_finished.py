@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+import os
+import time
+
+import testify as T
+from mock import patch
+from pushmanager.core import db
+from pushmanager.testing import testdb
+from pushmanager.testing.mocksettings import MockedSettings
+from pushmanager.testing.testdb import FakeDataMixin
+from tools import archive_finished
+
+
+class ArchiveFinishedTest(T.TestCase, FakeDataMixin):
+
+    @T.setup_teardown
+    def setup_db(self):
+        self.db_file_path = testdb.make_test_db()
+        MockedSettings['db_uri'] = testdb.get_temp_db_uri(self.db_file_path)
+        with patch.dict(db.Settings, MockedSettings):
+            db.init_db()
+            self.insert_pushes()
+            self.insert_requests()
+            old = time.time() - 100 * 24 * 60 * 60
+            db.execute_transaction_cb([
+                db.push_requests.update().where(db.push_requests.c.id.in_([1, 2, 10, 13])).values(
+                    state='live', modified=old,
+                ),
+                db.push_requests.update().where(db.push_requests.c.id == 11).values(
+                    state='discarded', modified=old,
+                ),
+                db.push_pushes.update().where(db.push_pushes.c.id.in_([1, 2, 10, 13])).values(
+                    state='live', modified=old,
+                ),
+            ], self.on_db_return)
+            with patch('sys.stdout'):
+                yield
+            db.finalize_db()
+            os.unlink(self.db_file_path)
+
+    def get_ids(self, table):
+        ids = [None]
+
+        def on_select_return(success, db_results):
+            assert success
+            ids[0] = sorted(row['id'] for row in db_results.fetchall())
+
+        db.execute_cb(table.select(), on_select_return)
+        return ids[0]
+
+    def test_archive_finished(self):
+        archived = archive_finished.archive_finished(days=90, batch_size=2)
+        T.assert_equal(archived, {'push_requests': 4, 'push_pushes': 3})
+
+        # The highest ids (13) are kept so they can't be reused
+        T.assert_equal(self.get_ids(db.push_requests), [3, 12, 13])
+        T.assert_equal(self.get_ids(db.push_requests_archive), [1, 2, 10, 11])
+        T.assert_equal(self.get_ids(db.push_pushes), [11, 12, 13])
+        T.assert_equal(self.get_ids(db.push_pushes_archive), [1, 2, 10])
+
+        T.assert_equal(self.get_request_tags(2), [])
+        T.assert_equal(self.get_request_tags(12), ['search'])
+
+    def test_archive_finished_keeps_recent_rows(self):
+        T.assert_equal(archive_finished.archive_finished(days=200), {'push_requests': 0, 'push_pushes': 0})
+        T.assert_length(self.get_ids(db.push_requests_archive), 0)
+
+    def test_archive_finished_rerun(self):
+        archive_finished.archive_finished()
+        T.assert_equal(archive_finished.archive_finished(), {'push_requests': 0, 'push_pushes': 0})
+        T.assert_equal(self.get_ids(db.push_requests_archive), [1, 2, 10, 11])
+
+    def test_archived_rows_keep_their_values(self):
+        archive_finished.archive_finished()
+
+        rows = [None]
+
+        def on_select_return(success, db_results):
+            assert success
+            rows[0] = db_results.fetchall()
+
+        db.execute_cb(db.select_with_archive(db.push_requests, lambda t: t.c.id == 11), on_select_return)
+        T.assert_length(rows[0], 1)
+        T.assert_equal(rows[0][0]['title'], 'Fixing more stuff')
+        T.assert_equal(rows[0][0]['state'], 'discarded')
+
+    @patch('tools.archive_finished.archive_finished')
+    @patch('optparse.OptionParser.error')
+    def test_main_args(self, error, archive):
+        with patch('sys.argv', ['archive_finished.py', '--days', '30', '--batch-size', '10']):
+            archive_finished.main()
+        archive.assert_called_once_with(30, 10)
+        T.assert_equal(False, error.called)
+
+
+if __name__ == '__main__':
+    T.run()
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+import os
+
+import testify as T
+from mock import patch
+from pushmanager.core import db
+from pushmanager.testing import testdb
+from pushmanager.testing.mocksettings import MockedSettings
+from pushmanager.testing.testdb import FakeDataMixin
+from tools import backfill_request_tags
+
+
+class BackfillRequestTagsTest(T.TestCase, FakeDataMixin):
+
+    @T.setup_teardown
+    def setup_db(self):
+        self.db_file_path = testdb.create_temp_db_file()
+        MockedSettings['db_uri'] = testdb.get_temp_db_uri(self.db_file_path)
+        with patch.dict(db.Settings, MockedSettings):
+            db.init_db()
+            self.insert_requests()
+            # Start from a table that predates push_request_tags
+            db.execute_cb(db.push_request_tags.delete(), self.on_db_return)
+            with patch('sys.stdout'):
+                yield
+            db.finalize_db()
+            os.unlink(self.db_file_path)
+
+    def test_backfill(self):
+        T.assert_equal(backfill_request_tags.backfill_request_tags(batch_size=3), 4)
+        T.assert_equal(self.get_request_tags(10), [])
+        T.assert_equal(self.get_request_tags(12), ['search'])
+        T.assert_equal(self.get_request_tags(13), ['search'])
+
+    def test_backfill_resume(self):
+        T.assert_equal(backfill_request_tags.backfill_request_tags(start_id=13), 1)
+        T.assert_equal(self.get_request_tags(12), [])
+        T.assert_equal(self.get_request_tags(13), ['search'])
+
+    def test_backfill_rerun(self):
+        backfill_request_tags.backfill_request_tags()
+        backfill_request_tags.backfill_request_tags()
+        T.assert_equal(self.get_request_tags(12), ['search'])
+
+    @patch('tools.backfill_request_tags.backfill_request_tags')
+    @patch('optparse.OptionParser.error')
+    def test_main_args(self, error, backfill):
+        with patch('sys.argv', ['backfill_request_tags.py', '--start-id', '12', '--batch-size', '10']):
+            backfill_request_tags.main()
+        backfill.assert_called_once_with(12, 10)
+        T.assert_equal(False, error.called)
+
+
+if __name__ == '__main__':
+    T.run()
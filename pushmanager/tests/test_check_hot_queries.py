@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+import os
+
+import testify as T
+from mock import patch
+from pushmanager.core import db
+from pushmanager.testing import testdb
+from pushmanager.testing.mocksettings import MockedSettings
+from tools import check_hot_queries
+
+
+class CheckHotQueriesTest(T.TestCase):
+
+    @T.setup_teardown
+    def setup_db(self):
+        self.db_file_path = testdb.create_temp_db_file()
+        MockedSettings['db_uri'] = testdb.get_temp_db_uri(self.db_file_path)
+        with patch.dict(db.Settings, MockedSettings):
+            db.init_db()
+            with patch('sys.stdout'):
+                yield
+            db.finalize_db()
+            os.unlink(self.db_file_path)
+
+    def test_no_full_scans(self):
+        T.assert_equal(check_hot_queries.check_hot_queries(), [])
+
+    def test_full_scan_reported(self):
+        db.execute_cb('DROP INDEX ix_push_requests_revision', lambda success, _: T.assert_equal(success, True))
+        T.assert_equal(check_hot_queries.check_hot_queries(), ['request with sha'])
+
+    @patch('tools.check_hot_queries.check_hot_queries', return_value=[])
+    @patch('optparse.OptionParser.parse_args', return_value=[None, []])
+    def test_main(self, parser, check):
+        T.assert_equal(check_hot_queries.main(), 0)
+        check.assert_called_once_with()
+
+
+if __name__ == '__main__':
+    T.run()
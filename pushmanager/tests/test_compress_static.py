@@ -0,0 +1,48 @@
+import gzip
+import os
+import shutil
+import tempfile
+
+import mock
+import testify as T
+from tools import compress_static
+
+
+class CompressStaticTest(T.TestCase):
+
+    @T.setup_teardown
+    def setup_static_path(self):
+        self.static_path = tempfile.mkdtemp()
+        os.mkdir(os.path.join(self.static_path, 'js'))
+        self.files = {
+            'js/big.js': 'var x;' * 1000,
+            'js/small.js': 'var x;',
+            'img/big.gif': 'GIF89a' * 1000,
+        }
+        for name, content in self.files.items():
+            path = os.path.join(self.static_path, name)
+            if not os.path.isdir(os.path.dirname(path)):
+                os.mkdir(os.path.dirname(path))
+            with open(path, 'w') as f:
+                f.write(content)
+        with mock.patch('sys.stdout'):
+            yield
+        shutil.rmtree(self.static_path)
+
+    def test_compress_static(self):
+        big_js = os.path.join(self.static_path, 'js/big.js')
+        T.assert_equal(compress_static.compress_static(self.static_path), [big_js])
+
+        compressed = gzip.GzipFile(big_js + '.gz')
+        T.assert_equal(compressed.read(), self.files['js/big.js'])
+        compressed.close()
+
+        # Up to date copies are left alone
+        T.assert_equal(compress_static.compress_static(self.static_path), [])
+
+        # Stale copies are rewritten
+        os.utime(big_js + '.gz', (0, os.path.getmtime(big_js) - 10))
+        T.assert_equal(compress_static.compress_static(self.static_path), [big_js])
+        T.assert_equal(compress_static.compress_static(self.static_path, min_size=0), [
+            os.path.join(self.static_path, 'js/small.js'),
+        ])
@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+
+import mock
+import testify as T
+from pushmanager.core import cache
+from pushmanager.core.cache import SingleFlight
+from pushmanager.core.cache import VersionedCache
+
+
+class VersionedCacheTest(T.TestCase):
+
+    def test_get_checks_version(self):
+        cache = VersionedCache(10)
+        cache.set('push', (1, 2), 'data')
+        T.assert_equal(cache.get('push', (1, 2)), 'data')
+        T.assert_equal(cache.get('push', (1, 3)), None)
+        T.assert_equal(cache.get('other', (1, 2)), None)
+        T.assert_equal(cache.as_dict(), {'size': 0, 'max_size': 10, 'hits': 1, 'misses': 2, 'hit_rate': 1.0 / 3})
+
+    def test_evicts_least_recently_used(self):
+        cache = VersionedCache(2)
+        cache.set(1, 0, 'one')
+        cache.set(2, 0, 'two')
+        cache.get(1, 0)
+        cache.set(3, 0, 'three')
+        T.assert_equal(cache.get(2, 0), None)
+        T.assert_equal(cache.get(1, 0), 'one')
+        T.assert_equal(cache.get(3, 0), 'three')
+
+    def test_disabled(self):
+        cache = VersionedCache(0)
+        cache.set(1, 0, 'one')
+        T.assert_equal(cache.get(1, 0), None)
+
+
+class SingleFlightTest(T.TestCase):
+
+    def test_coalesces_calls_in_flight(self):
+        single_flight = SingleFlight()
+        pending = []
+        results = []
+        single_flight.call('push', pending.append, results.append)
+        single_flight.call('push', pending.append, results.append)
+        single_flight.call('other', pending.append, results.append)
+        T.assert_length(pending, 2)
+
+        pending[0]('data')
+        T.assert_equal(results, ['data', 'data'])
+        T.assert_equal(single_flight.as_dict(), {'in_flight': 1, 'calls': 3, 'coalesced': 1, 'expired': 0})
+
+        # Later calls run again
+        single_flight.call('push', pending.append, results.append)
+        T.assert_length(pending, 3)
+
+    def test_failed_call_is_not_in_flight(self):
+        single_flight = SingleFlight()
+
+        def fail(done):
+            raise ValueError()
+
+        with T.assert_raises(ValueError):
+            single_flight.call('push', fail, None)
+        T.assert_equal(single_flight.in_flight, {})
+
+    def test_copies_for_coalesced_calls(self):
+        single_flight = SingleFlight(copy=lambda result: dict(result))
+        pending = []
+        results = []
+        single_flight.call('push', pending.append, results.append)
+        single_flight.call('push', pending.append, results.append)
+
+        data = {'id': 1}
+        pending[0](data)
+        T.assert_is(results[0], data)
+        T.assert_equal(results[1], data)
+        T.assert_is_not(results[1], data)
+
+    def test_stuck_call_expires(self):
+        single_flight = SingleFlight(timeout=30)
+        pending = []
+        results = []
+        with mock.patch.object(cache.time, 'time', return_value=1000):
+            single_flight.call('push', pending.append, results.append)
+        # The first call never returns, later ones don't wait for it
+        with mock.patch.object(cache.time, 'time', return_value=1031), mock.patch.object(cache.logging, 'error'):
+            single_flight.call('push', pending.append, results.append)
+        T.assert_length(pending, 2)
+        T.assert_equal(single_flight.expired, 1)
+
+        pending[1]('data')
+        T.assert_equal(results, ['data'])
+        T.assert_equal(single_flight.in_flight, {})
+
+        # A late return of the first call doesn't touch later ones
+        single_flight.call('push', pending.append, results.append)
+        pending[0]('late')
+        T.assert_equal(results, ['data', 'late'])
+        T.assert_length(single_flight.in_flight, 1)
+
+
+if __name__ == '__main__':
+    T.run()
@@ -0,0 +1,77 @@
+import gzip
+import os
+import shutil
+import tempfile
+
+import testify as T
+import tornado.web
+from pushmanager.core.compression import PrecompressedStaticFileHandler
+from pushmanager.core.compression import TRANSFORMS
+from pushmanager.testing.testservlet import AsyncTestCase
+
+
+class SizedResponseHandler(tornado.web.RequestHandler):
+
+    def get(self, size):
+        self.set_header("Content-Type", "application/json")
+        self.write('"%s"' % ('x' * int(size)))
+
+
+class CompressionTest(T.TestCase, AsyncTestCase):
+
+    @T.class_setup
+    def setup_static_path(self):
+        with open(os.path.join(self.static_path, 'app.js'), 'w') as f:
+            f.write('var original;')
+        with open(os.path.join(self.static_path, 'plain.js'), 'w') as f:
+            f.write('var plain;')
+        compressed = gzip.GzipFile(os.path.join(self.static_path, 'app.js.gz'), 'wb')
+        compressed.write('var precompressed;')
+        compressed.close()
+
+    @T.class_teardown
+    def cleanup_static_path(self):
+        shutil.rmtree(self.static_path)
+
+    def get_app(self):
+        self.static_path = tempfile.mkdtemp()
+        return tornado.web.Application(
+            [(r'/sized/(\d+)', SizedResponseHandler)],
+            transforms=TRANSFORMS,
+            static_path=self.static_path,
+            static_handler_class=PrecompressedStaticFileHandler,
+        )
+
+    def test_gzip_above_threshold(self):
+        response = self.fetch('/sized/2000', use_gzip=True)
+        T.assert_equal(response.headers.get('Content-Encoding'), 'gzip')
+        T.assert_equal(response.headers['Vary'], 'Accept-Encoding')
+        T.assert_equal(response.body, '"%s"' % ('x' * 2000))
+
+        response = self.fetch('/sized/10', use_gzip=True)
+        T.assert_equal(response.headers.get('Content-Encoding'), None)
+        T.assert_equal(response.headers['Vary'], 'Accept-Encoding')
+
+    def test_precompressed_static(self):
+        response = self.fetch('/static/app.js', use_gzip=True)
+        T.assert_equal(response.headers['Content-Encoding'], 'gzip')
+        T.assert_in('javascript', response.headers['Content-Type'])
+        T.assert_equal(response.body, 'var precompressed;')
+
+        response = self.fetch('/static/app.js', use_gzip=False)
+        T.assert_equal(response.headers.get('Content-Encoding'), None)
+        T.assert_equal(response.body, 'var original;')
+
+        response = self.fetch('/static/plain.js', use_gzip=True)
+        T.assert_equal(response.headers.get('Content-Encoding'), None)
+        T.assert_equal(response.body, 'var plain;')
+
+    def test_stale_precompressed_static(self):
+        path = os.path.join(self.static_path, 'app.js')
+        mtime = os.path.getmtime(path + '.gz')
+        os.utime(path, (mtime + 10, mtime + 10))
+        try:
+            response = self.fetch('/static/app.js', use_gzip=True)
+            T.assert_equal(response.body, 'var original;')
+        finally:
+            os.utime(path, (mtime, mtime))
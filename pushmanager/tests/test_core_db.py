@@ -1,8 +1,11 @@
 #!/usr/bin/env python
 
+import contextlib
 import os
+import time
 
 import sqlalchemy as SA
+from sqlalchemy.dialects import mysql
 from sqlalchemy.schema import Column
 from sqlalchemy.schema import Table
 from sqlalchemy.sql.compiler import SQLCompiler
@@ -10,6 +13,7 @@ from sqlalchemy.types import Integer
 
 import mock
 import testify as T
+import tornado.ioloop
 from pushmanager.core import db
 from pushmanager.testing import testdb
 from pushmanager.testing.mocksettings import MockedSettings
@@ -51,6 +55,49 @@ class CoreDBTest(T.TestCase, FakeDataMixin):
         first_push = self.make_push_dict(self.push_data[0])
         T.assert_equal(pushes[0].title, first_push['title'])
 
+    def test_execute_cb_records_pool_checkout(self):
+        db.pool_stats.reset()
+        db.execute_cb(db.push_pushes.select(), self.on_db_return)
+        stats = db.pool_stats.as_dict()
+        T.assert_equal(stats['checkouts'], 1)
+        T.assert_equal(stats['exhausted'], 0)
+        T.assert_equal(stats['pid'], os.getpid())
+
+    def test_execute_cb_records_query_stats(self):
+        db.query_stats.reset()
+        db.execute_cb(db.push_pushes.select(), self.on_db_return)
+        db.execute_transaction_cb(
+            [db.push_pushes.update().values({'extra_pings': ''})],
+            self.on_db_return,
+        )
+        queries = db.query_stats.as_dict()['queries']
+        T.assert_equal(sorted(queries.keys()), ['SELECT push_pushes', 'UPDATE push_pushes'])
+        T.assert_equal(queries['SELECT push_pushes']['count'], 1)
+        T.assert_equal(queries['UPDATE push_pushes']['rows'], len(self.push_data))
+
+    def test_slow_query_logged(self):
+        with mock.patch.object(db.slow_query_log, 'warning') as warning:
+            with mock.patch.dict(db.Settings, {'db_slow_query_threshold': None}):
+                db.execute_cb(db.push_pushes.select(), self.on_db_return)
+            T.assert_equal(warning.called, False)
+
+            with mock.patch.dict(db.Settings, {'db_slow_query_threshold': 0}):
+                db.execute_cb(db.push_pushes.select(), self.on_db_return)
+            T.assert_equal(warning.call_count, 1)
+            T.assert_in('FROM push_pushes', warning.call_args[0][2])
+
+    def test_engine_rebuilt_after_fork(self):
+        parent_engine = db.get_engine()
+        T.assert_is(db.get_engine(), parent_engine)
+        with mock.patch.object(db.os, 'getpid', return_value=-1):
+            child_engine = db.get_engine()
+            T.assert_is_not(child_engine, parent_engine)
+            T.assert_is(db.get_engine(), child_engine)
+            T.assert_equal(str(child_engine.url), str(parent_engine.url))
+            # Never collected, which would close the parent's connections
+            T.assert_in(parent_engine, db.inherited_engines)
+        self.get_pushes()
+
     def test_transaction_with_successful_condition(self):
         def on_return(success, _):
             assert success
@@ -68,6 +115,118 @@ class CoreDBTest(T.TestCase, FakeDataMixin):
             )
         )
 
+    def test_transaction_with_dependent_queries(self):
+        results = []
+
+        def on_return(success, db_results):
+            assert success
+            results.extend(db_results)
+
+        def on_select_return(success, db_results):
+            assert success
+            results.extend(db_results.fetchall())
+
+        db.execute_transaction_cb(
+            [
+                db.push_pushes.insert({'title': 'New', 'user': 'testuser', 'state': 'accepting'}),
+                lambda earlier: [
+                    db.push_pushes.update().where(
+                        db.push_pushes.c.id == earlier[0].lastrowid,
+                    ).values(title='Dependent'),
+                ],
+            ],
+            on_return,
+        )
+        T.assert_length(results, 2)
+        db.execute_cb(db.push_pushes.select(db.push_pushes.c.id == results[0].lastrowid), on_select_return)
+        T.assert_equal(results[2]['title'], 'Dependent')
+
+    def test_updates_set_request_modified(self):
+        rows = []
+
+        def on_select_return(success, db_results):
+            assert success
+            rows.extend(db_results.fetchall())
+
+        def on_insert_return(success, db_results):
+            assert success
+            rows.append(db_results.lastrowid)
+
+        db.execute_cb(db.push_requests.insert({'title': 'Modified', 'modified': 0}), on_insert_return)
+        request_id = rows.pop()
+        before = int(time.time())
+        db.execute_cb(
+            db.push_requests.update().where(db.push_requests.c.id == request_id).values({'conflicts': 'none'}),
+            self.on_db_return,
+        )
+        db.execute_cb(db.push_requests.select(db.push_requests.c.id == request_id), on_select_return)
+        T.assert_equal(type(rows[0]['modified']), int)
+        T.assert_gte(rows[0]['modified'], before)
+
+    def test_bump_data_versions(self):
+        versions = {}
+
+        def on_select_return(success, db_results):
+            assert success
+            versions.update(dict(db_results.fetchall()))
+
+        names = (db.push_data_version(1), db.REQUESTS_DATA_VERSION)
+        db.execute_transaction_cb(db.bump_data_versions_queries(*names), self.on_db_return)
+        db.execute_transaction_cb(db.bump_data_versions_queries(names[1]), self.on_db_return)
+        db.execute_cb(
+            db.data_versions_query(db.push_data_version(1), db.push_data_version(2), names[1]),
+            on_select_return,
+        )
+
+        T.assert_equal(versions, {'push:1': 1, 'requests': 2})
+
+        db.execute_cb(db.data_versions_query(db.PUSHES_DATA_VERSION), on_select_return)
+        T.assert_equal(versions['pushes'], 1)
+
+    def test_user_seen_queries(self):
+        users = {}
+
+        def on_select_return(success, db_results):
+            assert success
+            users.update((row['user'], (row['first_seen'], row['last_seen'])) for row in db_results)
+
+        db.execute_transaction_cb(db.user_seen_queries('newuser', 100), self.on_db_return)
+        db.execute_transaction_cb(db.user_seen_queries('newuser', 200), self.on_db_return)
+        db.execute_transaction_cb(db.user_seen_queries('otheruser', 300), self.on_db_return)
+        db.execute_cb(db.push_users.select(), on_select_return)
+
+        T.assert_equal(users, {'newuser': (100, 200), 'otheruser': (300, 300)})
+
+    def test_stream_cb(self):
+        chunks = []
+        outcome = []
+        db.stream_cb(
+            db.push_pushes.select(order_by=db.push_pushes.c.id),
+            lambda rows: chunks.append([row['id'] for row in rows]) or True,
+            outcome.append,
+            chunk_size=1,
+        )
+        T.assert_equal(outcome, [True])
+        T.assert_equal(chunks, [[push[0]] for push in self.push_data])
+
+        # Reading stops when chunk_fn returns False
+        chunks = []
+        db.stream_cb(db.push_pushes.select(), chunks.append, outcome.append, chunk_size=1)
+        T.assert_length(chunks, 1)
+
+    def test_requests_matching_mysql(self):
+        dialect = mysql.dialect()
+        with mock.patch.object(db, 'get_engine', return_value=mock.Mock(dialect=dialect)):
+            fulltext_filter, relevance = db.requests_matching('fix stuff')
+        T.assert_equal(
+            str(fulltext_filter.compile(dialect=dialect)),
+            'MATCH (push_requests.title, push_requests.description) AGAINST (%s IN NATURAL LANGUAGE MODE) > %s',
+        )
+        T.assert_equal(
+            str(relevance.compile(dialect=dialect)),
+            'MATCH (push_requests.title, push_requests.description) AGAINST (%s IN NATURAL LANGUAGE MODE) DESC',
+        )
+
     def test_transaction_with_unsuccessful_condition(self):
         def on_return(success, _):
             # Transaction should fail since the condition will not be
@@ -87,6 +246,268 @@ class CoreDBTest(T.TestCase, FakeDataMixin):
             )
 
 
+class PoolOptionsTest(T.TestCase):
+
+    def test_sqlite_pool_options(self):
+        with mock.patch.dict(db.Settings, {'db_pool': {'size': 20}}):
+            T.assert_equal(db.get_pool_options('sqlite:///tmp.db'), {'pool_recycle': 3600})
+
+    def test_mysql_pool_options(self):
+        pool_settings = {'size': 20, 'max_overflow': 5, 'timeout': 3, 'recycle': 600}
+        with mock.patch.dict(db.Settings, {'db_pool': pool_settings}):
+            T.assert_equal(
+                db.get_pool_options('mysql://user@host/db'),
+                {'pool_size': 20, 'max_overflow': 5, 'pool_timeout': 3, 'pool_recycle': 600},
+            )
+
+    def test_pool_stats(self):
+        stats = db.PoolStats()
+        stats.record_checkout(0.5, False)
+        stats.record_checkout(1.5, True)
+        stats.record_timeout()
+        result = stats.as_dict()
+        T.assert_equal(result['checkouts'], 2)
+        T.assert_equal(result['checkout_wait_total'], 2.0)
+        T.assert_equal(result['checkout_wait_max'], 1.5)
+        T.assert_equal(result['exhausted'], 2)
+        T.assert_equal(result['timeouts'], 1)
+
+
+class QueryStatsTest(T.TestCase):
+
+    def test_query_label(self):
+        T.assert_equal(db.query_label('SELECT push_requests.id \nFROM push_requests'), 'SELECT push_requests')
+        T.assert_equal(db.query_label('INSERT INTO push_checklist (request) VALUES (?)'), 'INSERT push_checklist')
+        T.assert_equal(db.query_label('UPDATE `push_pushes` SET state=%s'), 'UPDATE push_pushes')
+        T.assert_equal(db.query_label('SELECT 1'), 'SELECT')
+
+    def test_query_stats(self):
+        stats = db.QueryStats()
+        stats.record('SELECT push_requests', 0.0005, -1)
+        stats.record('SELECT push_requests', 0.2, 3)
+        stats.record('SELECT push_requests', 10, 2)
+        result = stats.as_dict()['queries']['SELECT push_requests']
+        T.assert_equal(result['count'], 3)
+        T.assert_equal(result['time_max'], 10)
+        T.assert_equal(result['rows'], 5)
+        T.assert_equal(result['buckets'], [1, 0, 0, 0, 0, 1, 0, 0])
+
+
+class CoreDBAsyncTest(T.TestCase, FakeDataMixin):
+
+    @T.setup
+    def setup_db_settings(self):
+        self.db_file_path = testdb.create_temp_db_file()
+        self.io_loop = tornado.ioloop.IOLoop()
+        MockedSettings['db_uri'] = testdb.get_temp_db_uri(self.db_file_path)
+        MockedSettings['db_threads'] = 2
+        self.settings_patcher = mock.patch.dict(db.Settings, MockedSettings)
+        self.settings_patcher.start()
+        db.init_db()
+        self.insert_pushes()
+        self.insert_requests()
+
+    @T.teardown
+    def cleanup_database(self):
+        db.finalize_db()
+        self.settings_patcher.stop()
+        self.io_loop.close()
+        os.unlink(self.db_file_path)
+
+    def wait_for_callback(self, execute_fn, *args, **kwargs):
+        outcome = []
+
+        def on_db_return(success, db_results):
+            outcome.append((success, db_results))
+            self.io_loop.stop()
+
+        execute_fn(*args, callback_fn=on_db_return, io_loop=self.io_loop, **kwargs)
+        self.io_loop.add_timeout(time.time() + 5, self.io_loop.stop)
+        self.io_loop.start()
+        T.assert_length(outcome, 1)
+        return outcome[0]
+
+    def test_execute_async_cb(self):
+        success, db_results = self.wait_for_callback(db.execute_async_cb, db.push_pushes.select())
+        T.assert_equal(success, True)
+        T.assert_equal(len(db_results.fetchall()), len(self.push_data))
+        T.assert_equal(db_results.fetchone(), None)
+
+    def test_execute_async_cb_runs_in_thread_pool(self):
+        with mock.patch.object(db, 'execute_cb', wraps=db.execute_cb) as execute_cb:
+            self.wait_for_callback(db.execute_async_cb, db.push_pushes.select())
+            T.assert_equal(execute_cb.call_count, 1)
+        T.assert_not_equal(db.get_thread_pool(), None)
+
+    def test_execute_transaction_async_cb(self):
+        success, db_results = self.wait_for_callback(
+            db.execute_transaction_async_cb,
+            [
+                db.push_pushcontents.insert({'request': 10, 'push': 10}),
+                db.push_pushcontents.select(),
+            ],
+        )
+        T.assert_equal(success, True)
+        T.assert_equal(db_results[1].first().request, 10)
+
+    def test_execute_transaction_async_cb_failure(self):
+        with mock.patch("%s.db.logging.error" % __name__):
+            success, db_results = self.wait_for_callback(
+                db.execute_transaction_async_cb,
+                [db.push_pushcontents.insert({'request': 10, 'push': 10})],
+                condition=(db.push_pushcontents.select(), lambda results: False),
+            )
+        T.assert_equal(success, False)
+        T.assert_equal(db_results, None)
+
+    def test_execute_async_cb_connect_failure(self):
+        with contextlib.nested(
+            mock.patch.object(db, 'connect', side_effect=db.exc.TimeoutError()),
+            mock.patch("%s.db.logging.error" % __name__),
+        ):
+            success, db_results = self.wait_for_callback(db.execute_async_cb, db.push_pushes.select())
+            T.assert_equal((success, db_results), (False, None))
+
+            success, db_results = self.wait_for_callback(
+                db.execute_transaction_async_cb,
+                [db.push_pushes.select()],
+            )
+            T.assert_equal((success, db_results), (False, None))
+
+    def test_execute_async_cb_unexpected_error(self):
+        with contextlib.nested(
+            mock.patch.object(db, 'execute_cb', side_effect=ValueError()),
+            mock.patch("%s.db.logging.exception" % __name__),
+        ):
+            success, db_results = self.wait_for_callback(db.execute_async_cb, db.push_pushes.select())
+        T.assert_equal((success, db_results), (False, None))
+
+    def wait_for_stream(self, resume_reading, chunk_size=2):
+        chunks = []
+        outcome = []
+
+        def on_chunk(rows, resume):
+            chunks.append([row['id'] for row in rows])
+            # Resume later on, the db thread waits until then
+            self.io_loop.add_callback(lambda: resume(resume_reading))
+
+        def on_stream_done(success):
+            outcome.append(success)
+            self.io_loop.stop()
+
+        db.stream_async_cb(
+            db.push_pushes.select(order_by=db.push_pushes.c.id),
+            on_chunk,
+            on_stream_done,
+            chunk_size=chunk_size,
+            io_loop=self.io_loop,
+        )
+        self.io_loop.add_timeout(time.time() + 5, self.io_loop.stop)
+        self.io_loop.start()
+        T.assert_equal(outcome, [True])
+        return chunks
+
+    def test_requests_fulltext_created(self):
+        fulltext_filter, relevance = db.requests_matching('Fix')
+        success, db_results = self.wait_for_callback(
+            db.execute_async_cb,
+            SA.select([db.push_requests.c.id], fulltext_filter, order_by=relevance),
+        )
+        T.assert_equal(success, True)
+        # Words are matched whole, Fixing is not a match
+        T.assert_equal([row['id'] for row in db_results.fetchall()], [10])
+
+    def test_stream_async_cb(self):
+        ids = [push[0] for push in self.push_data]
+        chunks = self.wait_for_stream(True)
+        T.assert_equal(chunks, [ids[0:2], ids[2:4]])
+
+    def test_stream_async_cb_stopped(self):
+        chunks = self.wait_for_stream(False)
+        T.assert_length(chunks, 1)
+
+    def test_stream_async_cb_timeout(self):
+        outcome = []
+
+        def on_stream_done(success):
+            outcome.append(success)
+            self.io_loop.stop()
+
+        with contextlib.nested(
+            mock.patch.object(db, 'STREAM_RESUME_TIMEOUT', 0.05),
+            mock.patch("%s.db.logging.error" % __name__),
+        ):
+            # The consumer never resumes the stream
+            db.stream_async_cb(db.push_pushes.select(), lambda rows, resume: None, on_stream_done, io_loop=self.io_loop)
+            self.io_loop.add_timeout(time.time() + 5, self.io_loop.stop)
+            self.io_loop.start()
+        T.assert_equal(outcome, [False])
+
+    def test_streams_have_their_own_thread_pool(self):
+        T.assert_not_equal(db.get_thread_pool(streams=True), None)
+        T.assert_is_not(db.get_thread_pool(streams=True), db.get_thread_pool())
+
+
+class ReadOnlyRoutingTest(T.TestCase, FakeDataMixin):
+
+    @T.setup_teardown
+    def setup_db_settings(self):
+        self.db_file_path = testdb.make_test_db()
+        self.replica_file_path = testdb.make_test_db()
+        settings = dict(
+            MockedSettings,
+            db_uri=testdb.get_temp_db_uri(self.db_file_path),
+            db_uri_readonly=testdb.get_temp_db_uri(self.replica_file_path),
+        )
+        with mock.patch.dict(db.Settings, settings):
+            db.init_db()
+            # Only the primary has the new push
+            self.insert_pushes()
+            yield
+            db.finalize_db()
+        os.unlink(self.db_file_path)
+        os.unlink(self.replica_file_path)
+
+    def count_pushes(self, execute_fn, **kwargs):
+        count = []
+
+        def on_db_return(success, db_results):
+            assert success
+            if isinstance(db_results, list):
+                db_results = db_results[0]
+            count.append(len(db_results.fetchall()))
+
+        execute_fn(db.push_pushes.select(), on_db_return, **kwargs)
+        return count[0]
+
+    def test_reads_routed_to_replica(self):
+        T.assert_equal(self.count_pushes(db.execute_cb), 2 + len(self.push_data))
+        T.assert_equal(self.count_pushes(db.execute_cb, readonly=True), 2)
+
+    def test_transactions_stay_on_primary(self):
+        def execute_transaction(query, callback_fn, **kwargs):
+            db.execute_transaction_cb([query], callback_fn, **kwargs)
+
+        T.assert_equal(self.count_pushes(execute_transaction), 2 + len(self.push_data))
+        T.assert_equal(self.count_pushes(execute_transaction, readonly=True), 2)
+
+    def test_no_replica(self):
+        db.finalize_db()
+        with mock.patch.dict(db.Settings, {'db_uri_readonly': None}):
+            db.init_db()
+        T.assert_is(db.get_engine(readonly=True), db.get_engine())
+        T.assert_equal(self.count_pushes(db.execute_cb, readonly=True), 2 + len(self.push_data))
+
+    def test_replica_rebuilt_after_fork(self):
+        parent_replica = db.get_engine(readonly=True)
+        T.assert_is_not(parent_replica, db.get_engine())
+        with mock.patch.object(db.os, 'getpid', return_value=-1):
+            child_replica = db.get_engine(readonly=True)
+            T.assert_is_not(child_replica, parent_replica)
+            T.assert_equal(str(child_replica.url), str(parent_replica.url))
+            T.assert_in(parent_replica, db.inherited_engines)
+
+
 class InsertIgnoreTestCase(T.TestCase):
 
     table = Table('faketable', SA.MetaData(), Column('a', Integer), Column('b', Integer))
@@ -0,0 +1,171 @@
+#!/usr/bin/env python
+import os
+import shutil
+import socket
+import tempfile
+import time
+
+import mock
+import testify as T
+import tornado.ioloop
+from pushmanager.core.events import EventBus
+from pushmanager.core.events import EventHub
+from pushmanager.core.events import publish_changes
+
+
+class EventHubTest(T.TestCase):
+
+    def test_events_since(self):
+        hub = EventHub()
+        first = hub.publish('push:1', 'add')
+        second = hub.publish('requests', 'delay', request=3)
+        hub.publish('push:2', 'add')
+
+        T.assert_lt(first['time'], second['time'])
+        T.assert_equal(second['request'], 3)
+        T.assert_equal(hub.events_since(['push:1', 'requests'], 0), [first, second])
+        T.assert_equal(hub.events_since(['push:1', 'requests'], first['time'], seen=[first['id']]), [second])
+        T.assert_equal(hub.events_since(['push:1', 'requests'], second['time'] + hub.RELAY_MARGIN), [])
+
+    def test_wait(self):
+        hub = EventHub()
+        received = []
+        hub.wait(['push:1'], 0, received.append)
+        hub.wait(['push:2'], 0, received.append)
+
+        event = hub.publish('push:1', 'add')
+        T.assert_equal(received, [[event]])
+        T.assert_length(hub.waiters, 1)
+
+        # Events already published are handed out right away
+        T.assert_equal(hub.wait(['push:1'], 0, received.append), None)
+        T.assert_equal(received[-1], [event])
+
+    def test_cancel(self):
+        hub = EventHub()
+        received = []
+        waiter = hub.wait(['push:1'], 0, received.append)
+        hub.cancel(waiter)
+        hub.publish('push:1', 'add')
+        T.assert_equal(received, [])
+
+    def test_resync_after_dropped_events(self):
+        hub = EventHub(max_events=2)
+        first = hub.publish('push:1', 'add')
+        hub.publish('push:1', 'deploy')
+        last = hub.publish('push:1', 'bless')
+
+        T.assert_equal(hub.as_dict(), {'events': 2, 'max_events': 2, 'waiters': 0, 'published': 3})
+        T.assert_equal(
+            hub.events_since(['push:2'], 0),
+            [{'channel': None, 'kind': 'resync', 'time': last['time'], 'id': 'resync-%f' % last['time']}],
+        )
+        T.assert_equal([e['kind'] for e in hub.events_since(['push:1'], first['time'])], ['deploy', 'bless'])
+
+    def relayed(self, seq, event_time, channel='push:1', kind='add'):
+        return {
+            'channel': channel, 'kind': kind, 'time': event_time,
+            'origin': 1, 'seq': seq, 'id': '1-%d' % seq,
+        }
+
+    def test_relayed_events_keep_their_time(self):
+        hub = EventHub()
+        relayed = hub.add(self.relayed(1, 100.0))
+        T.assert_equal(relayed['time'], 100.0)
+        # Later ones from another process may come first
+        hub.add(self.relayed(2, 105.0))
+        hub.add(dict(self.relayed(1, 104.0), origin=2, id='2-1'))
+        T.assert_equal([e['time'] for e in hub.events], [100.0, 104.0, 105.0])
+
+    def test_late_relayed_events_within_margin(self):
+        hub = EventHub()
+        newer = hub.add(self.relayed(1, 100.0))
+        received = []
+        hub.wait(['push:1'], newer['time'], received.extend, seen=[newer['id']])
+        T.assert_equal(received, [])
+
+        # Relayed after the waiter got to 100.0, with an older time
+        late = hub.add(dict(self.relayed(1, 99.0), origin=2, id='2-1'))
+        T.assert_equal(received, [late])
+        T.assert_equal(hub.events_since(['push:1'], 100.0, seen=[newer['id'], late['id']]), [])
+        T.assert_equal(hub.events_since(['push:1'], 100.0 + hub.RELAY_MARGIN), [])
+
+    def test_resync_after_missed_relayed_events(self):
+        hub = EventHub()
+        hub.add(self.relayed(1, 100.0))
+        received = []
+        hub.wait(['push:2'], 100.0, received.extend, seen=['1-1'])
+        hub.add(self.relayed(4, 101.0))
+
+        T.assert_equal(received, [{'channel': None, 'kind': 'resync', 'time': 101.0, 'id': 'resync-101.000000'}])
+        T.assert_equal(hub.origin_seqs, {1: 4})
+        T.assert_equal(hub.published, 2)
+
+    def test_publish_changes(self):
+        hub = EventHub()
+        with mock.patch('pushmanager.core.events.hub', hub):
+            publish_changes(['push:1', 'requests'], 'remove')
+        T.assert_equal([(e['channel'], e['kind']) for e in hub.events], [('push:1', 'remove'), ('requests', 'remove')])
+
+
+class EventBusTest(T.TestCase):
+
+    @T.setup_teardown
+    def bus_dir(self):
+        self.io_loop = tornado.ioloop.IOLoop()
+        self.path = tempfile.mkdtemp()
+        self.hubs = []
+        try:
+            yield
+        finally:
+            for hub in self.hubs:
+                hub.bus.close(self.io_loop)
+            shutil.rmtree(self.path)
+            self.io_loop.close()
+
+    def make_hub(self, name):
+        hub = EventHub()
+        hub.bus = EventBus(self.path, hub)
+        hub.bus.listen(self.io_loop, name)
+        self.hubs.append(hub)
+        return hub
+
+    def wait_for(self, condition):
+        deadline = time.time() + 5
+        while not condition() and time.time() < deadline:
+            self.io_loop.add_timeout(time.time() + 0.01, self.io_loop.stop)
+            self.io_loop.start()
+
+    def test_relays_events(self):
+        first, second, third = self.make_hub('1'), self.make_hub('2'), self.make_hub('3')
+        received = []
+        second.wait(['push:1'], 0, received.extend)
+
+        first.publish('push:1', 'add', request=3)
+        self.wait_for(lambda: received and third.events)
+
+        T.assert_equal([(e['channel'], e['kind'], e['request']) for e in received], [('push:1', 'add', 3)])
+        T.assert_equal(len(first.events), 1)
+        T.assert_equal(len(third.events), 1)
+
+    def test_sends_without_listening(self):
+        listener = self.make_hub('1')
+        sender = EventHub()
+        sender.bus = EventBus(self.path, sender)
+
+        sender.publish('requests', 'git', request=1)
+        self.wait_for(lambda: listener.events)
+        T.assert_equal(listener.events[0]['kind'], 'git')
+
+    def test_removes_stale_sockets(self):
+        stale_path = os.path.join(self.path, '99999.sock')
+        stale = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        stale.bind(stale_path)
+        stale.close()
+
+        self.make_hub('1').publish('push:1', 'add')
+        T.assert_equal(os.path.exists(stale_path), False)
+
+
+if __name__ == '__main__':
+    T.run()
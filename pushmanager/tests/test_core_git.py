@@ -215,6 +215,51 @@ class CoreGitTest(T.TestCase):
             T.assert_equal(pushmanager.core.git.GitQueue.verify_branch_failure.call_count, 0)
             T.assert_equal(pushmanager.core.git.GitQueue.verify_branch_successful.call_count, 1)
 
+    def test_update_request_syncs_tags(self):
+        def get_tags():
+            tags = []
+
+            def on_db_return(success, db_results):
+                assert success
+                tags.extend(sorted(row['tag'] for row in db_results))
+
+            db.execute_cb(
+                db.push_request_tags.select(db.push_request_tags.c.request == 3),
+                on_db_return
+            )
+            return tags
+
+        updated_request = GitQueue._update_request({'id': 3}, {'tags': 'buildbot,git-ok'})
+        T.assert_equal(updated_request['tags'], 'buildbot,git-ok')
+        T.assert_equal(get_tags(), ['buildbot', 'git-ok'])
+
+        GitQueue._update_request({'id': 3}, {'conflicts': ''})
+        T.assert_equal(get_tags(), ['buildbot', 'git-ok'])
+
+        GitQueue._update_request({'id': 3}, {'tags': 'buildbot'})
+        T.assert_equal(get_tags(), ['buildbot'])
+
+    def test_get_requests(self):
+        requests = GitQueue._get_requests([1, '3', 99])
+        T.assert_equal(sorted(requests.keys()), [1, 3])
+        T.assert_equal(requests[3]['user'], 'otheruser')
+        T.assert_equal(GitQueue._get_requests([]), {})
+
+    def test_get_push_with_pickmes(self):
+        T.assert_equal(GitQueue._get_push_with_pickmes(2), (None, []))
+
+        db.execute_cb(db.push_pushcontents.insert({'request': 3, 'push': 1}), lambda success, _: None)
+        try:
+            push_id, requests = GitQueue._get_push_with_pickmes(3)
+        finally:
+            db.execute_cb(
+                db.push_pushcontents.delete().where(db.push_pushcontents.c.request == 3),
+                lambda success, _: None
+            )
+        T.assert_equal(push_id, 1)
+        T.assert_equal([req['id'] for req in requests], [1, 3])
+        T.assert_not_in('push_id', requests[0])
+
     def test_verify_branch(self):
         with mock.patch('pushmanager.core.git.GitCommand') as GC:
             GC.return_value = GC
@@ -498,6 +543,7 @@ class CoreGitTest(T.TestCase):
         added_request['state'] = 'added'
         added_request['tags'] = 'no-conflicts'
         pickme_request = copy.deepcopy(self.fake_request)
+        pickme_request['id'] = 2
         pickme_request['state'] = 'pickme'
         pickme_request['tags'] = 'no-conflicts'
         with nested(
@@ -505,13 +551,12 @@ class CoreGitTest(T.TestCase):
             mock.patch('pushmanager.core.git.GitQueue.git_merge_pickme'),
             mock.patch('pushmanager.core.git.git_branch_context_manager'),
             mock.patch('pushmanager.core.git.git_merge_context_manager'),
-            mock.patch('pushmanager.core.git.GitQueue._get_request_ids_in_push'),
-            mock.patch('pushmanager.core.git.GitQueue._get_request'),
+            mock.patch('pushmanager.core.git.GitQueue._get_push_with_pickmes'),
             mock.patch('pushmanager.core.git.GitQueue.enqueue_request'),
             mock.patch('pushmanager.core.git.GitQueue._get_branch_sha_from_repo'),
             mock.patch('pushmanager.core.git.GitQueue._sha_exists_in_master'),
-        ) as (update_repo, merge_pickme, branch_mgr, merge_mgr, ids_in_push,
-              get_req, enqueue_req, get_sha, sha_in_master):
+        ) as (update_repo, merge_pickme, branch_mgr, merge_mgr, push_with_pickmes,
+              enqueue_req, get_sha, sha_in_master):
 
             def throw_gitexn(*args):
                 raise GitException(
@@ -521,8 +566,7 @@ class CoreGitTest(T.TestCase):
                     gitout="some_stdout_string",
                 )
             merge_mgr.side_effect = throw_gitexn
-            ids_in_push.return_value = [2]
-            get_req.return_value = pickme_request
+            push_with_pickmes.return_value = (1, [added_request, pickme_request])
             get_sha.return_code = 'some_sha'
             sha_in_master.return_value = False
 
@@ -595,18 +639,14 @@ class CoreGitTest(T.TestCase):
             update_repo.assert_called_with(0, '.', 'change_german', checkout=False)
 
         with nested(
-                mock.patch('pushmanager.core.git.GitQueue._get_push_for_request'),
-                mock.patch('pushmanager.core.git.GitQueue._get_request_ids_in_push'),
-                mock.patch('pushmanager.core.git.GitQueue._get_request'),
+                mock.patch('pushmanager.core.git.GitQueue._get_push_with_pickmes'),
                 mock.patch('pushmanager.core.git.GitQueue._get_branch_sha_from_repo'),
                 mock.patch('pushmanager.core.git.GitQueue._sha_exists_in_master'),
                 mock.patch('pushmanager.core.git.GitQueue.create_or_update_local_repo'),
                 mock.patch('pushmanager.core.git.GitQueue._update_request'),
                 mock.patch.dict(Settings, test_settings, clear=True)
-        ) as (p_for_r, r_in_p, get_req, get_sha, sha_exists, _, update_req, _):
-            p_for_r.return_value = {'push': 1}
-            r_in_p.return_value = [1, 2]
-            get_req.return_value = welsh_req
+        ) as (push_with_pickmes, get_sha, sha_exists, _, update_req, _):
+            push_with_pickmes.return_value = (1, [german_req, welsh_req])
             get_sha.return_value = "0"*40
             sha_exists.return_value = False
             update_req.return_value = german_req
@@ -687,7 +727,7 @@ class CoreGitTest(T.TestCase):
     def test_requeue_pickmes_with_conflicts(self):
         with nested(
             mock.patch.object(GitQueue, '_get_request_ids_in_push'),
-            mock.patch.object(GitQueue, '_get_request'),
+            mock.patch.object(GitQueue, '_get_requests'),
             mock.patch.object(GitQueue, 'enqueue_request')
         ) as (ids_in_push, get_req, enqueue_req):
 
@@ -697,15 +737,11 @@ class CoreGitTest(T.TestCase):
                 {'id': 3, 'tags': 'git-ok,feature'}
             ]
 
-            ids_in_push.return_value = [0, 1, 2]
-            get_req.return_value = reqs[0]
-
-            def update_get_req(i):
-                return reqs[i]
-
-            get_req.side_effect = update_get_req
+            ids_in_push.return_value = ['1', '2', '3']
+            get_req.return_value = dict((req['id'], req) for req in reqs)
 
             pushmanager.core.git.GitQueue.requeue_pickmes_for_push(1, pushmanager_url, conflicting_only=True)
+            get_req.assert_called_once_with(['1', '2', '3'])
 
             calls = [mock.call(GitTaskAction.TEST_PICKME_CONFLICT, 1, pushmanager_url=pushmanager_url, requeue=False)]
 
@@ -714,7 +750,7 @@ class CoreGitTest(T.TestCase):
     def test_requeue_all_pickmes(self):
         with nested(
             mock.patch.object(GitQueue, '_get_request_ids_in_push'),
-            mock.patch.object(GitQueue, '_get_request'),
+            mock.patch.object(GitQueue, '_get_requests'),
             mock.patch.object(GitQueue, 'enqueue_request')
         ) as (ids_in_push, get_req, enqueue_req):
 
@@ -724,15 +760,11 @@ class CoreGitTest(T.TestCase):
                 {'id': 3, 'tags': 'git-ok,feature'}
             ]
 
-            ids_in_push.return_value = [0, 1, 2]
-            get_req.return_value = reqs[0]
-
-            def update_get_req(i):
-                return reqs[i]
-
-            get_req.side_effect = update_get_req
+            ids_in_push.return_value = ['1', '2', '3']
+            get_req.return_value = dict((req['id'], req) for req in reqs)
 
             pushmanager.core.git.GitQueue.requeue_pickmes_for_push(1, pushmanager_url)
+            get_req.assert_called_once_with(['1', '2', '3'])
 
             calls = [
                 mock.call(GitTaskAction.TEST_PICKME_CONFLICT, 1, pushmanager_url=pushmanager_url, requeue=False),
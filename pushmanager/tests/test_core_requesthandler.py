@@ -1,11 +1,18 @@
 #!/usr/bin/env python
 
+import os
+import shutil
+import tempfile
+import time
+
 import mock
 import testify as T
 
 import tornado.httpserver
+import tornado.web
 
 from pushmanager.core.requesthandler import RequestHandler
+from pushmanager.core.requesthandler import files_digest
 from pushmanager.core.requesthandler import get_base_url
 from pushmanager.core.settings import Settings
 from pushmanager.testing.mocksettings import MockedSettings
@@ -13,13 +20,25 @@ from pushmanager.testing.mocksettings import MockedSettings
 
 class RequestHandlerTest(T.TestCase):
 
-    def test_get_api_page(self):
-        MockedSettings['api_app'] = {'port': 8043, 'servername': 'push.test.com'}
-        with mock.patch.dict(Settings, MockedSettings):
-            T.assert_equal(
-                RequestHandler.get_api_page("pushes"),
-                "http://push.test.com:8043/api/pushes"
-            )
+    def test_files_digest(self):
+        path = tempfile.mkdtemp()
+        try:
+            os.mkdir(os.path.join(path, 'modules'))
+            with open(os.path.join(path, 'modules', 'request.html'), 'w') as f:
+                f.write('<li>')
+            digest = files_digest(path)
+            T.assert_equal(files_digest(path), digest)
+
+            # Other contents or names change it, file times don't
+            os.utime(os.path.join(path, 'modules', 'request.html'), (0, 0))
+            T.assert_equal(files_digest(path), digest)
+            with open(os.path.join(path, 'modules', 'request.html'), 'w') as f:
+                f.write('<li class="request">')
+            T.assert_not_equal(files_digest(path), digest)
+            os.rename(os.path.join(path, 'modules'), os.path.join(path, 'other'))
+            T.assert_not_equal(files_digest(path), digest)
+        finally:
+            shutil.rmtree(path)
 
     def test_get_base_url_empty_headers(self):
         MockedSettings['main_app'] = {'port': 1111, 'servername': 'example.com'}
@@ -91,3 +110,24 @@ class RequestHandlerTest(T.TestCase):
                 RequestHandler.get_base_url.__func__(fake_requesthandler),
                 'https://example.com:1111'
             )
+
+    def test_async_api_call_after_write_reads_primary(self):
+        def api_call(cookie=None):
+            request = tornado.httpserver.HTTPRequest('GET', '/push?id=1')
+            request.connection = mock.Mock()
+            if cookie:
+                request.headers['Cookie'] = cookie
+            handler = RequestHandler(tornado.web.Application([]), request)
+            callback = mock.Mock()
+            with mock.patch('pushmanager.core.requesthandler.API') as api:
+                handler.async_api_call('pushdata', {'id': 1}, callback)
+                api.return_value.call.assert_called_once_with('pushdata', callback)
+                return api.call_args
+
+        MockedSettings['db_read_your_writes'] = 10
+        with mock.patch.dict(Settings, MockedSettings):
+            args, kwargs = api_call()
+            T.assert_equal(args, ({'id': ['1']},))
+            T.assert_equal(kwargs['readonly'], True)
+            T.assert_equal(api_call('db_write=%d' % time.time())[1]['readonly'], False)
+            T.assert_equal(api_call('db_write=%d' % (time.time() - 60))[1]['readonly'], True)
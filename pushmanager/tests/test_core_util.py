@@ -11,8 +11,12 @@ from pushmanager.core.util import add_to_tags_str
 from pushmanager.core.util import del_from_tags_str
 from pushmanager.core.util import dict_copy_keys
 from pushmanager.core.util import EscapedDict
+from pushmanager.core.util import get_int_args
 from pushmanager.core.util import get_servlet_urlspec
+from pushmanager.core.util import parse_push_cursor
 from pushmanager.core.util import pretty_date
+from pushmanager.core.util import push_cursor
+from pushmanager.core.util import rows_to_jsonable
 from pushmanager.core.util import tags_contain
 from pushmanager.core.util import tags_str_as_set
 from pushmanager.core.util import send_people_msg_in_groups
@@ -111,6 +115,30 @@ class CoreUtilFunctionsTest(T.TestCase):
         T.assert_equal(to_dict['c']['x'], from_dict['c']['x'])
         T.assert_equal(to_dict['c'].get('y', None), None)
 
+    def test_rows_to_jsonable(self):
+        class Row(tuple):
+            def keys(self):
+                return ['id', 'title']
+
+        T.assert_equal(rows_to_jsonable([]), [])
+        T.assert_equal(
+            rows_to_jsonable(iter([Row((1, 'one')), Row((2, 'two'))])),
+            [{'id': 1, 'title': 'one'}, {'id': 2, 'title': 'two'}]
+        )
+
+    def test_get_int_args(self):
+        request = mock.Mock(arguments={'id': ['3', '1', 'x', '3', '2']})
+        T.assert_equal(get_int_args(request, 'id'), [3, 1, 2])
+        T.assert_equal(get_int_args(request, 'other'), [])
+
+    def test_push_cursor(self):
+        cursor = push_cursor({'modified': 1346458663.2721, 'id': 2})
+        T.assert_equal(parse_push_cursor(cursor), (1346458663.2721, 2))
+        T.assert_equal(parse_push_cursor(push_cursor({'modified': None, 'id': 3})), (0.0, 3))
+
+        for invalid in (None, '', '1346458663.2721', 'a:2', '1.5:b', '1:2:3'):
+            T.assert_equal(parse_push_cursor(invalid), None)
+
     def test_send_people_msg_in_groups_split(self):
         people = ['111', '222', '333', '444', '555', '666']
         msg = 'Hello World!'
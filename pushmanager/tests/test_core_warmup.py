@@ -0,0 +1,47 @@
+import os
+
+import testify as T
+import tornado.template
+import tornado.web
+from pushmanager.core import warmup
+from pushmanager.core.compression import PrecompressedStaticFileHandler
+
+
+class WarmUpTest(T.TestCase):
+
+    template_path = os.path.join(os.path.dirname(__file__), "../templates")
+    static_path = os.path.join(os.path.dirname(__file__), "../static")
+
+    @T.setup
+    def make_application(self):
+        self.loader = tornado.template.Loader(self.template_path, autoescape=None)
+        self.application = tornado.web.Application(
+            [],
+            template_path=self.template_path,
+            template_loader=self.loader,
+            static_path=self.static_path,
+            static_handler_class=PrecompressedStaticFileHandler,
+        )
+
+    def test_load_templates(self):
+        count = warmup.load_templates(self.loader, self.template_path)
+        T.assert_gt(count, 20)
+        for name in ('push.html', 'pushes.html', 'checklist.html', 'modules/request.html'):
+            T.assert_in(name, self.loader.templates)
+
+    def test_hash_static_files(self):
+        PrecompressedStaticFileHandler.reset()
+        count = warmup.hash_static_files(self.application.settings)
+        T.assert_gt(count, 0)
+        js_path = os.path.join(self.static_path, 'js/push.js')
+        T.assert_in(js_path, PrecompressedStaticFileHandler._static_hashes)
+
+    def test_warm_up(self):
+        stats = warmup.warm_up(self.application)
+        T.assert_equal(stats, warmup.stats)
+        T.assert_equal(len(self.loader.templates), stats['templates'])
+        T.assert_gte(stats['seconds'], 0)
+
+
+if __name__ == '__main__':
+    T.run()
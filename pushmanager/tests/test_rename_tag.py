@@ -69,6 +69,12 @@ class RenameTagTest(T.TestCase, FakeDataMixin):
         cb = partial(self.verify_tag_rename, 'search', 'not_search')
         db.execute_cb(db.push_requests.select(), cb)
 
+    def test_convert_tag_request_tags(self):
+        rename_tag.convert_tag('search', 'not_search')
+        T.assert_equal(self.get_request_tags(12), ['not_search'])
+        T.assert_equal(self.get_request_tags(13), ['not_search'])
+        T.assert_equal(self.get_request_tags(10), [])
+
     def test_convert_notag(self):
         rename_tag.convert_tag('nonexistent', 'random')
         cb = partial(self.verify_database_state, self.request_data)
@@ -65,6 +65,8 @@ class AddRequestServletTest(T.TestCase, ServletTestMixin):
         db.execute_cb(db.push_pushcontents.select(), self.record_pushcontents)
         num_results_after = len(self.results)
         T.assert_equal(num_results_after, num_results_before + 1, "Add new request failed.")
+        # Reads of this user go to the primary database for a while
+        T.assert_in('db_write=', response.headers.get('Set-Cookie', ''))
 
     @mock.patch('pushmanager.core.db.execute_transaction_cb')
     def test_pushcontent_insert_ignore(self, mock_transaction):
@@ -1,11 +1,24 @@
 import json
+import os
+import sqlite3
 import time
 
+import mock
 import testify as T
+from tornado.escape import url_escape
+from pushmanager.core import api
+from pushmanager.core import db
+from pushmanager.core import events
+from pushmanager.core import util
+from pushmanager.core.api import API
+from pushmanager.core.api import api_arguments
 from pushmanager.core.util import get_servlet_urlspec
 from pushmanager.servlets.api import APIServlet
+from pushmanager.testing import testdb
+from pushmanager.testing.mocksettings import MockedSettings
 from pushmanager.testing.testdb import FakeDataMixin
 from pushmanager.testing.testservlet import ServletTestMixin
+from tools import archive_finished
 
 
 class APITests(T.TestCase, ServletTestMixin, FakeDataMixin):
@@ -22,6 +35,72 @@ class APITests(T.TestCase, ServletTestMixin, FakeDataMixin):
         results = self.api_call("userlist")
         T.assert_equal(results, ['bmetin', "otheruser"])
 
+    def test_usersearch(self):
+        db.execute_transaction_cb(db.user_seen_queries('bob_smith', 1346458700), self.on_db_return)
+        T.assert_equal(self.api_call("usersearch?prefix=b"), ['bob_smith', 'bmetin'])
+        T.assert_equal(self.api_call("usersearch?prefix=b&limit=1"), ['bob_smith'])
+        T.assert_equal(self.api_call("usersearch?prefix=bob_"), ['bob_smith'])
+        # Wildcards are matched literally
+        T.assert_equal(self.api_call("usersearch?prefix=b_"), [])
+        T.assert_equal(self.api_call("usersearch?prefix=%25"), [])
+        T.assert_equal(self.api_call("usersearch"), [])
+
+    def in_process_call(self, endpoint, arguments):
+        API(api_arguments(arguments), io_loop=self.io_loop).call(endpoint, self.stop)
+        return self.wait()
+
+    def test_in_process_call(self):
+        response = self.in_process_call('request', {'id': 1})
+        T.assert_equal(response.error, None)
+        T.assert_equal(response.data['title'], "Fix stuff")
+
+        T.assert_equal(self.in_process_call('request', {'id': 1000}).error, 404)
+        T.assert_equal(self.in_process_call('nosuchendpoint', {}).error, 404)
+
+    def test_readonly_replica(self):
+        replica_file = testdb.make_test_db()
+        replica = sqlite3.connect(replica_file)
+        replica.execute("DELETE FROM push_users WHERE user = 'otheruser'")
+        replica.commit()
+        replica.close()
+
+        db.finalize_db()
+        settings = dict(MockedSettings, db_uri_readonly=testdb.get_temp_db_uri(replica_file), db_read_your_writes=10)
+        try:
+            with mock.patch.dict(db.Settings, settings):
+                db.init_db()
+                T.assert_equal(self.api_call("userlist"), ['bmetin'])
+                T.assert_equal(self.api_call("userlist?primary=1"), ['bmetin', 'otheruser'])
+
+                # Users who just wrote something read from the primary
+                response = self.fetch("/api/userlist", headers={'Cookie': 'db_write=%d' % time.time()})
+                T.assert_equal(json.loads(response.body), ['bmetin', 'otheruser'])
+                response = self.fetch("/api/userlist", headers={'Cookie': 'db_write=%d' % (time.time() - 60)})
+                T.assert_equal(json.loads(response.body), ['bmetin'])
+        finally:
+            os.unlink(replica_file)
+
+    def test_coalesced_reads(self):
+        running = []
+        responses = []
+        with mock.patch.object(API, '_api_PUSH', autospec=True, side_effect=running.append):
+            for _ in range(2):
+                API(api_arguments({'id': 1}), io_loop=self.io_loop).call('push', responses.append)
+            while api.coalesced_reads.calls < 2:
+                self.io_loop.add_timeout(time.time() + 0.01, self.stop)
+                self.wait()
+
+        T.assert_length(running, 1)
+        running[0]._result({'id': 1})
+        T.assert_equal([response.data for response in responses], [{'id': 1}, {'id': 1}])
+        T.assert_is_not(responses[0].data, responses[1].data)
+        T.assert_equal(api.coalesced_reads.as_dict(), {'in_flight': 0, 'calls': 2, 'coalesced': 1, 'expired': 0})
+
+        # Other arguments run their own queries
+        self.in_process_call('push', {'id': 1})
+        self.in_process_call('push', {'id': 2})
+        T.assert_equal(api.coalesced_reads.coalesced, 1)
+
     def test_request(self):
         results = self.api_call("request?id=1")
         T.assert_equal(results['title'], "Fix stuff")
@@ -36,6 +115,138 @@ class APITests(T.TestCase, ServletTestMixin, FakeDataMixin):
         T.assert_length(contents, 2)
         T.assert_equal(requests[0]['state'], "requested")
 
+    def test_archived_rows(self):
+        db.execute_transaction_cb(
+            [db.push_requests.update().where(db.push_requests.c.id == 1).values(state='live')] +
+            archive_finished.archive_queries(db.push_requests, [1]) +
+            archive_finished.archive_queries(db.push_pushes, [1]),
+            self.on_db_return,
+        )
+
+        T.assert_equal(self.api_call("request?id=1")['title'], "Fix stuff")
+        T.assert_equal(self.api_call("push?id=1")['title'], "Test Push")
+        T.assert_equal(self.api_call("pushbyrequest?id=1")['title'], "Test Push")
+        T.assert_equal(self.api_call("pushcontents?id=1")[0]['id'], 1)
+        T.assert_equal([r['id'] for r in self.api_call("pushitems?push_id=1")], [1])
+        T.assert_equal([r['push'] for r in self.api_call("pushitems?push_id=1&push_id=2")], [1])
+
+        pushes, pushes_count = self.api_call("pushes")
+        T.assert_equal(sorted(push['id'] for push in pushes), [1, 2])
+        T.assert_equal(pushes_count, 2)
+        cursor = url_escape(util.push_cursor([push for push in pushes if push['id'] == 2][0]))
+        T.assert_equal([push['id'] for push in self.api_call("pushes?before=%s" % cursor)[0]], [1])
+        T.assert_equal(len(self.api_call("pushes?rpp=1&offset=1")[0]), 1)
+
+        push_info, contents, _ = self.api_call("pushdata?id=1")
+        T.assert_equal(push_info['title'], "Test Push")
+        T.assert_equal([r['id'] for r in contents['all']], [1])
+
+    def test_archive_renews_cached_responses(self):
+        old = time.time() - 100 * 24 * 60 * 60
+        db.execute_transaction_cb(
+            [
+                db.push_requests.update().where(db.push_requests.c.id == 1).values(state='live', modified=old),
+                db.push_pushes.update().where(db.push_pushes.c.id == 1).values(state='live', modified=old),
+            ] + db.bump_data_versions_queries(db.REQUESTS_DATA_VERSION, db.push_data_version(1)),
+            self.on_db_return,
+        )
+        etags = dict((uri, self.fetch(uri).headers['Etag']) for uri in ("/api/pushes", "/api/pushdata?id=1"))
+
+        with mock.patch('sys.stdout'):
+            archived = archive_finished.archive_finished()
+        T.assert_equal(archived, {'push_requests': 1, 'push_pushes': 1})
+        T.assert_equal(
+            sorted(e['channel'] for e in events.hub.events),
+            ['push:1', 'push:1', 'requests'],
+        )
+        for uri, etag in etags.items():
+            response = self.fetch(uri, headers={'If-None-Match': etag})
+            T.assert_equal(response.code, 200)
+            T.assert_not_equal(response.headers['Etag'], etag)
+
+    def test_pushdata_cache(self):
+        T.assert_equal(self.api_call("pushdata?id=1")[0]['title'], "Test Push")
+
+        # Changes not accounted for in push_data_versions are not seen
+        db.execute_cb(
+            db.push_pushes.update().where(db.push_pushes.c.id == 1).values({'title': 'Renamed'}),
+            self.on_db_return,
+        )
+        T.assert_equal(self.api_call("pushdata?id=1")[0]['title'], "Test Push")
+        T.assert_equal(api.pushdata_cache.hits, 1)
+
+        db.execute_transaction_cb(
+            db.bump_data_versions_queries(db.push_data_version(1)),
+            self.on_db_return,
+        )
+        T.assert_equal(self.api_call("pushdata?id=1")[0]['title'], "Renamed")
+
+        db.execute_transaction_cb(
+            [db.push_requests.update().where(db.push_requests.c.id == 3).values({'state': 'delayed'})] +
+            db.bump_data_versions_queries(db.REQUESTS_DATA_VERSION),
+            self.on_db_return,
+        )
+        T.assert_equal([r['id'] for r in self.api_call("pushdata?id=1")[2]], [2])
+
+    def test_pushdata_since(self):
+        since = int(time.time()) - 60
+        changes = self.api_call("pushdata?id=1&since=%d" % since)
+        T.assert_equal(changes['push']['title'], "Test Push")
+        T.assert_equal((changes['requests'], changes['available'], changes['removed']), ({}, [], []))
+        T.assert_lte(changes['since'], time.time() - api.PUSHDATA_SINCE_MARGIN)
+
+        # Updates set modified even when they don't set it themselves
+        db.execute_transaction_cb(
+            [
+                db.push_requests.update().where(db.push_requests.c.id == 1).values({'state': 'added'}),
+                db.push_requests.update().where(db.push_requests.c.id == 2).values({'comments': 'Soon'}),
+                db.push_requests.update().where(db.push_requests.c.id == 3).values({'state': 'delayed'}),
+            ] + db.bump_data_versions_queries(db.REQUESTS_DATA_VERSION),
+            self.on_db_return,
+        )
+        changes = self.api_call("pushdata?id=1&since=%d" % since)
+        T.assert_equal(sorted(changes['requests']), ['added', 'all'])
+        T.assert_equal([r['id'] for r in changes['requests']['all']], [1])
+        T.assert_equal([r['comments'] for r in changes['available']], ['Soon'])
+        T.assert_equal(changes['removed'], [3])
+
+        # Requests changing in other pushes were not on this page
+        db.execute_transaction_cb(
+            [
+                db.push_pushcontents.insert({'request': 3, 'push': 2}),
+                db.push_requests.update().where(db.push_requests.c.id == 3).values({'state': 'staged'}),
+            ] + db.bump_data_versions_queries(db.REQUESTS_DATA_VERSION),
+            self.on_db_return,
+        )
+        T.assert_equal(self.api_call("pushdata?id=1&since=%d" % since)['removed'], [])
+
+        # Full responses are unchanged
+        push_info, contents, requests = self.api_call("pushdata?id=1")
+        T.assert_equal([r['id'] for r in contents['added']], [1])
+        T.assert_equal([r['id'] for r in requests], [2])
+
+    def test_etag(self):
+        response = self.fetch("/api/pushdata?id=1")
+        etag = response.headers['Etag']
+
+        response = self.fetch("/api/pushdata?id=1", headers={'If-None-Match': etag})
+        T.assert_equal(response.code, 304)
+        T.assert_equal(response.body, '')
+
+        # Requests of other pushes or other endpoints don't match
+        response = self.fetch("/api/pushdata?id=2", headers={'If-None-Match': etag})
+        T.assert_equal(response.code, 200)
+        response = self.fetch("/api/requestsearch?mafter=1", headers={'If-None-Match': etag})
+        T.assert_equal(response.code, 200)
+
+        db.execute_transaction_cb(
+            db.bump_data_versions_queries(db.REQUESTS_DATA_VERSION),
+            self.on_db_return,
+        )
+        response = self.fetch("/api/pushdata?id=1", headers={'If-None-Match': etag})
+        T.assert_equal(response.code, 200)
+        T.assert_not_equal(response.headers['Etag'], etag)
+
     def test_pushes(self):
         pushes, pushes_count = self.api_call("pushes")
         T.assert_length(pushes, 2)
@@ -49,6 +260,49 @@ class APITests(T.TestCase, ServletTestMixin, FakeDataMixin):
         T.assert_length(pushes, 1)
         T.assert_equal(pushes_count, 2)
 
+    def test_pushes_cursor(self):
+        self.insert_pushes()
+        pushes, _ = self.api_call("pushes?rpp=0&count=0")
+        newest_first = sorted(pushes, key=lambda push: (push['modified'], push['id']), reverse=True)
+        ids = [push['id'] for push in newest_first]
+
+        pages = []
+        cursor = ''
+        while True:
+            pushes, pushes_count = self.api_call("pushes?rpp=4&count=0&before=%s" % url_escape(cursor))
+            T.assert_equal(pushes_count, None)
+            if not pushes:
+                break
+            pushes.sort(key=lambda push: (push['modified'], push['id']), reverse=True)
+            pages.append([push['id'] for push in pushes])
+            cursor = util.push_cursor(pushes[-1])
+        T.assert_equal(sum(pages, []), ids)
+        T.assert_equal([len(page) for page in pages], [4, 2])
+
+        # Going back from the last push of the listing
+        cursor = util.push_cursor(newest_first[-1])
+        pushes, _ = self.api_call("pushes?rpp=2&after=%s" % url_escape(cursor))
+        T.assert_equal(sorted(push['id'] for push in pushes), sorted(ids[-3:-1]))
+
+        # The offset is ignored along with a cursor
+        pushes, _ = self.api_call("pushes?rpp=2&offset=5&after=%s" % url_escape(cursor))
+        T.assert_equal(sorted(push['id'] for push in pushes), sorted(ids[-3:-1]))
+
+    def test_pushes_count_cache(self):
+        T.assert_equal(self.api_call("pushes")[1], 2)
+        T.assert_equal(self.api_call("pushes?state=accepting")[1], 2)
+        T.assert_equal(api.pushes_count_cache.hits, 0)
+        T.assert_equal(self.api_call("pushes?offset=1")[1], 2)
+        T.assert_equal(api.pushes_count_cache.hits, 1)
+
+        self.insert_pushes()
+        T.assert_equal(self.api_call("pushes")[1], 2)
+        db.execute_transaction_cb(
+            db.bump_data_versions_queries(db.PUSHES_DATA_VERSION),
+            self.on_db_return,
+        )
+        T.assert_equal(self.api_call("pushes")[1], 6)
+
     def test_pushes_order(self):
         self.insert_pushes()
         pushes, _ = self.api_call("pushes")
@@ -133,6 +387,93 @@ class APITests(T.TestCase, ServletTestMixin, FakeDataMixin):
         requests = self.api_call("requestsearch?title=fix&limit=1")
         T.assert_length(requests, 1)
 
+    def test_requestsearch_stream(self):
+        in_process = self.in_process_call('requestsearch', {'mafter': 1})
+        T.assert_equal(in_process.streamed, False)
+
+        with mock.patch.object(api, 'STREAM_CHUNK_SIZE', 2):
+            response = self.fetch("/api/requestsearch?mafter=1")
+        T.assert_equal(response.headers['Transfer-Encoding'], 'chunked')
+        T.assert_equal(response.headers['Etag'], in_process.etag)
+        T.assert_equal(response.body, in_process.body)
+        T.assert_length(json.loads(response.body), 3)
+
+        response = self.fetch("/api/requestsearch?user=nobody")
+        T.assert_equal(response.body, '[]')
+
+        response = self.fetch("/api/requestsearch?mafter=1", headers={'If-None-Match': in_process.etag})
+        T.assert_equal(response.code, 304)
+
+    def test_requests(self):
+        requests = self.api_call("requests?id=3&id=1&id=404&id=3")
+        T.assert_equal([request['id'] for request in requests], [3, 1])
+        T.assert_equal(requests[1], self.api_call("request?id=1"))
+
+        T.assert_equal(self.fetch("/api/requests").code, 404)
+        with mock.patch.object(api, 'MAX_BATCH_IDS', 1):
+            T.assert_equal(self.fetch("/api/requests?id=1&id=2").code, 409)
+
+    def test_pushitems_batch(self):
+        self.insert_pushcontent(2, 1)
+        self.insert_pushcontent(3, 2)
+        pushitems = self.api_call("pushitems?push_id=1&push_id=2")
+        T.assert_equal(sorted((request['push'], request['id']) for request in pushitems), [(1, 2), (2, 3)])
+        T.assert_equal(self.api_call("pushitems?push_id=2"), [r for r in pushitems if r['push'] == 2])
+
+        # Changes to either push change the ETag
+        etag = self.fetch("/api/pushitems?push_id=1&push_id=2").headers['Etag']
+        db.execute_transaction_cb(db.bump_data_versions_queries(db.push_data_version(2)), self.on_db_return)
+        response = self.fetch("/api/pushitems?push_id=1&push_id=2", headers={'If-None-Match': etag})
+        T.assert_equal(response.code, 200)
+
+    def test_requestsearch_fulltext(self):
+        # Title and description of request 1
+        T.assert_equal([r['id'] for r in self.api_call("requestsearch?q=stuff")], [1])
+        T.assert_equal([r['id'] for r in self.api_call("requestsearch?q=ship")], [1])
+        T.assert_equal([r['id'] for r in self.api_call("requestsearch?q=important%20things")], [2])
+        T.assert_equal(self.api_call("requestsearch?q=%22-%22"), [])
+
+        # Edits are indexed, the best match comes first
+        db.execute_cb(
+            db.push_requests.update().where(db.push_requests.c.id == 3).values({'title': 'stuff stuff'}),
+            self.on_db_return,
+        )
+        T.assert_equal([r['id'] for r in self.api_call("requestsearch?q=stuff")], [3, 1])
+        T.assert_equal([r['id'] for r in self.api_call("requestsearch?q=stuff&user=bmetin")], [1])
+
+    def test_requestsearch_projection(self):
+        requests = self.api_call("requestsearch?user=bmetin")
+        T.assert_equal(sorted(requests[0].keys()), sorted(util.REQUEST_SUMMARY_KEYS))
+
+        requests = self.api_call("requestsearch?user=bmetin&detail=1")
+        T.assert_equal(sorted(requests[0].keys()), sorted(util.REQUEST_JSON_KEYS))
+        T.assert_equal(requests[0], util.request_to_jsonable(requests[0]))
+
+    def test_pushitems_projection(self):
+        self.insert_pushcontent(3, 1)
+        pushitems = self.api_call("pushitems?push_id=1")
+        T.assert_equal([request['id'] for request in pushitems], [3])
+        T.assert_in('comments', pushitems[0])
+        T.assert_not_in('description', pushitems[0])
+
+        pushitems = self.api_call("pushitems?push_id=1&detail=1")
+        T.assert_in('description', pushitems[0])
+
+    def test_pushes_projection(self):
+        pushes, _ = self.api_call("pushes")
+        T.assert_equal(sorted(pushes[0].keys()), sorted(util.PUSH_JSON_KEYS))
+
+    def test_requestsearch_tags(self):
+        requests = self.api_call("requestsearch?tag=buildbot")
+        T.assert_equal(sorted(r['id'] for r in requests), [1, 2, 3])
+
+        requests = self.api_call("requestsearch?tag=buildbot&tag=urgent")
+        T.assert_equal([r['id'] for r in requests], [2])
+
+        # Tags match whole words only
+        requests = self.api_call("requestsearch?tag=build")
+        T.assert_length(requests, 0)
+
     def test_requestsearch_when_user_and_repo_are_different(self):
         requests = self.api_call("requestsearch?user=otheruser&repo=testuser&branch=testuser_important_fixes")
         T.assert_length(requests, 1)
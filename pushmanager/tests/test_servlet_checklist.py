@@ -6,6 +6,7 @@ from contextlib import nested
 import mock
 import testify as T
 from pushmanager.core import db
+from pushmanager.core import events
 from pushmanager.core.util import get_servlet_urlspec
 from pushmanager.servlets.checklist import ChecklistServlet
 from pushmanager.servlets.checklist import ChecklistToggleServlet
@@ -211,8 +212,12 @@ class ChecklistToggleServletTest(T.TestCase, ServletTestMixin, FakeDataMixin):
             response = self.fetch(
                 "/checklisttoggle",
                 method="POST",
-                body=urllib.urlencode({'id': checklist_item[0]['id'], 'complete': complete})
+                body=urllib.urlencode({'id': checklist_item[0]['id'], 'push': 1, 'complete': complete})
             )
             T.assert_equal(response.error, None)
 
             db.execute_cb(checklist_toggle_query, check_toggle)
+            T.assert_equal(
+                [(e['channel'], e['kind']) for e in events.hub.events_since(['push:1'], 0)],
+                [('push:1', 'checklist')],
+            )
@@ -0,0 +1,40 @@
+import json
+
+import mock
+import testify as T
+from pushmanager.core.util import get_servlet_urlspec
+from pushmanager.servlets.api import APIServlet
+from pushmanager.servlets.dbstats import DBStatsServlet
+from pushmanager.testing.testservlet import ServletTestMixin
+
+
+class DBStatsServletTest(T.TestCase, ServletTestMixin):
+
+    def get_handlers(self):
+        return [
+            get_servlet_urlspec(APIServlet),
+            get_servlet_urlspec(DBStatsServlet),
+        ]
+
+    def test_dbstats(self):
+        response = self.fetch("/api/request?id=1")
+        T.assert_equal(response.error, None)
+
+        with mock.patch.object(DBStatsServlet, "get_current_user", return_value="testuser"):
+            response = self.fetch("/dbstats")
+        T.assert_equal(response.error, None)
+        T.assert_equal(response.headers['Content-Type'], 'application/json')
+
+        stats = json.loads(response.body)
+        T.assert_gte(stats['pool']['checkouts'], 1)
+        T.assert_in('SELECT push_requests', stats['queries']['queries'])
+        T.assert_equal(stats['coalesced_reads']['calls'], 1)
+        T.assert_equal(sorted(stats['caches']), ['pushdata', 'pushes_count', 'request_render'])
+
+    def test_dbstats_needs_user(self):
+        response = self.fetch("/dbstats")
+        T.assert_equal(response.code, 403)
+
+
+if __name__ == '__main__':
+    T.run()
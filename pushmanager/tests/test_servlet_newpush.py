@@ -96,6 +96,21 @@ class NewPushServletTest(T.TestCase, ServletTestMixin):
                 db.execute_cb(db.push_pushes.select(), on_db_return)
                 T.assert_equal('branch-name-with-whitespaces', pushes[-1]['branch'])
 
+    def test_urgent_push_notifies_urgent_requests(self):
+        with nested(
+            mock.patch.dict(db.Settings, MockedSettings),
+            mock.patch.object(NewPushServlet, "get_current_user", return_value="jblack"),
+            mock.patch.object(NewPushServlet, "redirect"),
+            mock.patch("%s.pushmanager.servlets.newpush.send_notifications" % __name__),
+        ):
+            response = self.fetch("/newpush?push-title=Urgent&push-branch=jblack&push-type=urgent")
+            assert response.error is None
+
+            # Only request 2 is tagged urgent in the test database
+            pushmanager.servlets.newpush.send_notifications.assert_called_once_with(
+                set(['bmetin']), 'urgent', mock.ANY
+            )
+
     def call_on_db_complete(self, urgent=False):
         mocked_self = mock.Mock()
         mocked_self.check_db_results = mock.Mock(return_value=None)
@@ -102,6 +102,66 @@ class NewRequestServletTest(T.TestCase, ServletTestMixin, FakeDataMixin):
         basic_request.update({'user': 'testuser'})
         self.assert_request(basic_request, last_req)
 
+    def test_request_tags_table(self):
+        last_req = self.assert_submit_request(self.basic_request)
+        T.assert_equal(self.get_request_tags(last_req['id']), ['logs', 'super-safe'])
+
+        edit_request = dict(self.basic_request)
+        edit_request.update({
+            'request-id': last_req['id'],
+            'request-user': 'testuser',
+            'request-tags': 'logs,urgent,conflict-pickme',
+        })
+        self.assert_submit_request(edit_request, edit=True)
+        T.assert_equal(self.get_request_tags(last_req['id']), ['logs', 'urgent'])
+
+    def get_data_version(self, name):
+        versions = {}
+
+        def on_select_return(success, db_results):
+            assert success
+            versions.update(dict(db_results.fetchall()))
+
+        db.execute_cb(db.data_versions_query(name), on_select_return)
+        return versions.get(name, 0)
+
+    def test_request_committed_whole_before_checklist(self):
+        versions_before = self.get_data_version(db.REQUESTS_DATA_VERSION), self.get_data_version(db.USERS_DATA_VERSION)
+        with mock.patch.object(
+            NewRequestServlet,
+            'on_existing_checklist_retrieved',
+            lambda servlet, success, db_results: servlet.send_error(500),
+        ):
+            response = self.fetch("/newrequest", method="POST", body=urllib.urlencode(self.basic_request))
+        T.assert_equal(response.code, 500)
+
+        # The tags, users and versions changed with the request
+        last_req = self.get_requests()[-1]
+        T.assert_equal(last_req['tags'], 'super-safe,logs')
+        T.assert_equal(self.get_request_tags(last_req['id']), ['logs', 'super-safe'])
+        T.assert_in('testuser', self.get_users())
+        T.assert_equal(
+            (self.get_data_version(db.REQUESTS_DATA_VERSION), self.get_data_version(db.USERS_DATA_VERSION)),
+            (versions_before[0] + 1, versions_before[1] + 1),
+        )
+
+    def test_users_table(self):
+        last_req = self.assert_submit_request(self.basic_request)
+        users = self.get_users()
+        T.assert_equal(sorted(users), ['bmetin', 'otheruser', 'testuser'])
+        T.assert_equal(users['testuser']['first_seen'], users['testuser']['last_seen'])
+
+        edit_request = dict(self.basic_request)
+        edit_request.update({'request-id': last_req['id'], 'request-user': 'testuser'})
+        with mock.patch.object(NewRequestServlet, "get_current_user", return_value="testtakeoveruser"):
+            # Edits leave the users alone, takeovers add the new owner
+            self.assert_submit_request(edit_request, edit=True)
+            T.assert_not_in('testtakeoveruser', self.get_users())
+
+            edit_request['request-takeover'] = 'takeover'
+            self.assert_submit_request(edit_request, edit=True)
+            T.assert_in('testtakeoveruser', self.get_users())
+
     def test_strip_new_repo_branch(self):
         req_with_whitespace = dict(self.basic_request)
         req_with_whitespace['request-repo'] = ' testuser   '
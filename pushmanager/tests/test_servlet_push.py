@@ -6,7 +6,10 @@ import lxml.html
 import mock
 import testify as T
 from pushmanager.core import util
+from pushmanager.core.requesthandler import RequestHandler
 from pushmanager.core.settings import Settings
+from pushmanager.servlets.push import PushRequestRowServlet
+from pushmanager.servlets.push import PushSectionServlet
 from pushmanager.servlets.push import PushServlet
 from pushmanager.testing.testdb import FakeDataMixin
 from pushmanager.testing.testservlet import ServletTestMixin
@@ -18,6 +21,8 @@ class PushServletTestBase(T.TestCase, ServletTestMixin, FakeDataMixin):
     def get_handlers(self):
         return [
             util.get_servlet_urlspec(PushServlet),
+            util.get_servlet_urlspec(PushSectionServlet),
+            util.get_servlet_urlspec(PushRequestRowServlet),
         ]
 
     def find_buildbot_link(self, response, buildbot_link):
@@ -29,10 +34,12 @@ class PushServletTestBase(T.TestCase, ServletTestMixin, FakeDataMixin):
         return False
 
     @contextlib.contextmanager
-    def request_fake_pushdata(self):
+    def request_fake_pushdata(self, uri="/push?id=%d", push_state=None, request_state=None):
         first_push = self.make_push_dict(self.push_data[0])
+        first_push['state'] = push_state or first_push['state']
         first_request = self.make_request_dict(self.request_data[0])
         first_request['tags'] = "buildbot"
+        first_request['state'] = request_state or first_request['state']
         second_request = self.make_request_dict(self.request_data[1])
 
         # Prepare pushdata the way PushServlet accepts. This is the
@@ -47,11 +54,11 @@ class PushServletTestBase(T.TestCase, ServletTestMixin, FakeDataMixin):
         pushdata = [pushinfo, requests, available_requests]
 
         with contextlib.nested(
-            mock.patch.object(PushServlet, "get_current_user", return_value="testuser"),
-            mock.patch.object(PushServlet, "async_api_call", side_effect=self.mocked_api_call),
+            mock.patch.object(RequestHandler, "get_current_user", return_value="testuser"),
+            mock.patch.object(RequestHandler, "async_api_call", side_effect=self.mocked_api_call),
             mock.patch.object(self, "api_response", return_value=json.dumps(pushdata))
         ):
-            self.fetch("/push?id=%d" % first_push['id'])
+            self.fetch(uri % first_push['id'])
             response = self.wait()
             yield pushdata, response
 
@@ -72,3 +79,46 @@ class PushServletTest(PushServletTestBase):
             first_request = all_requests[0]
             buildbot_link = "https://%s/rev/%s" % (Settings['buildbot']['servername'], first_request['revision'])
             T.assert_equal(self.find_buildbot_link(response, buildbot_link), True)
+
+
+class PushFragmentServletTest(PushServletTestBase):
+
+    def request_fragment(self, uri):
+        return self.request_fake_pushdata(uri, push_state='accepting', request_state='added')
+
+    def request_ids(self, response):
+        T.assert_equal(response.error, None)
+        root = lxml.html.fragment_fromstring(response.body, create_parent='ul')
+        return [int(elt.attrib['request']) for elt in root.xpath("li/div[contains(@class, 'request-module')]")]
+
+    def test_push_section(self):
+        with self.request_fragment("/pushsection?id=%d&section=requested") as (pushdata, response):
+            available_requests = pushdata[2]
+            T.assert_equal(self.request_ids(response), [available_requests[0]['id']])
+            T.assert_not_in('</body>', response.body)
+
+    def test_push_section_of_push_requests(self):
+        with self.request_fragment("/pushsection?id=%d&section=added") as (pushdata, response):
+            T.assert_equal(self.request_ids(response), [pushdata[1]['all'][0]['id']])
+
+    def test_empty_push_section(self):
+        with self.request_fragment("/pushsection?id=%d&section=blessed") as (_, response):
+            T.assert_equal(self.request_ids(response), [])
+
+    def test_unknown_push_section(self):
+        with self.request_fragment("/pushsection?id=%d&section=all") as (_, response):
+            T.assert_equal(response.code, 404)
+
+    def test_push_request_row(self):
+        second_request = self.make_request_dict(self.request_data[1])
+        uri = "/pushrequestrow?id=%%d&request=%d" % second_request['id']
+        with self.request_fragment(uri) as (_, response):
+            T.assert_equal(self.request_ids(response), [second_request['id']])
+
+    def test_push_request_row_not_on_page(self):
+        with self.request_fragment("/pushrequestrow?id=%d&request=1000") as (_, response):
+            T.assert_equal(response.code, 404)
+
+    def test_closed_push(self):
+        with self.request_fake_pushdata("/pushsection?id=%d&section=added") as (_, response):
+            T.assert_equal(response.code, 404)
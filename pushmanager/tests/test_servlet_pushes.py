@@ -4,6 +4,7 @@ import lxml.html
 
 import mock
 import testify as T
+from pushmanager.core import db
 from pushmanager.core.util import get_servlet_urlspec
 from pushmanager.servlets.pushes import PushesServlet
 from pushmanager.testing.testservlet import ServletTestMixin
@@ -47,3 +48,45 @@ class PushesServletTest(T.TestCase, ServletTestMixin):
             self.fetch("/pushes")
             response = self.wait()
             T.assert_equal(self.find_push_in_response(response, "One Push"), True)
+
+    def test_pushes_etag(self):
+        with mock.patch.object(PushesServlet, "get_current_user", return_value="testuser"):
+            response = self.fetch("/pushes")
+            T.assert_equal(self.find_push_in_response(response, "Test Push"), True)
+            etag = response.headers['Etag']
+
+            response = self.fetch("/pushes", headers={'If-None-Match': etag})
+            T.assert_equal(response.code, 304)
+
+            # Other users get their own page
+            with mock.patch.object(PushesServlet, "get_current_user", return_value="otheruser"):
+                response = self.fetch("/pushes", headers={'If-None-Match': etag})
+                T.assert_equal(response.code, 200)
+
+            db.execute_transaction_cb(
+                db.bump_data_versions_queries(db.push_data_version(1)),
+                lambda success, _: T.assert_equal(success, True),
+            )
+            response = self.fetch("/pushes", headers={'If-None-Match': etag})
+            T.assert_equal(response.code, 200)
+            T.assert_not_equal(response.headers['Etag'], etag)
+
+    def paginator_links(self, response):
+        root = lxml.html.fromstring(response.body)
+        return dict((elt.text, elt.attrib['href']) for elt in root.xpath("//div[@id='paginator']/a"))
+
+    def test_pushes_pagination(self):
+        with mock.patch.object(PushesServlet, "get_current_user", return_value="testuser"):
+            links = self.paginator_links(self.fetch("/pushes?rpp=1"))
+            T.assert_equal(sorted(links), ['Older'])
+            T.assert_in('before=', links['Older'])
+
+            response = self.fetch(links['Older'])
+            T.assert_equal(self.find_push_in_response(response, "Test Push"), True)
+            T.assert_equal(self.find_push_in_response(response, "Second Push"), False)
+            links = self.paginator_links(response)
+            T.assert_equal(sorted(links), ['Newer'])
+
+            response = self.fetch(links['Newer'])
+            T.assert_equal(self.find_push_in_response(response, "Second Push"), True)
+            T.assert_equal(self.paginator_links(response).keys(), ['Older'])
@@ -0,0 +1,66 @@
+import json
+import time
+
+import mock
+import testify as T
+from pushmanager.core import events
+from pushmanager.core.util import get_servlet_urlspec
+from pushmanager.servlets.pushevents import PushEventsServlet
+from pushmanager.testing.testservlet import ServletTestMixin
+
+
+class PushEventsServletTest(T.TestCase, ServletTestMixin):
+
+    def get_handlers(self):
+        return [get_servlet_urlspec(PushEventsServlet)]
+
+    @T.setup_teardown
+    def mock_user(self):
+        with mock.patch.object(PushEventsServlet, "get_current_user", return_value="testuser"):
+            yield
+
+    def poll(self, since, seen=()):
+        self.http_client.fetch(self.get_url("/pushevents?id=1&since=%r&seen=%s" % (since, ','.join(seen))), self.stop)
+
+    def test_published_events(self):
+        since = time.time()
+        events.hub.publish('push:2', 'add')
+        event = events.hub.publish('requests', 'delay', request=3)
+
+        self.poll(since)
+        response = json.loads(self.wait().body)
+        T.assert_equal(response, {'events': [event], 'since': event['time']})
+
+    def test_seen_events(self):
+        first = events.hub.publish('push:1', 'add')
+        second = events.hub.publish('push:1', 'deploy')
+
+        # Both are within RELAY_MARGIN of since
+        self.poll(second['time'], seen=[first['id']])
+        response = json.loads(self.wait().body)
+        T.assert_equal(response, {'events': [second], 'since': second['time']})
+
+    def test_waits_for_events(self):
+        self.poll(time.time())
+        self.io_loop.add_timeout(time.time() + 0.1, lambda: events.hub.publish('push:1', 'deploy'))
+
+        response = json.loads(self.wait().body)
+        T.assert_equal([e['kind'] for e in response['events']], ['deploy'])
+        T.assert_equal(events.hub.waiters, [])
+
+    def test_timeout(self):
+        since = time.time()
+        with mock.patch.object(PushEventsServlet, 'TIMEOUT', 0.1):
+            self.poll(since)
+            response = json.loads(self.wait().body)
+        T.assert_equal(response, {'events': [], 'since': since})
+        T.assert_equal(events.hub.waiters, [])
+
+    def test_login_required(self):
+        with mock.patch.object(PushEventsServlet, "get_current_user", return_value=None):
+            response = self.fetch("/pushevents?id=1")
+        T.assert_equal(response.code, 403)
+
+
+if __name__ == '__main__':
+    T.run()
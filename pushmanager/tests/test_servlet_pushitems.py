@@ -1,8 +1,11 @@
 import contextlib
 import json
 
+import lxml.html
+
 import mock
 import testify as T
+from pushmanager.core import db
 from pushmanager.core.util import get_servlet_urlspec
 from pushmanager.servlets.pushitems import PushItemsServlet
 from pushmanager.testing.testservlet import ServletTestMixin
@@ -40,3 +43,34 @@ class PushsItemsServletTest(T.TestCase, ServletTestMixin):
             self.fetch("/pushitems?push=%d" % self.fake_request_data["id"])
             response = self.wait()
             T.assert_in(self.fake_request_data["title"], response.body)
+
+    def test_pushitems_in_process_api(self):
+        with mock.patch.object(PushItemsServlet, "get_current_user", return_value="bmetin"):
+            db.execute_cb(
+                db.push_pushcontents.insert({'request': 2, 'push': 1}),
+                lambda success, _: T.assert_equal(success, True),
+            )
+            response = self.fetch("/pushitems?push=1")
+            T.assert_equal(response.error, None)
+            T.assert_in("More fixes for important things", response.body)
+            T.assert_not_in("Fix stuff", response.body)
+
+    def test_pushitems_batch(self):
+        with mock.patch.object(PushItemsServlet, "get_current_user", return_value="bmetin"):
+            db.execute_transaction_cb(
+                [
+                    db.push_pushcontents.insert({'request': 2, 'push': 1}),
+                    db.push_pushcontents.insert({'request': 3, 'push': 2}),
+                ],
+                lambda success, _: T.assert_equal(success, True),
+            )
+            response = self.fetch("/pushitems?push=1&push=2")
+            T.assert_equal(response.error, None)
+            root = lxml.html.fromstring("<div>%s</div>" % response.body)
+            batches = root.xpath("//ul[@class='push-items-batch']")
+            T.assert_equal([batch.attrib['pushid'] for batch in batches], ['1', '2'])
+            users = [
+                [user.text for user in batch.xpath(".//ul[@class='request-info inline']/li[1]/span[@class='value']")]
+                for batch in batches
+            ]
+            T.assert_equal(users, [["bmetin"], ["otheruser"]])
@@ -44,6 +44,10 @@ class RemoveRequestServletTest(T.TestCase, ServletTestMixin):
 
             T.assert_equal(num_results_after, num_results_before - 1, "Request removal failed.")
 
+            results = []
+            db.execute_cb(db.push_data_versions.select(), on_db_return)
+            T.assert_equal(sorted(map(tuple, results)), [('push:1', 1), ('pushes', 1), ('requests', 1)])
+
     def call_on_db_complete(self):
         mocked_self = mock.Mock()
         mocked_self.current_user = 'fake_pushmaster'
@@ -33,6 +33,7 @@ class PushTemplateTest(TemplateTestCase):
 
     basic_kwargs = {
             'page_title': 'fake_push_title',
+            'since': 1346458663,
             'push_contents': {},
             'available_requests': [],
             'fullrepo': 'not/a/repo',
@@ -297,9 +298,12 @@ class PushTemplateTest(TemplateTestCase):
         'branch': basic_push['branch'],
         'class': 'push-info standalone',
         'id': 'push-info',
+        'override': '0',
         'pushmaster': basic_push['user'],
         'push': '%d' % basic_push['id'],
+        'since': '1346458663',
         'stageenv': '',
+        'state': basic_push['state'],
         'title': basic_push['title'],
     }
 
@@ -364,8 +368,11 @@ class PushTemplateTest(TemplateTestCase):
         del push_info_items['Buildbot Runs']
         del push_info_items['Test Runs']
 
+        attributes = dict(self.push_info_attributes)
+        attributes['state'] = 'live'
+
         self.assert_push_info_listitems(list(tree.iter('ul'))[0], push_info_items)
-        self.assert_push_info_attributes(list(tree.iter('ul'))[0].attrib, self.push_info_attributes)
+        self.assert_push_info_attributes(list(tree.iter('ul'))[0].attrib, attributes)
 
     def test_push_info_list_items_stageenv(self):
         push = dict(self.basic_push)
@@ -7,13 +7,15 @@ class PushesTemplateTest(TemplateTestCase):
     authenticated = True
     pushes_page = 'pushes.html'
 
-    def render_pushes_page(self, page_title='Pushes', pushes=[], pushes_per_page=50, offset=0):
+    def render_pushes_page(self, page_title='Pushes', pushes=[], pushes_per_page=50,
+                           newer_cursor=None, older_cursor=None):
         return self.render_etree(
             self.pushes_page,
             page_title=page_title,
             pushes=pushes,
             rpp=pushes_per_page,
-            offset=offset,
+            newer_cursor=newer_cursor,
+            older_cursor=older_cursor,
             state='',
             push_user='',
         )
@@ -1,15 +1,16 @@
 import mock
 import testify as T
 from pushmanager.ui_modules import Request
+from pushmanager.ui_modules import request_render_cache
 from pushmanager.core.settings import Settings
 from pushmanager.testing.mocksettings import MockedSettings
 
 
 class StubHandler(object):
-    def __init__(self):
+    def __init__(self, current_user='curr_user'):
         self.request = 'request'
         self.ui = 'ui'
-        self.current_user = 'curr_user'
+        self.current_user = current_user
         self.locale = 'the_moon'
 
 
@@ -30,3 +31,50 @@ class UIModuleTest(T.TestCase):
         with mock.patch.dict(Settings, MockedSettings):
             gen_tags = request._generate_tag_list(request_info, 'repo')
             T.assert_equals(gen_tags[0][1], 'https://example.com/?p=repo.git;a=log;h=refs/heads/test')
+
+
+class RequestRenderCacheTest(T.TestCase):
+
+    request = {
+        'id': 1,
+        'user': 'curr_user',
+        'watchers': None,
+        'state': 'requested',
+        'tags': 'buildbot',
+        'created': 1346458591,
+        'modified': 1346458591,
+    }
+
+    @T.setup
+    def clear_cache(self):
+        request_render_cache.clear()
+
+    def render(self, request, current_user='curr_user', **kwargs):
+        """Return the HTML of the Request module and whether it was rendered."""
+        module = Request(StubHandler(current_user))
+        with mock.patch.object(Request, '_render', return_value='html %(modified)d' % request) as render:
+            html = module.render(request, **kwargs)
+        return html, render.called
+
+    def test_renders_once(self):
+        T.assert_equal(self.render(self.request, push_buttons=True), ('html 1346458591', True))
+        T.assert_equal(self.render(self.request, push_buttons=True), ('html 1346458591', False))
+        T.assert_equal(request_render_cache.as_dict()['hits'], 1)
+
+    def test_renders_again_when_modified(self):
+        self.render(self.request)
+        request = dict(self.request, modified=self.request['modified'] + 1)
+        T.assert_equal(self.render(request), ('html 1346458592', True))
+
+    def test_renders_again_when_any_field_changes(self):
+        self.render(self.request)
+        request = dict(self.request, watchers='otheruser')
+        T.assert_equal(self.render(request)[1], True)
+        T.assert_equal(self.render(request)[1], False)
+
+    def test_arguments_and_viewer_in_key(self):
+        self.render(self.request, push_buttons=True)
+        T.assert_equal(self.render(self.request, push_buttons=True, pushmaster=True)[1], True)
+        T.assert_equal(self.render(self.request, push_buttons=True, current_user='other')[1], True)
+        # Other users who may not manage the request share a render
+        T.assert_equal(self.render(self.request, push_buttons=True, current_user='third')[1], False)
@@ -2,10 +2,16 @@ import datetime
 import os
 
 from pushmanager.core import util
+from pushmanager.core.cache import VersionedCache
 from pushmanager.core.settings import Settings
+from pushmanager.ui_methods import authorized_to_manage_request
 from tornado.web import UIModule
 
 
+# Rendered Request modules of this process, see Request.render
+request_render_cache = VersionedCache(Settings.get('request_render_cache_size', 2000))
+
+
 class Request(UIModule):
     """Displays an individual request entry with expandable details/comments."""
 
@@ -16,6 +22,32 @@ class Request(UIModule):
         return [self.handler.static_url('css/modules/request.css')]
 
     def render(self, request, **kwargs):
+        # The HTML of a request only changes with the request row (every
+        # field of which the template may show), the arguments, what the
+        # current user may do with it and the relative time shown with
+        # show_ago.
+        key = (
+            request['id'],
+            tuple(sorted(kwargs.items())),
+            authorized_to_manage_request(None, request, self.current_user, kwargs.get('pushmaster', False)),
+            request['user'] == self.current_user,
+        )
+        version = (
+            tuple(sorted(request.items())),
+            self._ago(request) if kwargs.get('show_ago') else None,
+        )
+        html = request_render_cache.get(key, version)
+        if html is None:
+            html = self._render(request, **kwargs)
+            request_render_cache.set(key, version, html)
+        return html
+
+    def _ago(self, request):
+        if request['state'] in ('discarded', 'live'):
+            return util.pretty_date(int(request['modified']))
+        return util.pretty_date(int(request['created']))
+
+    def _render(self, request, **kwargs):
         # Whether or not to show the 'Edit'/'Takeover' button
         kwargs.setdefault('edit_buttons', False)
         # Whether to automatically expand this entry (only used on /request)
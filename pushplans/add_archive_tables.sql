@@ -0,0 +1,72 @@
+/*
+Add the push_requests_archive and push_pushes_archive tables. Old live
+and discarded rows are moved there from push_requests and push_pushes
+by tools/archive_finished.py, the API still serves them by id.
+
+Apply after pushplans/add_hot_indexes.sql, the archive tables keep
+only their primary keys.
+*/
+
+# MySQL Syntax
+CREATE TABLE `push_requests_archive` LIKE `push_requests`;
+ALTER TABLE `push_requests_archive`
+  MODIFY `id` int(11) NOT NULL,
+  DROP INDEX `ix_push_requests_state`,
+  DROP INDEX `ix_push_requests_revision`,
+  DROP INDEX `ix_push_requests_user`,
+  DROP INDEX `ix_push_requests_repo_branch`;
+CREATE TABLE `push_pushes_archive` LIKE `push_pushes`;
+ALTER TABLE `push_pushes_archive`
+  MODIFY `id` int(11) NOT NULL,
+  DROP INDEX `ix_push_pushes_modified`,
+  DROP INDEX `ix_push_pushes_state_modified`;
+
+/* ROLLBACK COMMANDS
+
+DROP TABLE `push_requests_archive`;
+DROP TABLE `push_pushes_archive`;
+
+*/
+
+# Sqlite3 Syntax
+/*
+CREATE TABLE IF NOT EXISTS 'push_requests_archive' (
+  'id' INTEGER NOT NULL,
+  'user' VARCHAR,
+  'state' VARCHAR,
+  'repo' VARCHAR,
+  'branch' VARCHAR,
+  'revision' VARCHAR(40),
+  'tags' VARCHAR,
+  'conflicts' VARCHAR,
+  'created' INTEGER,
+  'modified' INTEGER,
+  'title' VARCHAR,
+  'comments' VARCHAR,
+  'reviewid' INTEGER,
+  'description' VARCHAR,
+  'watchers' VARCHAR,
+  PRIMARY KEY ('id')
+);
+CREATE TABLE IF NOT EXISTS 'push_pushes_archive' (
+  'id' INTEGER NOT NULL,
+  'title' VARCHAR,
+  'user' VARCHAR,
+  'branch' VARCHAR,
+  'revision' VARCHAR(40),
+  'state' VARCHAR,
+  'created' INTEGER,
+  'modified' INTEGER,
+  'pushtype' VARCHAR,
+  'extra_pings' VARCHAR,
+  'stageenv' VARCHAR,
+  PRIMARY KEY ('id')
+);
+*/
+
+/* Sqlite3 ROLLBACK COMMANDS
+
+DROP TABLE 'push_requests_archive';
+DROP TABLE 'push_pushes_archive';
+
+*/
@@ -0,0 +1,33 @@
+/*
+Add the push_data_versions table. It holds version counters bumped by
+every change to a push or to requests; cached PUSHDATA responses are
+only served while the versions they were built from are current.
+*/
+
+# MySQL Syntax
+CREATE TABLE `push_data_versions` (
+  `name` varchar(64) NOT NULL,
+  `version` int(11) NOT NULL DEFAULT 0,
+  PRIMARY KEY (`name`)
+);
+
+/* ROLLBACK COMMANDS
+
+DROP TABLE `push_data_versions`;
+
+*/
+
+# Sqlite3 Syntax
+/*
+CREATE TABLE IF NOT EXISTS 'push_data_versions' (
+  'name' VARCHAR(64) NOT NULL,
+  'version' INTEGER NOT NULL DEFAULT 0,
+  PRIMARY KEY ('name')
+);
+*/
+
+/* Sqlite3 ROLLBACK COMMANDS
+
+DROP TABLE 'push_data_versions';
+
+*/
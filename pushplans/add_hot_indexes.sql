@@ -0,0 +1,75 @@
+/*
+Add secondary indexes for the hot lookup columns:
+  push_requests.state          SHA poller, PUSHDATA available requests
+  push_requests.revision       GitQueue duplicate SHA check
+  push_requests.user           requests by user, smart destination
+  push_requests.(repo, branch) SummaryForBranch
+  push_pushcontents.push       push contents (request is covered by the
+                               (request, push) primary key)
+  push_pushes.modified         /pushes listing
+  push_checklist.request       checklists of a push
+
+Run tools/check_hot_queries.py afterwards to verify query plans.
+*/
+
+# MySQL Syntax
+ALTER TABLE `push_requests`
+  ADD INDEX `ix_push_requests_state` (`state`(16)),
+  ADD INDEX `ix_push_requests_revision` (`revision`),
+  ADD INDEX `ix_push_requests_user` (`user`(64)),
+  ADD INDEX `ix_push_requests_repo_branch` (`repo`(64), `branch`(128));
+
+ALTER TABLE `push_pushcontents`
+  ADD INDEX `ix_push_pushcontents_push` (`push`, `request`);
+
+ALTER TABLE `push_pushes`
+  ADD INDEX `ix_push_pushes_modified` (`modified`),
+  ADD INDEX `ix_push_pushes_state_modified` (`state`(16), `modified`);
+
+ALTER TABLE `push_checklist`
+  ADD INDEX `ix_push_checklist_request` (`request`);
+
+/* ROLLBACK COMMANDS
+
+ALTER TABLE `push_requests`
+  DROP INDEX `ix_push_requests_state`,
+  DROP INDEX `ix_push_requests_revision`,
+  DROP INDEX `ix_push_requests_user`,
+  DROP INDEX `ix_push_requests_repo_branch`;
+
+ALTER TABLE `push_pushcontents`
+  DROP INDEX `ix_push_pushcontents_push`;
+
+ALTER TABLE `push_pushes`
+  DROP INDEX `ix_push_pushes_modified`,
+  DROP INDEX `ix_push_pushes_state_modified`;
+
+ALTER TABLE `push_checklist`
+  DROP INDEX `ix_push_checklist_request`;
+
+*/
+
+# Sqlite3 Syntax
+/*
+CREATE INDEX IF NOT EXISTS 'ix_push_requests_state' ON 'push_requests' ('state');
+CREATE INDEX IF NOT EXISTS 'ix_push_requests_revision' ON 'push_requests' ('revision');
+CREATE INDEX IF NOT EXISTS 'ix_push_requests_user' ON 'push_requests' ('user');
+CREATE INDEX IF NOT EXISTS 'ix_push_requests_repo_branch' ON 'push_requests' ('repo', 'branch');
+CREATE INDEX IF NOT EXISTS 'ix_push_pushcontents_push' ON 'push_pushcontents' ('push', 'request');
+CREATE INDEX IF NOT EXISTS 'ix_push_pushes_modified' ON 'push_pushes' ('modified');
+CREATE INDEX IF NOT EXISTS 'ix_push_pushes_state_modified' ON 'push_pushes' ('state', 'modified');
+CREATE INDEX IF NOT EXISTS 'ix_push_checklist_request' ON 'push_checklist' ('request');
+*/
+
+/* Sqlite3 ROLLBACK COMMANDS
+
+DROP INDEX 'ix_push_requests_state';
+DROP INDEX 'ix_push_requests_revision';
+DROP INDEX 'ix_push_requests_user';
+DROP INDEX 'ix_push_requests_repo_branch';
+DROP INDEX 'ix_push_pushcontents_push';
+DROP INDEX 'ix_push_pushes_modified';
+DROP INDEX 'ix_push_pushes_state_modified';
+DROP INDEX 'ix_push_checklist_request';
+
+*/
@@ -0,0 +1,44 @@
+/*
+Add a full-text index on the titles and descriptions of requests,
+searched by the q argument of /api/requestsearch. MySQL maintains its
+FULLTEXT index itself; on sqlite an FTS5 table is kept in sync with
+push_requests by triggers and filled from the existing requests.
+
+FULLTEXT indexes on InnoDB tables need MySQL 5.6 or later.
+*/
+
+# MySQL Syntax
+ALTER TABLE `push_requests`
+  ADD FULLTEXT INDEX `ix_push_requests_fulltext` (`title`, `description`);
+
+/* ROLLBACK COMMANDS
+
+ALTER TABLE `push_requests`
+  DROP INDEX `ix_push_requests_fulltext`;
+
+*/
+
+# Sqlite3 Syntax
+/*
+CREATE VIRTUAL TABLE push_requests_fts USING fts5(title, description, content='push_requests', content_rowid='id');
+CREATE TRIGGER push_requests_fts_insert AFTER INSERT ON push_requests BEGIN
+  INSERT INTO push_requests_fts(rowid, title, description) VALUES (new.id, new.title, new.description);
+END;
+CREATE TRIGGER push_requests_fts_delete AFTER DELETE ON push_requests BEGIN
+  INSERT INTO push_requests_fts(push_requests_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description);
+END;
+CREATE TRIGGER push_requests_fts_update AFTER UPDATE OF title, description ON push_requests BEGIN
+  INSERT INTO push_requests_fts(push_requests_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description);
+  INSERT INTO push_requests_fts(rowid, title, description) VALUES (new.id, new.title, new.description);
+END;
+INSERT INTO push_requests_fts(push_requests_fts) VALUES ('rebuild');
+*/
+
+/* Sqlite3 ROLLBACK COMMANDS
+
+DROP TRIGGER push_requests_fts_insert;
+DROP TRIGGER push_requests_fts_delete;
+DROP TRIGGER push_requests_fts_update;
+DROP TABLE push_requests_fts;
+
+*/
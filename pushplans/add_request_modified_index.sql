@@ -0,0 +1,29 @@
+/*
+Add an index on push_requests.modified for the changes to a push page
+since a timestamp, /api/pushdata?id=X&since=T. Every update of a
+request now sets its modified time.
+
+Run tools/check_hot_queries.py afterwards to verify query plans.
+*/
+
+# MySQL Syntax
+ALTER TABLE `push_requests`
+  ADD INDEX `ix_push_requests_modified` (`modified`);
+
+/* ROLLBACK COMMANDS
+
+ALTER TABLE `push_requests`
+  DROP INDEX `ix_push_requests_modified`;
+
+*/
+
+# Sqlite3 Syntax
+/*
+CREATE INDEX IF NOT EXISTS 'ix_push_requests_modified' ON 'push_requests' ('modified');
+*/
+
+/* Sqlite3 ROLLBACK COMMANDS
+
+DROP INDEX 'ix_push_requests_modified';
+
+*/
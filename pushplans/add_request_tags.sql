@@ -0,0 +1,36 @@
+/*
+Add the push_request_tags table, one row per tag of a request. It is
+written alongside push_requests.tags and serves tag searches.
+
+Fill it for existing requests with tools/backfill_request_tags.py.
+*/
+
+# MySQL Syntax
+CREATE TABLE `push_request_tags` (
+  `request` int(11) NOT NULL,
+  `tag` varchar(64) NOT NULL,
+  PRIMARY KEY (`request`, `tag`),
+  KEY `ix_push_request_tags_tag` (`tag`, `request`)
+);
+
+/* ROLLBACK COMMANDS
+
+DROP TABLE `push_request_tags`;
+
+*/
+
+# Sqlite3 Syntax
+/*
+CREATE TABLE IF NOT EXISTS 'push_request_tags' (
+  'request' INTEGER NOT NULL,
+  'tag' VARCHAR(64) NOT NULL,
+  PRIMARY KEY ('request', 'tag')
+);
+CREATE INDEX IF NOT EXISTS 'ix_push_request_tags_tag' ON 'push_request_tags' ('tag', 'request');
+*/
+
+/* Sqlite3 ROLLBACK COMMANDS
+
+DROP TABLE 'push_request_tags';
+
+*/
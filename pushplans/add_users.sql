@@ -0,0 +1,55 @@
+/*
+Add the push_users table, one row per user who created or took over a
+request, with the first and latest time they did. /userlist and the
+user autocompletion of the request form read it instead of grouping
+all requests by user.
+
+Apply after pushplans/add_archive_tables.sql, the table is filled from
+the hot and the archived requests.
+*/
+
+# MySQL Syntax
+CREATE TABLE `push_users` (
+  `user` varchar(64) NOT NULL,
+  `first_seen` int(11) NOT NULL,
+  `last_seen` int(11) NOT NULL,
+  PRIMARY KEY (`user`)
+);
+INSERT INTO `push_users` (`user`, `first_seen`, `last_seen`)
+  SELECT `user`, MIN(`created`), MAX(`created`) FROM (
+    SELECT `user`, `created` FROM `push_requests`
+    UNION ALL
+    SELECT `user`, `created` FROM `push_requests_archive`
+  ) AS `requests`
+  WHERE `user` IS NOT NULL AND `created` IS NOT NULL
+  GROUP BY `user`;
+
+/* ROLLBACK COMMANDS
+
+DROP TABLE `push_users`;
+
+*/
+
+# Sqlite3 Syntax
+/*
+CREATE TABLE IF NOT EXISTS 'push_users' (
+  'user' VARCHAR(64) NOT NULL,
+  'first_seen' INTEGER NOT NULL,
+  'last_seen' INTEGER NOT NULL,
+  PRIMARY KEY ('user')
+);
+INSERT INTO push_users (user, first_seen, last_seen)
+  SELECT user, CAST(MIN(created) AS INTEGER), CAST(MAX(created) AS INTEGER) FROM (
+    SELECT user, created FROM push_requests
+    UNION ALL
+    SELECT user, created FROM push_requests_archive
+  )
+  WHERE user IS NOT NULL AND created IS NOT NULL
+  GROUP BY user;
+*/
+
+/* Sqlite3 ROLLBACK COMMANDS
+
+DROP TABLE 'push_users';
+
+*/
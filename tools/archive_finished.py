@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+Moves old live and discarded requests and pushes to the archive tables.
+
+With an appropriate config.yaml running from the root of the pushmanager-service:
+python -u tools/archive_finished.py [--days N] [--batch-size N]
+
+Rows of push_requests and push_pushes in the live or discarded state
+that were not modified for --days days are copied to
+push_requests_archive and push_pushes_archive and deleted from the hot
+tables, one transaction per batch. The tag rows of archived requests
+are dropped as well, their push_pushcontents rows are kept: the API
+reads archived requests and pushes through them. Each batch bumps the push_data_versions of the
+rows it moves, and of the pushes of the requests it moves, and
+publishes an 'archive' event for them on the event bus if
+event_bus_dir is set, so cached API responses and ETags are renewed.
+Archived rows are gone from the hot tables, so an interrupted run is
+resumed by running the tool again.
+
+The row with the highest id of each table is never archived: both
+MySQL and sqlite may hand that id out again once it is deleted, and it
+would then clash with the archived copy.
+"""
+import sys
+import time
+from optparse import OptionParser
+
+import sqlalchemy as SA
+
+import pushmanager.core.db as db
+from pushmanager.core import events
+from pushmanager.core.settings import Settings
+
+FINISHED_STATES = ('live', 'discarded')
+
+
+def main():
+    usage = 'usage: %prog [options]'
+    parser = OptionParser(usage)
+    parser.add_option(
+        '--days', dest='days', type='int', default=90,
+        help='archive rows not modified for this many days'
+    )
+    parser.add_option(
+        '--batch-size', dest='batch_size', type='int', default=500,
+        help='number of rows moved per transaction'
+    )
+    (options, args) = parser.parse_args()
+
+    if args or options.days < 0 or options.batch_size < 1:
+        parser.error('Incorrect arguments')
+        return
+
+    db.init_db()
+    if Settings.get('event_bus_dir'):
+        events.start_bus(Settings['event_bus_dir'])
+    archive_finished(options.days, options.batch_size)
+    db.finalize_db()
+
+
+def get_archivable_ids(table, modified_before, batch_size):
+    result = [None]
+
+    def on_db_return(success, db_results):
+        check_db_results(success, db_results)
+        result[0] = [row['id'] for row in db_results.fetchall()]
+
+    max_id = SA.select([SA.func.max(table.c.id)]).as_scalar()
+    query = SA.select(
+        [table.c.id],
+        SA.and_(
+            table.c.state.in_(FINISHED_STATES),
+            table.c.modified < modified_before,
+            table.c.id < max_id,
+        ),
+        order_by=table.c.id,
+    ).limit(batch_size)
+    db.execute_cb(query, on_db_return)
+    return result[0]
+
+
+def archive_queries(table, ids):
+    """Return the queries moving the rows with the given ids from table
+    to its archive table.
+    """
+    archive = db.archive_tables[table.name]
+    columns = [c.name for c in table.columns]
+    queries = [
+        archive.insert().from_select(
+            columns,
+            SA.select([table.c[name] for name in columns], table.c.id.in_(ids)),
+        ),
+        table.delete().where(table.c.id.in_(ids)),
+    ]
+    if table is db.push_requests:
+        queries.append(db.push_request_tags.delete().where(db.push_request_tags.c.request.in_(ids)))
+    return queries
+
+
+def archived_versions(table, ids):
+    """Return the push_data_versions names changed by archiving the
+    rows with the given ids from table.
+    """
+    if table is db.push_pushes:
+        return [db.push_data_version(push_id) for push_id in ids]
+
+    result = [None]
+
+    def on_db_return(success, db_results):
+        check_db_results(success, db_results)
+        result[0] = [row['push'] for row in db_results.fetchall()]
+
+    query = SA.select(
+        [db.push_pushcontents.c.push],
+        db.push_pushcontents.c.request.in_(ids),
+        distinct=True,
+    )
+    db.execute_cb(query, on_db_return)
+    return [db.REQUESTS_DATA_VERSION] + [db.push_data_version(push_id) for push_id in result[0]]
+
+
+def archive_table(table, modified_before, batch_size=500):
+    """Archive the finished rows of table modified before the given
+    timestamp. Returns the number of rows moved.
+    """
+    archived = 0
+    while True:
+        ids = get_archivable_ids(table, modified_before, batch_size)
+        if not ids:
+            break
+
+        versions = archived_versions(table, ids)
+        db.execute_transaction_cb(
+            archive_queries(table, ids) + db.bump_data_versions_queries(*versions),
+            check_db_results,
+        )
+        events.publish_changes(versions, 'archive')
+
+        archived += len(ids)
+        print 'Archived %s up to id %d (%d rows)' % (table.name, ids[-1], archived)
+
+    return archived
+
+
+def archive_finished(days=90, batch_size=500):
+    """Archive requests and pushes finished more than the given number
+    of days ago. Returns a dict of the number of rows moved by table.
+    """
+    modified_before = time.time() - days * 24 * 60 * 60
+    return dict(
+        (table.name, archive_table(table, modified_before, batch_size))
+        for table in (db.push_requests, db.push_pushes)
+    )
+
+
+def check_db_results(success, db_results):
+    if not success:
+        raise db.DatabaseError()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
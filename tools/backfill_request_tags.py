@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+Fills the push_request_tags table from the push_requests.tags column.
+
+With an appropriate config.yaml running from the root of the pushmanager-service:
+python -u tools/backfill_request_tags.py [--start-id ID] [--batch-size N]
+
+Requests are processed in id order, one transaction per batch. The tags
+of every request in a batch are rewritten, so running the tool again
+(or over requests already written by pushmanager) is harmless. After
+each batch the last processed id is printed; pass the next id as
+--start-id to resume an interrupted run.
+"""
+import sys
+from optparse import OptionParser
+
+import pushmanager.core.db as db
+
+
+def main():
+    usage = 'usage: %prog [options]'
+    parser = OptionParser(usage)
+    parser.add_option(
+        '--start-id', dest='start_id', type='int', default=0,
+        help='first request id to backfill'
+    )
+    parser.add_option(
+        '--batch-size', dest='batch_size', type='int', default=500,
+        help='number of requests written per transaction'
+    )
+    (options, args) = parser.parse_args()
+
+    if args or options.batch_size < 1:
+        parser.error('Incorrect arguments')
+        return
+
+    db.init_db()
+    backfill_request_tags(options.start_id, options.batch_size)
+    db.finalize_db()
+
+
+def get_request_batch(start_id, batch_size):
+    result = [None]
+
+    def on_db_return(success, db_results):
+        check_db_results(success, db_results)
+        result[0] = db_results.fetchall()
+
+    query = db.push_requests.select(
+        db.push_requests.c.id >= start_id,
+        order_by=db.push_requests.c.id,
+    ).limit(batch_size)
+    db.execute_cb(query, on_db_return)
+    return result[0]
+
+
+def backfill_request_tags(start_id=0, batch_size=500):
+    """Rewrite the push_request_tags rows of every request with an id
+    of at least start_id. Returns the number of requests processed.
+    """
+    processed = 0
+    while True:
+        requests = get_request_batch(start_id, batch_size)
+        if not requests:
+            break
+
+        queries = []
+        for request in requests:
+            queries.extend(db.request_tags_queries(request['id'], request['tags']))
+        db.execute_transaction_cb(queries, check_db_results)
+
+        processed += len(requests)
+        last_id = requests[-1]['id']
+        print 'Backfilled tags up to request %d (%d requests)' % (last_id, processed)
+        start_id = last_id + 1
+
+    return processed
+
+
+def check_db_results(success, db_results):
+    if not success:
+        raise db.DatabaseError()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
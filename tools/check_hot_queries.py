@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""
+Reports which of the hot pushmanager queries still do full table scans.
+
+With an appropriate config.yaml running from the root of the pushmanager-service:
+python -u tools/check_hot_queries.py
+
+Every query is run through EXPLAIN (MySQL) or EXPLAIN QUERY PLAN
+(sqlite). Exits with a non-zero status if any of them scans a whole
+table, which usually means pushplans/add_hot_indexes.sql has not been
+applied.
+"""
+import sys
+from optparse import OptionParser
+
+import sqlalchemy as SA
+
+import pushmanager.core.db as db
+
+
+def hot_queries():
+    """Return (name, query) pairs for the queries on the hot paths.
+    Literal values are placeholders, only the query plans matter.
+    """
+    r = db.push_requests.c
+    pc = db.push_pushcontents.c
+    c = db.push_checklist.c
+    return [
+        ('sha poller active requests', db.push_requests.select(SA.or_(
+            r.state == 'requested',
+            r.state == 'pickme',
+            r.state == 'added',
+        ))),
+        ('pushdata available requests', db.push_requests.select(r.state == 'requested')),
+        ('pushdata push contents', db.push_requests.select(
+            SA.and_(r.id == pc.request, pc.push == 1),
+            order_by=(r.user, r.title),
+        )),
+        ('pushdata requests modified since', db.push_requests.select(r.modified >= 1346458663)),
+        ('request with sha', db.push_requests.select(r.revision == '0' * 40)),
+        ('requests by user', db.push_requests.select(r.user == 'user')),
+        ('requests by tag', db.push_requests.select(db.requests_with_tag('tag'))),
+        ('summary for branch', db.push_requests.select(
+            SA.and_(r.repo == 'repo', r.branch == 'branch')
+        )),
+        ('push for request', db.push_pushcontents.select(pc.request == 1)),
+        ('pushes listing', db.push_pushes.select(
+            order_by=(db.push_pushes.c.modified.desc(), db.push_pushes.c.id.desc()),
+        ).limit(50)),
+        ('pushes page after cursor', db.push_pushes.select(
+            SA.or_(
+                db.push_pushes.c.modified < 1346458663.0,
+                SA.and_(db.push_pushes.c.modified == 1346458663.0, db.push_pushes.c.id < 2),
+            ),
+            order_by=(db.push_pushes.c.modified.desc(), db.push_pushes.c.id.desc()),
+        ).limit(50)),
+        ('pushes by state', db.push_pushes.select(
+            db.push_pushes.c.state == 'accepting',
+            order_by=db.push_pushes.c.modified.desc(),
+        ).limit(50)),
+        ('push checklist', SA.select([c.id, r.title]).where(SA.and_(
+            r.id == c.request,
+            c.request == pc.request,
+            pc.push == 1,
+        ))),
+    ]
+
+
+def explain(conn, query):
+    """Return the list of tables fully scanned by query."""
+    compiled = query.compile(dialect=conn.dialect)
+    params = [compiled.params[key] for key in compiled.positiontup]
+
+    if conn.dialect.name == 'sqlite':
+        plan = conn.execute('EXPLAIN QUERY PLAN ' + str(compiled), *params).fetchall()
+        # The detail column reads e.g. "SCAN push_requests" or
+        # "SEARCH push_requests USING INDEX ix_push_requests_state (state=?)"
+        details = [row['detail'] for row in plan]
+        return [
+            detail.split()[-1] for detail in details
+            if detail.startswith('SCAN') and 'USING' not in detail and 'CONSTANT' not in detail
+        ]
+
+    plan = conn.execute('EXPLAIN ' + str(compiled), *params).fetchall()
+    return [row['table'] for row in plan if row['type'] == 'ALL']
+
+
+def check_hot_queries():
+    """Print the plan verdict for every hot query and return the names
+    of the queries doing full scans.
+    """
+    full_scans = []
+    conn = db.connect()
+    try:
+        for name, query in hot_queries():
+            scanned_tables = explain(conn, query)
+            if scanned_tables:
+                full_scans.append(name)
+                print 'FULL SCAN  %s (%s)' % (name, ', '.join(scanned_tables))
+            else:
+                print 'ok         %s' % name
+    finally:
+        conn.close()
+    return full_scans
+
+
+def main():
+    usage = 'usage: %prog'
+    parser = OptionParser(usage)
+    (_, args) = parser.parse_args()
+
+    if args:
+        parser.error('Incorrect number of arguments')
+        return
+
+    db.init_db()
+    full_scans = check_hot_queries()
+    db.finalize_db()
+    return 1 if full_scans else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
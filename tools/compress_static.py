@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""
+Writes gzipped copies of the static files for
+PrecompressedStaticFileHandler.
+
+Run from the root of the pushmanager-service as part of the build, and
+again whenever static files change:
+python -u tools/compress_static.py [--min-size N] [--static-path PATH]
+
+Every text file (js, css, html, ...) of at least --min-size bytes gets
+a .gz copy next to it. Copies are only rewritten when the file is newer
+than its copy; stale copies are never served, the handler falls back to
+the uncompressed file.
+"""
+import gzip
+import os
+import shutil
+import sys
+from optparse import OptionParser
+
+STATIC_PATH = os.path.join(os.path.dirname(__file__), '..', 'pushmanager', 'static')
+
+COMPRESSIBLE_EXTENSIONS = ('.css', '.html', '.js', '.json', '.map', '.svg', '.txt', '.xml')
+
+
+def main():
+    usage = 'usage: %prog [options]'
+    parser = OptionParser(usage)
+    parser.add_option(
+        '--min-size', dest='min_size', type='int', default=1024,
+        help='only compress files of at least this many bytes'
+    )
+    parser.add_option(
+        '--static-path', dest='static_path', default=STATIC_PATH,
+        help='directory of the static files'
+    )
+    (options, args) = parser.parse_args()
+
+    if args or options.min_size < 0:
+        parser.error('Incorrect arguments')
+        return
+
+    compress_static(options.static_path, options.min_size)
+
+
+def compress_file(path):
+    """Write path.gz, which is then more recent than path."""
+    with open(path, 'rb') as source:
+        compressed = gzip.GzipFile(path + '.gz', 'wb', 9)
+        try:
+            shutil.copyfileobj(source, compressed)
+        finally:
+            compressed.close()
+
+
+def compress_static(static_path, min_size=1024):
+    """Compress the static files which need it. Returns the list of
+    paths compressed.
+    """
+    compressed = []
+    for dirpath, _, filenames in os.walk(static_path):
+        for filename in sorted(filenames):
+            path = os.path.join(dirpath, filename)
+            if not filename.endswith(COMPRESSIBLE_EXTENSIONS) or os.path.getsize(path) < min_size:
+                continue
+            if os.path.exists(path + '.gz') and os.path.getmtime(path + '.gz') >= os.path.getmtime(path):
+                continue
+
+            compress_file(path)
+            compressed.append(path)
+            print 'Compressed %s (%d -> %d bytes)' % (path, os.path.getsize(path), os.path.getsize(path + '.gz'))
+
+    return compressed
+
+
+if __name__ == '__main__':
+    sys.exit(main())
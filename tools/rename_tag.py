@@ -65,6 +65,8 @@ def convert_tag_callback(oldtag, newtag, success, db_results):
                 db.push_requests.c.id == request.id
                 ).values({'tags': updated_tags})
             update_queries.append(update_query)
+            update_queries.extend(db.request_tags_queries(request.id, updated_tags))
+    update_queries.extend(db.bump_data_versions_queries(db.REQUESTS_DATA_VERSION))
 
     db.execute_transaction_cb(update_queries, check_db_results)
 